@@ -9,11 +9,15 @@ import json
 import time
 import threading
 import queue
+import random
 from typing import Optional, List
 
 # Configuration
 COORDINATOR_API_URL = os.getenv("COORDINATOR_API_URL", "http://localhost:8004")
 N8N_WEBHOOK_URL = os.getenv("N8N_WEBHOOK_URL", "http://localhost:5678/webhook/session/start")
+SSE_RECONNECT_MIN_DELAY = 0.5  # seconds
+SSE_RECONNECT_MAX_DELAY = 30.0
+HLS_JS_URL = "https://cdn.jsdelivr.net/npm/hls.js@1"  # HLS playback outside Safari
 
 # Teacher mapping
 # Note: Paths are relative to frontend/ directory, so we need ../ to go up one level
@@ -210,6 +214,49 @@ def get_css_styles():
     """
 
 
+def clip_playlist_url(clip: dict) -> Optional[str]:
+    """HLS playlist of a clip's LongCat job (older clips only carry jobId and videoUrl)"""
+    if clip.get("playlistUrl"):
+        return clip["playlistUrl"]
+    video_url = clip.get("videoUrl") or ""
+    if clip.get("jobId") and video_url.endswith(f"/video/{clip['jobId']}"):
+        return f"{video_url}/playlist.m3u8"
+    return None
+
+
+def play_clip_video(clip: dict):
+    """
+    Play a clip's video from its segment playlist, so it starts once the first segment is
+    rendered; the playlist answers 202 until then, so the player keeps retrying
+    """
+    playlist_url = clip_playlist_url(clip)
+    if playlist_url is None:
+        st.video(clip["videoUrl"])
+        return
+    st.components.v1.html(f"""
+        <video id="clip" controls autoplay playsinline style="width: 100%; border-radius: 8px;"></video>
+        <script src="{HLS_JS_URL}"></script>
+        <script>
+        const video = document.getElementById('clip');
+        const src = {json.dumps(playlist_url)};
+        if (window.Hls && Hls.isSupported()) {{
+            const hls = new Hls();
+            hls.on(Hls.Events.ERROR, (event, data) => {{
+                if (data.fatal) {{
+                    setTimeout(() => hls.loadSource(src), 1000);
+                }}
+            }});
+            hls.loadSource(src);
+            hls.attachMedia(video);
+        }} else if (video.canPlayType('application/vnd.apple.mpegurl')) {{
+            video.src = src;
+        }} else {{
+            video.src = {json.dumps(clip.get("videoUrl") or "")};
+        }}
+        </script>
+    """, height=320)
+
+
 def initialize_session_state():
     """Initialize all session state variables"""
     if "session_id" not in st.session_state:
@@ -310,26 +357,97 @@ def notify_speech_ended(session_id: str, clip_id: str):
         pass  # Fail silently
 
 
-def listen_to_events(session_id: str, event_queue: queue.Queue):
-    """Listen to SSE events from Coordinator"""
+def end_session(session_id: str):
+    """Tell the coordinator the session is over (cancels its pending renders)"""
     try:
-        response = requests.get(
-            f"{COORDINATOR_API_URL}/session/{session_id}/events",
-            stream=True,
-            timeout=None
-        )
+        requests.post(f"{COORDINATOR_API_URL}/session/{session_id}/end", timeout=5)
+    except Exception:
+        pass  # Fail silently; the coordinator expires idle sessions anyway
+
+
+def reset_session_state():
+    """Forget the current session locally"""
+    stop_event_listener()
+    st.session_state.session_id = None
+    st.session_state.selected_teachers = []
+    st.session_state.speaker = None
+    st.session_state.renderer = None
+    st.session_state.clips = {}
+    st.session_state.current_clip = None
+    st.session_state.last_played_clip = None
+
+
+def listen_to_events(session_id: str, event_queue: queue.Queue, stop_event: Optional[threading.Event] = None):
+    """
+    Listen to SSE events from Coordinator
+    Reconnects with exponential backoff and resumes from the last event id, so events
+    emitted during a network blip are replayed instead of lost
+    """
+    last_event_id = None
+    delay = SSE_RECONNECT_MIN_DELAY
+    while not (stop_event and stop_event.is_set()):
+        headers = {"Last-Event-ID": str(last_event_id)} if last_event_id is not None else {}
+        try:
+            response = requests.get(
+                f"{COORDINATOR_API_URL}/session/{session_id}/events",
+                headers=headers,
+                stream=True,
+                timeout=(5, 60)  # keepalives arrive every 30s
+            )
+            if response.status_code == 404:
+                event_queue.put({"type": "ERROR", "message": "Session not found"})
+                return
+            response.raise_for_status()
+            
+            for line in response.iter_lines():
+                if stop_event and stop_event.is_set():
+                    return
+                if line:
+                    line_str = line.decode('utf-8')
+                    if line_str.startswith('id: '):
+                        last_event_id = int(line_str[4:])
+                    elif line_str.startswith('data: '):
+                        try:
+                            event_data = json.loads(line_str[6:])
+                            event_queue.put(event_data)
+                            delay = SSE_RECONNECT_MIN_DELAY  # Healthy stream, reset backoff
+                        except json.JSONDecodeError:
+                            continue
+                        if event_data.get("type") == "SESSION_ENDED":
+                            return  # Nothing more will come; don't reconnect
+        except Exception:
+            pass  # Connection dropped; reconnect below
         
-        for line in response.iter_lines():
-            if line:
-                line_str = line.decode('utf-8')
-                if line_str.startswith('data: '):
-                    try:
-                        event_data = json.loads(line_str[6:])
-                        event_queue.put(event_data)
-                    except json.JSONDecodeError:
-                        pass
-    except Exception as e:
-        event_queue.put({"type": "ERROR", "message": str(e)})
+        # Jittered exponential backoff before reconnecting
+        time.sleep(delay * random.uniform(0.5, 1.0))
+        delay = min(delay * 2, SSE_RECONNECT_MAX_DELAY)
+
+
+def start_event_listener(session_id: str):
+    """
+    Run listen_to_events for session_id in a background thread feeding
+    st.session_state.event_queue (once per session; a listener for another session is stopped)
+    """
+    listener = st.session_state.sse_thread
+    if listener and listener["session_id"] == session_id:
+        return
+    stop_event_listener()
+    stop_event = threading.Event()
+    thread = threading.Thread(
+        target=listen_to_events,
+        args=(session_id, st.session_state.event_queue, stop_event),
+        daemon=True
+    )
+    thread.start()
+    st.session_state.sse_thread = {"session_id": session_id, "thread": thread, "stop_event": stop_event}
+
+
+def stop_event_listener():
+    """Stop the background listener (it exits at its next event or keepalive)"""
+    listener = st.session_state.get("sse_thread")
+    if listener:
+        listener["stop_event"].set()
+        st.session_state.sse_thread = None
 
 
 def process_events():
@@ -360,6 +478,14 @@ def process_events():
                         st.session_state.last_played_clip = clip  # Store for replay
                         st.rerun()
             
+            elif event_type == "BRIDGING_CLIP":
+                # Filler while the next clip renders; doesn't replace the teacher's queued clip
+                teacher = event.get("teacher")
+                clip = event.get("clip")
+                if clip and isinstance(clip, dict) and teacher == st.session_state.speaker:
+                    st.session_state.current_clip = clip
+                    st.rerun()
+            
             elif event_type == "SPEAKER_CHANGED":
                 new_speaker = event.get("speaker")
                 new_renderer = event.get("renderer")
@@ -374,6 +500,13 @@ def process_events():
                     st.session_state.last_played_clip = clip  # Store for replay
                     st.rerun()
             
+            elif event_type == "SESSION_ENDED":
+                if event.get("sessionId") == st.session_state.session_id:
+                    if event.get("reason") == "expired":
+                        st.toast("Session ended after being idle. Start a new one to continue.")
+                    reset_session_state()
+                    st.rerun()
+            
             elif event_type == "ERROR":
                 error_msg = event.get('message', 'Unknown error')
                 st.error(f"Error: {error_msg}")
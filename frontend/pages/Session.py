@@ -6,7 +6,8 @@ import streamlit as st
 import time
 from common import (
     TEACHERS, get_css_styles, initialize_session_state,
-    process_events, update_section, COORDINATOR_API_URL
+    process_events, update_section, end_session, reset_session_state, start_event_listener,
+    play_clip_video, COORDINATOR_API_URL
 )
 
 # Page config
@@ -29,8 +30,9 @@ if not st.session_state.session_id or not st.session_state.selected_teachers or
     st.info("💡 Use the sidebar menu to navigate back to the landing page.")
     st.stop()
 
-# Process events
+# Listen for coordinator events (reconnects and resumes on its own) and process them
 if st.session_state.session_id:
+    start_event_listener(st.session_state.session_id)
     process_events()
 
 # Get teachers
@@ -61,13 +63,9 @@ with st.sidebar:
             st.rerun()
     
     if st.button("🛑 End Session", use_container_width=True):
-        st.session_state.session_id = None
-        st.session_state.selected_teachers = []
-        st.session_state.speaker = None
-        st.session_state.renderer = None
-        st.session_state.clips = {}
-        st.session_state.current_clip = None
-        st.session_state.last_played_clip = None
+        if st.session_state.session_id:
+            end_session(st.session_state.session_id)
+        reset_session_state()
         st.switch_page("app")  # Navigate back to landing page
 
 # Clean three-column layout: Teacher Left | URL Box Center | Teacher Right
@@ -101,7 +99,7 @@ with col_left:
         clip = st.session_state.current_clip
         try:
             if clip.get("videoUrl") and clip.get("videoUrl") != "empty":
-                st.video(clip["videoUrl"])
+                play_clip_video(clip)
                 if clip.get("text"):
                     st.caption(clip.get("text", ""))
             elif clip.get("audioUrl"):
@@ -372,7 +370,7 @@ with col_right:
         clip = st.session_state.current_clip
         try:
             if clip.get("videoUrl") and clip.get("videoUrl") != "empty":
-                st.video(clip["videoUrl"])
+                play_clip_video(clip)
                 if clip.get("text"):
                     st.caption(clip.get("text", ""))
             elif clip.get("audioUrl"):
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Generate the coordinator's bridging-clip library
+Renders each teacher's filler phrases through TTS -> LongCat-Video (/generate) and writes
+the manifest the coordinator serves BRIDGING_CLIP events from
+
+Usage:
+    python scripts/generate_bridging_clips.py [--config configs/bridging_clips.yaml]
+                                              [--output data/bridging_clips.json] [--teacher teacher_a]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import requests
+import yaml
+
+# Configuration
+TTS_URL = os.getenv("TTS_API_URL", "http://localhost:8001")
+LONGCAT_URL = os.getenv("LONGCAT_API_URL", "http://localhost:8003")
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CONFIG = os.path.join(PROJECT_ROOT, "configs", "bridging_clips.yaml")
+# Same default as the coordinator's BRIDGING_MANIFEST (DATA_DIR/bridging_clips.json); run from the repo root like it
+VAST_STORAGE = os.getenv("VAST_STORAGE_PATH", os.getenv("VAST_STORAGE", ""))
+if VAST_STORAGE and os.path.exists(VAST_STORAGE):
+    COORDINATOR_DATA_DIR = os.getenv("COORDINATOR_DATA_DIR", os.path.join(VAST_STORAGE, "data/coordinator"))
+else:
+    COORDINATOR_DATA_DIR = os.getenv("COORDINATOR_DATA_DIR", "data")
+DEFAULT_OUTPUT = os.getenv("BRIDGING_MANIFEST", os.path.join(COORDINATOR_DATA_DIR, "bridging_clips.json"))
+JOB_TIMEOUT = 1800  # seconds per clip
+
+
+def probe_duration_ms(url: str) -> Optional[int]:
+    """Clip duration via ffprobe (works on URLs), or None"""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", url],
+            capture_output=True, text=True, timeout=60
+        )
+        return int(float(result.stdout.strip()) * 1000) if result.returncode == 0 else None
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+
+
+def synthesize(text: str, voice: str) -> str:
+    response = requests.post(f"{TTS_URL}/tts", json={"text": text, "voice": voice}, timeout=120)
+    response.raise_for_status()
+    audio_url = response.json().get("audio_url")
+    if not audio_url:
+        raise RuntimeError("TTS response has no audio_url")
+    return audio_url
+
+
+def render(teacher: str, audio_url: str, text_prompt: str, resolution: str) -> str:
+    """Submit a LongCat job and wait for it; returns the job id"""
+    response = requests.post(f"{LONGCAT_URL}/generate", json={
+        "avatar_id": teacher,
+        "audio_url": audio_url,
+        "text_prompt": text_prompt,
+        "resolution": resolution,
+        "num_segments": 1,
+        "priority": -10  # Never ahead of live classroom turns
+    }, timeout=120)
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+
+    deadline = time.time() + JOB_TIMEOUT
+    while time.time() < deadline:
+        job = requests.get(f"{LONGCAT_URL}/job/{job_id}", timeout=30).json()
+        if job.get("status") == "completed":
+            return job_id
+        if job.get("status") not in ("processing", None):
+            raise RuntimeError(f"LongCat job {job_id} {job.get('status')}: {job.get('error')}")
+        time.sleep(5)
+    raise RuntimeError(f"LongCat job {job_id} timed out")
+
+
+def generate_teacher(teacher: str, settings: Dict, defaults: Dict) -> List[Dict]:
+    phrases = settings.get("phrases") or defaults.get("phrases", [])
+    voice = settings.get("voice") or defaults.get("voice", "en_US-lessac-medium")
+    resolution = settings.get("resolution") or defaults.get("resolution", "480p")
+    text_prompt = settings.get("text_prompt", "A person speaking naturally")
+
+    clips = []
+    for index, text in enumerate(phrases):
+        print(f"  [{teacher}] {index + 1}/{len(phrases)}: {text}")
+        try:
+            audio_url = synthesize(text, voice)
+            job_id = render(teacher, audio_url, text_prompt, resolution)
+        except Exception as e:
+            print(f"    ❌ {e}")
+            continue
+        video_url = f"{LONGCAT_URL}/video/{job_id}"
+        duration_ms = probe_duration_ms(video_url) or int(len(text.split()) * 0.5 * 1000)
+        clips.append({
+            "clipId": f"bridge-{teacher}-{index}",
+            "text": text,
+            "audioUrl": audio_url,
+            "videoUrl": video_url,
+            "jobId": job_id,
+            "audioFile": audio_url.rsplit("/", 1)[-1],
+            "durationMs": duration_ms,
+            "status": "completed"
+        })
+        print(f"    ✅ {video_url} ({duration_ms} ms)")
+    return clips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate bridging clips for the coordinator")
+    parser.add_argument("--config", default=DEFAULT_CONFIG)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--teacher", action="append", help="Only (re)generate these teachers")
+    args = parser.parse_args()
+
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    defaults = config.get("defaults", {})
+    teachers = config.get("teachers", {})
+
+    # Keep clips of teachers not regenerated this run
+    manifest = {}
+    if os.path.exists(args.output):
+        with open(args.output) as f:
+            manifest = json.load(f)
+
+    for teacher, settings in teachers.items():
+        if args.teacher and teacher not in args.teacher:
+            continue
+        print(f"Generating bridging clips for {teacher}...")
+        clips = generate_teacher(teacher, settings or {}, defaults)
+        if clips:
+            manifest[teacher] = clips
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, args.output)
+    total = sum(len(clips) for clips in manifest.values())
+    print(f"\nWrote {total} bridging clips to {args.output}")
+    return 0 if total else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -54,7 +54,8 @@ def test_tts(text: str) -> str:
             json={
                 "text": text,
                 "voice": "en_US-lessac-medium",
-                "chunk": False
+                "chunk": False,
+                "response": "base64"
             },
             timeout=30
         )
@@ -3,14 +3,20 @@ Animation Service - LAM or LivePortrait
 Handles audio-driven lip-sync animation
 """
 
-from fastapi import FastAPI, HTTPException, File, UploadFile
+from fastapi import FastAPI, HTTPException, File, UploadFile, Request
 from fastapi.responses import StreamingResponse, FileResponse
 from pydantic import BaseModel
 import os
+import sys
 import uuid
+from pathlib import Path
 from typing import Optional
 import tempfile
 
+# Shared helpers live in services/shared (copied to /app/shared in Docker images)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.static_media import media_response
+
 app = FastAPI(title="AI Teacher Animation Service")
 
 # Model selection: "lam", "liveportrait", "sadtalker", or "wav2lip"
@@ -140,7 +146,7 @@ async def generate_wav2lip_animation(avatar_path: str, audio_data: bytes, style:
 
 
 @app.get("/video/{job_id}")
-async def get_video(job_id: str):
+async def get_video(job_id: str, request: Request):
     """
     Stream generated video
     """
@@ -148,7 +154,7 @@ async def get_video(job_id: str):
     if not os.path.exists(video_path):
         raise HTTPException(status_code=404, detail="Video not found")
     
-    return FileResponse(video_path, media_type="video/mp4")
+    return media_response(request, video_path, "video/mp4")
 
 
 @app.get("/avatars")
@@ -3,18 +3,25 @@ Coordinator API - Session State Management and Event Streaming
 Handles turn-taking, job routing, and SSE events for 2-teacher live classroom
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Literal
-from datetime import datetime
+from typing import Optional, List, Dict, Literal, Tuple
+from datetime import datetime, timedelta
 import uuid
 import json
 import asyncio
-from collections import defaultdict
 import logging
 import httpx
 import os
+import time
+import random
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from session_store import create_session_store
+from event_bus import create_event_bus
+from bridging import BridgingLibrary, RenderTimeEstimator
 
 app = FastAPI(title="AI Teacher Coordinator API")
 
@@ -24,14 +31,42 @@ if VAST_STORAGE and os.path.exists(VAST_STORAGE):
     LOGS_DIR = os.getenv("COORDINATOR_LOGS_DIR", os.path.join(VAST_STORAGE, "logs/coordinator"))
     os.makedirs(LOGS_DIR, exist_ok=True)
     LOG_FILE = os.path.join(LOGS_DIR, "coordinator.log")
+    DATA_DIR = os.getenv("COORDINATOR_DATA_DIR", os.path.join(VAST_STORAGE, "data/coordinator"))
 else:
     LOGS_DIR = os.getenv("LOGS_DIR", "logs")
     os.makedirs(LOGS_DIR, exist_ok=True)
     LOG_FILE = os.path.join(LOGS_DIR, "coordinator.log")
+    DATA_DIR = os.getenv("COORDINATOR_DATA_DIR", "data")
+os.makedirs(DATA_DIR, exist_ok=True)
+
+# Session store: "sqlite" (default) is shared by all workers/replicas on the host and
+# survives restarts; "memory" keeps sessions in this process only
+SESSION_STORE = os.getenv("SESSION_STORE", "sqlite")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(DATA_DIR, "sessions.db"))
+sessions = create_session_store(SESSION_STORE, SESSION_DB_PATH)
+# sqlite3 calls block (up to the 10s busy timeout under write contention), so handlers
+# run store calls on this pool instead of the event loop (see run_store)
+SESSION_STORE_THREADS = int(os.getenv("SESSION_STORE_THREADS", "4"))
+store_pool = ThreadPoolExecutor(max_workers=SESSION_STORE_THREADS, thread_name_prefix="session-store")
 
-# In-memory session store (replace with Redis/DB in production)
-sessions: Dict[str, Dict] = {}
-event_streams: Dict[str, List] = defaultdict(list)  # sessionId -> list of event listeners
+# Event bus behind emit_event: "sqlite" (default) reaches SSE clients connected to any
+# worker/replica on the host; "memory" only this process's listeners
+EVENT_BUS = os.getenv("EVENT_BUS", "sqlite")
+EVENT_DB_PATH = os.getenv("EVENT_DB_PATH", os.path.join(DATA_DIR, "events.db"))
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "200"))  # recent events kept per session
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "0.1"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "2000"))  # reconnect delay hint sent to browsers
+# Per-listener queue bound and what to do when a slow client fills it
+# (drop_oldest | coalesce | disconnect); listeners that stop reading are pruned
+LISTENER_QUEUE_SIZE = int(os.getenv("LISTENER_QUEUE_SIZE", "100"))
+LISTENER_OVERFLOW_POLICY = os.getenv("LISTENER_OVERFLOW_POLICY", "drop_oldest")
+LISTENER_STALE_SECONDS = float(os.getenv("LISTENER_STALE_SECONDS", "120"))
+event_bus = create_event_bus(
+    EVENT_BUS, EVENT_DB_PATH, EVENT_BUFFER_SIZE, EVENT_POLL_INTERVAL,
+    queue_size=LISTENER_QUEUE_SIZE,
+    overflow_policy=LISTENER_OVERFLOW_POLICY,
+    stale_seconds=LISTENER_STALE_SECONDS
+)
 
 # Set up logging with file handler
 logging.basicConfig(
@@ -46,6 +81,58 @@ logger = logging.getLogger(__name__)
 logger.info(f"Coordinator API starting - Logs: {LOG_FILE}")
 
 
+# n8n worker dispatch: one pooled keep-alive client for the app's lifetime
+N8N_BASE_URL = os.getenv("N8N_BASE_URL", "http://localhost:5678")
+DISPATCH_TIMEOUT = float(os.getenv("DISPATCH_TIMEOUT", "5.0"))
+DISPATCH_MAX_CONNECTIONS = int(os.getenv("DISPATCH_MAX_CONNECTIONS", "20"))
+DISPATCH_MAX_KEEPALIVE = int(os.getenv("DISPATCH_MAX_KEEPALIVE", "10"))
+DISPATCH_RETRIES = int(os.getenv("DISPATCH_RETRIES", "3"))  # attempts after the first
+DISPATCH_BACKOFF = float(os.getenv("DISPATCH_BACKOFF", "0.25"))  # seconds, doubled per retry
+http_client: Optional[httpx.AsyncClient] = None
+
+# Speculative pre-rendering: keep clips for the next LOOKAHEAD_TURNS turns in flight
+# (1 = only the current renderer's next clip, the original behaviour)
+LOOKAHEAD_TURNS = max(1, int(os.getenv("LOOKAHEAD_TURNS", "2")))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "20"))  # finished/cancelled ledger entries kept per session
+RENDER_MAX_ATTEMPTS = int(os.getenv("RENDER_MAX_ATTEMPTS", "3"))  # dispatches per turn before a failed render stays "error"
+# LongCat queue order (higher runs first): the next turn's clip ahead of look-ahead renders.
+# With RENDER_DEADLINE_SECONDS > 0, LongCat drops a render still queued that long after dispatch
+RENDER_PRIORITY_NEXT = int(os.getenv("RENDER_PRIORITY_NEXT", "10"))
+RENDER_PRIORITY_SPECULATIVE = int(os.getenv("RENDER_PRIORITY_SPECULATIVE", "0"))
+RENDER_DEADLINE_SECONDS = float(os.getenv("RENDER_DEADLINE_SECONDS", "0"))
+
+# Bridging clips: pre-rendered fillers played when the next clip isn't ready yet
+# (manifest written by scripts/generate_bridging_clips.py)
+BRIDGING_MANIFEST = os.getenv("BRIDGING_MANIFEST", os.path.join(DATA_DIR, "bridging_clips.json"))
+# The clips' storage leases are re-posted when the manifest changes, after a failed
+# attempt (TTS/LongCat not up yet), and every BRIDGING_LEASE_REFRESH seconds
+BRIDGING_LEASE_CHECK_INTERVAL = float(os.getenv("BRIDGING_LEASE_CHECK_INTERVAL", "60"))
+BRIDGING_LEASE_REFRESH = float(os.getenv("BRIDGING_LEASE_REFRESH", "3600"))
+BRIDGING_LEASE_TTL = 7 * 24 * 3600  # outlives a stopped coordinator; refreshed long before it lapses
+RENDER_TIME_ESTIMATE_MS = float(os.getenv("RENDER_TIME_ESTIMATE_MS", "30000"))  # until clips have been timed
+# Clips are timed from dispatch to LongCat finishing the video (clip-ready arrives as soon as
+# the video job is queued), by polling the job every RENDER_TIMING_POLL_INTERVAL seconds
+RENDER_TIMING_POLL_INTERVAL = float(os.getenv("RENDER_TIMING_POLL_INTERVAL", "2.0"))
+RENDER_TIMING_MAX_WAIT = float(os.getenv("RENDER_TIMING_MAX_WAIT", "1800"))
+TTS_API_URL = os.getenv("TTS_API_URL", "http://localhost:8001")
+LONGCAT_API_URL = os.getenv("LONGCAT_API_URL", "http://localhost:8003")
+# Section updates: renders wait for SECTION_DEBOUNCE_MS without further updates (scrolling),
+# use the latest snapshot, and are skipped if the content digest hasn't changed
+SECTION_DEBOUNCE_MS = float(os.getenv("SECTION_DEBOUNCE_MS", "750"))
+section_timers: Dict[str, asyncio.Task] = {}  # sessionId -> pending debounced render (this worker)
+# Session lifetime: sessions without user activity (section updates and questions, speech-ended)
+# for SESSION_IDLE_TIMEOUT seconds are ended like POST /session/{id}/end
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "1800"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+SESSION_EVENT_GRACE = 10.0  # seconds other workers get to relay SESSION_ENDED before its events are dropped
+session_counts = {"ended": 0, "expired": 0}  # sessions this worker ended, by reason
+session_sweeper: Optional[asyncio.Task] = None
+bridging_pinner: Optional[asyncio.Task] = None
+bridging_library = BridgingLibrary(BRIDGING_MANIFEST)
+render_timer = RenderTimeEstimator(RENDER_TIME_ESTIMATE_MS)
+render_timings: set = set()  # running time_video_render tasks (this worker)
+
+
 # ============================================================================
 # Data Models
 # ============================================================================
@@ -82,7 +169,12 @@ class ClipReadyRequest(BaseModel):
 # Session State Management
 # ============================================================================
 
-def create_session(selected_teachers: List[str], lesson_url: Optional[str] = None) -> Dict:
+async def run_store(fn, *args):
+    """Run a blocking session store call on store_pool, off the event loop"""
+    return await asyncio.get_running_loop().run_in_executor(store_pool, fn, *args)
+
+
+async def create_session(selected_teachers: List[str], lesson_url: Optional[str] = None) -> Dict:
     """Create a new session with turn-taking state"""
     if len(selected_teachers) != 2:
         raise ValueError("Must select exactly 2 teachers")
@@ -107,35 +199,68 @@ def create_session(selected_teachers: List[str], lesson_url: Optional[str] = Non
             left_teacher: {"status": "idle", "nextClipId": None},
             right_teacher: {"status": "idle", "nextClipId": None}
         },
+        # Render ledger: target turn (str) -> {"renderId", "teacher", "status", "clip", "context", "timestamps", ...}
+        "renders": {},
+        "jobHistory": [],  # retired ledger entries (played/cancelled/failed), newest last
+        "speculation": {"dispatched": 0, "cancelled": 0, "prerenderedHits": 0, "notReady": 0, "retried": 0},
         "createdAt": datetime.utcnow().isoformat(),
+        "lastActivityAt": datetime.utcnow().isoformat(),
         "status": "active"
     }
     
-    sessions[session_id] = session
+    await run_store(sessions.create, session)
     logger.info(f"Created session {session_id} with teachers {selected_teachers}")
     return session
 
 
-def swap_speaker_renderer(session_id: str) -> Dict:
-    """Swap speaker and renderer roles"""
-    if session_id not in sessions:
-        raise ValueError(f"Session {session_id} not found")
+async def swap_speaker_renderer(session_id: str) -> Optional[Dict]:
+    """
+    Swap speaker and renderer roles if the renderer's clip is ready.
+    The check and the swap are one compare-and-set, so concurrent speech-ended calls
+    (possibly on different workers) swap at most once. Returns None if not ready.
+    """
+    swapped = False
     
-    session = sessions[session_id]
-    old_speaker = session["speaker"]
-    old_renderer = session["renderer"]
+    def swap(session: Dict):
+        nonlocal swapped
+        if session["queues"][session["renderer"]]["status"] != "ready":
+            return False
+        touch_session(session)
+        old_speaker = session["speaker"]
+        session["speaker"] = session["renderer"]
+        session["renderer"] = old_speaker
+        session["turn"] += 1
+        # The new renderer's old clip is spent; mark it busy so a duplicate call can't swap back
+        session["queues"][old_speaker]["status"] = "rendering"
+        session["queues"][old_speaker]["nextClipId"] = None
+        # Drop renders for turns that have started; a pre-rendered next clip is ready right away
+        renders = session.setdefault("renders", {})
+        for turn in [t for t in renders if int(t) <= session["turn"]]:
+            retire_render(session, turn, "played")
+        upcoming = renders.get(str(session["turn"] + 1))
+        if upcoming and upcoming["status"] == "ready":
+            session["queues"][old_speaker]["status"] = "ready"
+            session["queues"][old_speaker]["nextClipId"] = upcoming["clip"].get("clipId")
+            session["speculation"]["prerenderedHits"] += 1
+        swapped = True
     
-    # Swap roles
-    session["speaker"] = old_renderer
-    session["renderer"] = old_speaker
-    session["turn"] += 1
+    session = await run_store(sessions.update, session_id, swap)
+    if session is None:
+        raise ValueError(f"Session {session_id} not found")
+    if not swapped:
+        return None
     
-    logger.info(f"Session {session_id}: Swapped speaker {old_speaker} <-> {old_renderer}, turn {session['turn']}")
+    logger.info(f"Session {session_id}: Swapped speaker {session['renderer']} <-> {session['speaker']}, turn {session['turn']}")
     return session
 
 
-def emit_event(session_id: str, event_type: str, data: Dict):
-    """Emit an event to all listeners for this session"""
+def touch_session(session: Dict):
+    """Mark user activity (keeps the session from expiring)"""
+    session["lastActivityAt"] = datetime.utcnow().isoformat()
+
+
+async def emit_event(session_id: str, event_type: str, data: Dict) -> Dict:
+    """Publish an event to all listeners for this session (on every worker)"""
     event = {
         "type": event_type,
         "sessionId": session_id,
@@ -143,51 +268,196 @@ def emit_event(session_id: str, event_type: str, data: Dict):
         **data
     }
     
-    # Store event for SSE streams
-    if session_id in event_streams:
-        for listener in event_streams[session_id]:
-            try:
-                listener.put_nowait(event)
-            except:
-                pass  # Listener disconnected
+    event = await event_bus.publish(session_id, event)
     
-    logger.info(f"Emitted {event_type} for session {session_id}")
+    logger.info(f"Emitted {event_type} #{event['eventId']} for session {session_id}")
+    return event
 
 
 # ============================================================================
 # API Endpoints
 # ============================================================================
 
+@app.on_event("startup")
+async def start_event_bus():
+    await event_bus.start()
+
+
+@app.on_event("shutdown")
+async def stop_event_bus():
+    await event_bus.stop()
+
+
+@app.on_event("startup")
+async def open_http_client():
+    global http_client
+    http_client = httpx.AsyncClient(
+        timeout=DISPATCH_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=DISPATCH_MAX_CONNECTIONS,
+            max_keepalive_connections=DISPATCH_MAX_KEEPALIVE
+        )
+    )
+
+
+@app.on_event("startup")
+async def start_bridging_pinner():
+    global bridging_pinner
+    bridging_pinner = asyncio.create_task(keep_bridging_library_pinned())
+
+
+@app.on_event("shutdown")
+async def stop_bridging_pinner():
+    if bridging_pinner is not None:
+        bridging_pinner.cancel()
+
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    global session_sweeper
+    session_sweeper = asyncio.create_task(expire_idle_sessions())
+
+
+@app.on_event("shutdown")
+async def stop_session_sweeper():
+    if session_sweeper is not None:
+        session_sweeper.cancel()
+
+
+@app.on_event("shutdown")
+async def close_http_client():
+    if http_client is not None:
+        await http_client.aclose()
+
+
 @app.get("/")
 async def root():
     return {
         "service": "Coordinator API",
         "status": "ready",
-        "activeSessions": len(sessions)
+        "activeSessions": await run_store(len, sessions),
+        "endedSessions": session_counts["ended"],  # this worker, since start
+        "expiredSessions": session_counts["expired"],
+        "eventListeners": event_bus.listener_count(),
+        "bridgingClips": bridging_library.stats()
     }
 
 
+def retire_render(session: Dict, turn: str, status: str) -> Dict:
+    """Move a ledger entry to the session's bounded job history"""
+    entry = session["renders"].pop(turn)
+    entry["status"] = status
+    entry["timestamps"][f"{status}At"] = datetime.utcnow().isoformat()
+    history = session.setdefault("jobHistory", [])
+    history.append(entry)
+    del history[:-JOB_HISTORY_SIZE]
+    return entry
+
+
+def render_context(session: Dict) -> Dict:
+    """What a render depends on; renders made for another context are stale"""
+    snapshot = session.get("currentSnapshot") or {}
+    return {"sectionId": session.get("currentSectionId"), "userQuestion": snapshot.get("userQuestion")}
+
+
+def teacher_for_turn(session: Dict, turn: int) -> str:
+    """Teachers alternate, left speaking on even turns"""
+    return session["leftTeacher"] if turn % 2 == 0 else session["rightTeacher"]
+
+
+async def reserve_renders(session_id: str, rerender_next: bool = False) -> Tuple[List[Dict], List[str]]:
+    """
+    Add ledger entries for the next LOOKAHEAD_TURNS turns that have none and return them
+    for dispatch. Entries rendered for an older section/question are cancelled first;
+    rerender_next also replaces the next turn's entry (section updates always refresh it).
+    Entries whose dispatch failed are retried, up to RENDER_MAX_ATTEMPTS per turn and content.
+    Also returns the LongCat job ids of cancelled entries, to drop them from the GPU queue.
+    """
+    reserved: List[Dict] = []
+    cancelled_jobs: List[str] = []
+    
+    def reserve(session: Dict):
+        reserved.clear()
+        cancelled_jobs.clear()
+        renders = session.setdefault("renders", {})
+        context = render_context(session)
+        next_turn = session["turn"] + 1
+        failed_attempts = {}
+        replaced = {}  # turn -> renderId of the cancelled entry a new one takes over from
+        for turn, entry in list(renders.items()):
+            if entry["context"] != context or (rerender_next and int(turn) == next_turn):
+                retire_render(session, turn, "cancelled")
+                replaced[turn] = entry["renderId"]
+                session["speculation"]["cancelled"] += 1
+                if entry.get("longcatJobId"):
+                    cancelled_jobs.append(entry["longcatJobId"])
+            elif entry["status"] == "error" and (rerender_next or entry.get("attempt", 1) < RENDER_MAX_ATTEMPTS):
+                retire_render(session, turn, "failed")
+                if not rerender_next:  # new content starts the count again
+                    failed_attempts[turn] = entry.get("attempt", 1)
+                session["speculation"]["retried"] = session["speculation"].get("retried", 0) + 1
+        for turn in range(next_turn, next_turn + LOOKAHEAD_TURNS):
+            if str(turn) in renders:
+                continue
+            teacher = teacher_for_turn(session, turn)
+            entry = {
+                "renderId": str(uuid.uuid4()),
+                "turn": turn,
+                "teacher": teacher,
+                "status": "rendering",
+                "attempt": failed_attempts.get(str(turn), 0) + 1,
+                # LongCat drops the queued job of the render this one replaces
+                "supersedes": [replaced[str(turn)]] if str(turn) in replaced else [],
+                "speculative": turn != next_turn,
+                "context": context,
+                "clip": None,
+                "longcatJobId": None,
+                # dispatchedAt here; llm/tts/videoSubmitted from the worker's clip timings,
+                # clipReadyAt on clip-ready, videoStarted/Finished from LongCat on read
+                "timestamps": {"dispatchedAt": datetime.utcnow().isoformat()}
+            }
+            renders[str(turn)] = entry
+            reserved.append(entry)
+            session["speculation"]["dispatched"] += 1
+            if turn == next_turn:
+                session["queues"][teacher]["status"] = "rendering"
+                session["queues"][teacher]["nextClipId"] = None
+        if not reserved and not rerender_next:
+            return False
+    
+    await run_store(sessions.update, session_id, reserve)
+    return list(reserved), list(cancelled_jobs)
+
+
+async def fill_render_pipeline(session_id: str, rerender_next: bool = False):
+    """Dispatch render jobs so the next LOOKAHEAD_TURNS turns are in flight"""
+    entries, cancelled_jobs = await reserve_renders(session_id, rerender_next)
+    if cancelled_jobs:
+        await cancel_video_jobs(cancelled_jobs)
+    if entries:
+        await asyncio.gather(*(
+            enqueue_render_job(session_id, entry["teacher"], None, entry["turn"], entry["renderId"],
+                               entry["supersedes"])
+            for entry in entries
+        ))
+
+
 @app.post("/session/start")
 async def start_session(request: SessionStartRequest, background_tasks: BackgroundTasks):
     """Start a new session with 2 teachers"""
     try:
-        session = create_session(request.selectedTeachers, request.lessonUrl)
+        session = await create_session(request.selectedTeachers, request.lessonUrl)
         
         # Emit SESSION_STARTED event
-        emit_event(session["sessionId"], "SESSION_STARTED", {
+        await emit_event(session["sessionId"], "SESSION_STARTED", {
             "leftTeacher": session["leftTeacher"],
             "rightTeacher": session["rightTeacher"],
             "speaker": session["speaker"],
             "renderer": session["renderer"]
         })
         
-        # Enqueue first render job for renderer (in background)
-        background_tasks.add_task(
-            enqueue_render_job,
-            session["sessionId"],
-            session["renderer"],
-            session["speaker"]
-        )
+        # Enqueue first render jobs (renderer, plus look-ahead turns) in background
+        background_tasks.add_task(fill_render_pipeline, session["sessionId"])
         
         return {
             "sessionId": session["sessionId"],
@@ -199,68 +469,128 @@ async def start_session(request: SessionStartRequest, background_tasks: Backgrou
         raise HTTPException(status_code=400, detail=str(e))
 
 
+def snapshot_digest(request: SectionUpdateRequest) -> str:
+    """Identity of what a render would say: page content (domDigest, else a visibleText hash) plus the prompt inputs"""
+    content = request.domDigest or hashlib.sha256((request.visibleText or "").encode("utf-8")).hexdigest()
+    key = [request.sectionId, content, request.selectedText or "", request.userQuestion or "", request.language or ""]
+    return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+
+async def render_after_quiet_period(session_id: str, seq: int, delay: float):
+    """Render for the latest snapshot once no newer section update has arrived (on any worker)"""
+    try:
+        await asyncio.sleep(delay)
+        render = {}
+        
+        def claim(session: Dict):
+            render.clear()
+            if session.get("sectionSeq") != seq or session.get("renderedDigest") == session.get("sectionDigest"):
+                return False  # Superseded by a newer update, or this content was already rendered
+            session["renderedDigest"] = session["sectionDigest"]
+            render["go"] = True
+        
+        await run_store(sessions.update, session_id, claim)
+        if render:
+            # Re-render the next turn for the new snapshot (superseding the in-flight one);
+            # look-ahead renders for another section/question are cancelled and replaced
+            await fill_render_pipeline(session_id, rerender_next=True)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        if section_timers.get(session_id) is asyncio.current_task():
+            del section_timers[session_id]
+
+
 @app.post("/session/{session_id}/section")
 async def update_section(session_id: str, request: SectionUpdateRequest):
-    """Update the current section/snapshot from UI"""
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
+    """
+    Update the current section/snapshot from UI
+    Renders are debounced: bursts of updates (scrolling) coalesce into one render of the
+    latest snapshot, and updates whose content digest is unchanged render nothing
+    """
+    digest = snapshot_digest(request)
+    previous = {}
     
-    session = sessions[session_id]
-    session["currentSectionId"] = request.sectionId
-    session["currentSnapshot"] = {
-        "url": request.url,
-        "scrollY": request.scrollY,
-        "visibleText": request.visibleText,
-        "selectedText": request.selectedText,
-        "userQuestion": request.userQuestion,
-        "language": request.language,
-        "domDigest": request.domDigest
-    }
-    # Store language preference in session
-    if request.language:
-        session["language"] = request.language
+    def apply_section(session: Dict):
+        touch_session(session)
+        previous["question"] = (session.get("currentSnapshot") or {}).get("userQuestion")
+        previous["digest"] = session.get("renderedDigest")
+        previous["failed"] = any(entry["status"] == "error" and entry.get("attempt", 1) < RENDER_MAX_ATTEMPTS
+                                 for entry in session.get("renders", {}).values())
+        session["sectionSeq"] = session.get("sectionSeq", 0) + 1
+        session["sectionDigest"] = digest
+        session["currentSectionId"] = request.sectionId
+        session["currentSnapshot"] = {
+            "url": request.url,
+            "scrollY": request.scrollY,
+            "visibleText": request.visibleText,
+            "selectedText": request.selectedText,
+            "userQuestion": request.userQuestion,
+            "language": request.language,
+            "domDigest": request.domDigest
+        }
+        # Store language preference in session
+        if request.language:
+            session["language"] = request.language
+    
+    session = await run_store(sessions.update, session_id, apply_section)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
     
     # Emit SECTION_UPDATED event
-    emit_event(session_id, "SECTION_UPDATED", {
+    await emit_event(session_id, "SECTION_UPDATED", {
         "sectionId": request.sectionId,
         "url": request.url
     })
     
-    # Enqueue render job for current renderer
-    await enqueue_render_job(session_id, session["renderer"], session["speaker"])
+    if digest == previous["digest"]:
+        if previous["failed"]:
+            # Same content, but a render for it failed to dispatch; retry it
+            await fill_render_pipeline(session_id)
+            return {"status": "ok", "sectionId": request.sectionId, "render": "retried"}
+        return {"status": "ok", "sectionId": request.sectionId, "render": "unchanged"}
+    
+    # Coalesce: a newer update replaces this worker's pending timer (other workers' timers
+    # see the newer sectionSeq and stand down). A new question skips the quiet period.
+    pending = section_timers.pop(session_id, None)
+    if pending:
+        pending.cancel()
+    new_question = bool(request.userQuestion) and request.userQuestion != previous["question"]
+    delay = 0 if new_question else SECTION_DEBOUNCE_MS / 1000
+    section_timers[session_id] = asyncio.create_task(
+        render_after_quiet_period(session_id, session["sectionSeq"], delay)
+    )
     
-    return {"status": "ok", "sectionId": request.sectionId}
+    return {"status": "ok", "sectionId": request.sectionId, "render": "scheduled"}
 
 
 @app.post("/session/{session_id}/speech-ended")
 async def speech_ended(session_id: str, request: SpeechEndedRequest):
     """Called when a clip finishes playing - triggers turn swap"""
-    if session_id not in sessions:
+    # Swap roles if the renderer's clip is ready
+    try:
+        updated_session = await swap_speaker_renderer(session_id)
+    except ValueError:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session = sessions[session_id]
-    
-    # Check if renderer's clip is ready
-    renderer_queue = session["queues"][session["renderer"]]
-    
-    if renderer_queue["status"] == "ready":
-        # Swap roles
-        swap_speaker_renderer(session_id)
-        updated_session = sessions[session_id]
-        
+    if updated_session is not None:
         # Emit SPEAKER_CHANGED event
-        emit_event(session_id, "SPEAKER_CHANGED", {
+        await emit_event(session_id, "SPEAKER_CHANGED", {
             "speaker": updated_session["speaker"],
             "renderer": updated_session["renderer"],
             "turn": updated_session["turn"]
         })
         
-        # Enqueue render job for new renderer
-        await enqueue_render_job(
-            session_id,
-            updated_session["renderer"],
-            updated_session["speaker"]
-        )
+        # A clip pre-rendered for the new renderer's turn can be announced right away
+        upcoming = updated_session["renders"].get(str(updated_session["turn"] + 1))
+        if upcoming and upcoming["status"] == "ready":
+            await emit_event(session_id, "CLIP_READY", {
+                "teacher": upcoming["teacher"],
+                "clip": upcoming["clip"]
+            })
+        
+        # Keep the look-ahead window full
+        await fill_render_pipeline(session_id)
         
         return {
             "status": "ok",
@@ -269,34 +599,121 @@ async def speech_ended(session_id: str, request: SpeechEndedRequest):
             "turn": updated_session["turn"]
         }
     else:
-        # Renderer not ready - speaker should use bridging clip
+        # Renderer not ready - speaker bridges with a filler clip sized to the remaining render time
+        bridge = {}
+        
+        def pick_bridging_clip(session: Dict):
+            touch_session(session)
+            session["speculation"]["notReady"] += 1
+            pending = session["renders"].get(str(session["turn"] + 1))
+            elapsed_ms = 0.0
+            if pending:
+                dispatched_at = datetime.fromisoformat(pending["timestamps"]["dispatchedAt"])
+                elapsed_ms = (datetime.utcnow() - dispatched_at).total_seconds() * 1000
+            bridge["remainingMs"] = render_timer.remaining_ms(elapsed_ms)
+            bridge["clip"] = bridging_library.choose(
+                session["speaker"], bridge["remainingMs"], session.get("lastBridgingClipId")
+            )
+            if bridge["clip"]:
+                session["lastBridgingClipId"] = bridge["clip"].get("clipId")
+        
+        session = await run_store(sessions.update, session_id, pick_bridging_clip)
+        if session is None:
+            # Ended (or expired) while this request was in flight
+            raise HTTPException(status_code=404, detail="Session not found")
         logger.warning(f"Session {session_id}: Renderer {session['renderer']} not ready, need bridging clip")
+        pending = session["renders"].get(str(session["turn"] + 1))
+        if pending is None or pending["status"] == "error":
+            # The next turn's render was cancelled or failed to dispatch; dispatch a fresh one
+            await fill_render_pipeline(session_id)
+        if bridge["clip"]:
+            await emit_event(session_id, "BRIDGING_CLIP", {
+                "teacher": session["speaker"],
+                "clip": bridge["clip"],
+                "estimatedRemainingMs": round(bridge["remainingMs"])
+            })
         return {
             "status": "renderer_not_ready",
-            "message": "Renderer clip not ready, use bridging clip"
+            "message": "Renderer clip not ready, use bridging clip",
+            "bridgingClip": bridge["clip"],
+            "estimatedRemainingMs": round(bridge["remainingMs"])
         }
 
 
 @app.post("/session/{session_id}/clip-ready")
-async def clip_ready(session_id: str, request: ClipReadyRequest):
+async def clip_ready(session_id: str, request: ClipReadyRequest, background_tasks: BackgroundTasks):
     """Called by n8n worker when clip is ready"""
-    if session_id not in sessions:
+    session = await run_store(sessions.get, session_id)
+    if session is None:
         logger.warning(f"Clip ready for unknown session {session_id}")
+        if request.clip.get("jobId"):
+            # The session ended while this worker was running; free the GPU queue
+            background_tasks.add_task(cancel_video_jobs, [request.clip["jobId"]])
         return {"status": "ignored", "reason": "session_not_found"}
     
-    session = sessions[session_id]
     
     # Validate teacher is still active
     if request.teacher not in session["activeTeachers"]:
         logger.warning(f"Clip ready for inactive teacher {request.teacher} in session {session_id}")
         return {"status": "ignored", "reason": "teacher_not_active"}
     
-    # Update queue status
-    session["queues"][request.teacher]["status"] = "ready"
-    session["queues"][request.teacher]["nextClipId"] = request.clip.get("clipId")
+    # Match the clip to its ledger entry: by renderId, else by turn, else the teacher's
+    # earliest pending render (workflows that don't echo either)
+    outcome = {}
+    
+    def mark_ready(session: Dict):
+        outcome.clear()
+        renders = session.setdefault("renders", {})
+        render_id = request.clip.get("renderId")
+        turn_entry = renders.get(str(request.clip.get("turn")))
+        if render_id:
+            entry = next((e for e in renders.values() if e["renderId"] == render_id), None)
+        elif turn_entry and turn_entry["teacher"] == request.teacher:
+            entry = turn_entry
+        else:
+            pending = [e for e in renders.values() if e["teacher"] == request.teacher and e["status"] == "rendering"]
+            entry = min(pending, key=lambda e: e["turn"]) if pending else None
+        if entry is None or entry["teacher"] != request.teacher:
+            outcome["stale"] = True
+            return False
+        entry["status"] = "ready"
+        entry["clip"] = request.clip
+        entry["longcatJobId"] = request.clip.get("jobId") or None
+        entry["timestamps"].update(request.clip.get("timings") or {})
+        entry["timestamps"]["clipReadyAt"] = datetime.utcnow().isoformat()
+        outcome["dispatchedAt"] = datetime.fromisoformat(entry["timestamps"]["dispatchedAt"])
+        outcome["next"] = entry["turn"] == session["turn"] + 1
+        if outcome["next"]:
+            session["queues"][request.teacher]["status"] = "ready"
+            session["queues"][request.teacher]["nextClipId"] = request.clip.get("clipId")
+    
+    await run_store(sessions.update, session_id, mark_ready)
+    
+    if outcome.get("stale"):
+        logger.info(f"Ignoring stale clip from {request.teacher} in session {session_id} (render cancelled)")
+        if request.clip.get("jobId"):
+            # Cancelled before the worker reached LongCat; drop the video job it just queued
+            await cancel_video_jobs([request.clip["jobId"]])
+        return {"status": "ignored", "reason": "stale_render"}
+    
+    if request.clip.get("jobId"):
+        task = asyncio.create_task(time_video_render(request.clip["jobId"], outcome["dispatchedAt"]))
+        render_timings.add(task)
+        task.add_done_callback(render_timings.discard)
+    
+    # Keep the clip's audio/video on disk until the session ends
+    audio_file = (request.clip.get("audioUrl") or "").rsplit("/", 1)[-1]
+    background_tasks.add_task(
+        lease_artifacts, f"session-{session_id}",
+        [request.clip.get("jobId")], [audio_file], SESSION_IDLE_TIMEOUT * 2
+    )
+    
+    if not outcome["next"]:
+        # Pre-rendered for a later turn; announced when its turn is next
+        return {"status": "ok", "prerendered": True}
     
     # Emit CLIP_READY event
-    emit_event(session_id, "CLIP_READY", {
+    await emit_event(session_id, "CLIP_READY", {
         "teacher": request.teacher,
         "clip": request.clip
     })
@@ -307,42 +724,247 @@ async def clip_ready(session_id: str, request: ClipReadyRequest):
 @app.get("/session/{session_id}/state")
 async def get_session_state(session_id: str):
     """Get current session state"""
-    if session_id not in sessions:
+    session = await run_store(sessions.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    return session
+
+
+async def video_job_timings(job_id: str) -> Dict:
+    """Queue/run timestamps of a LongCat job (empty if LongCat can't be reached)"""
+    try:
+        response = await http_client.get(f"{LONGCAT_API_URL}/job/{job_id}")
+        if response.status_code != 200:
+            return {}
+        job = response.json()
+    except (httpx.HTTPError, ValueError):
+        return {}
+    timings = {"videoStatus": job.get("status")}
+    for field, key in (("started_at", "videoStartedAt"), ("finished_at", "videoFinishedAt")):
+        if job.get(field):
+            timings[key] = datetime.utcfromtimestamp(job[field]).isoformat()
+    return timings
+
+
+async def time_video_render(job_id: str, dispatched_at: datetime):
+    """Feed the render-time estimator with dispatch -> finished video once LongCat completes the job"""
+    deadline = time.monotonic() + RENDER_TIMING_MAX_WAIT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(RENDER_TIMING_POLL_INTERVAL)
+        timings = await video_job_timings(job_id)
+        status = timings.get("videoStatus")
+        if status == "completed":
+            # A clip-cache hit reuses a job rendered before this dispatch (or never started); skip it
+            if timings.get("videoStartedAt") and timings.get("videoFinishedAt"):
+                started_at = datetime.fromisoformat(timings["videoStartedAt"])
+                finished_at = datetime.fromisoformat(timings["videoFinishedAt"])
+                if started_at >= dispatched_at:
+                    render_timer.observe((finished_at - dispatched_at).total_seconds() * 1000)
+            return
+        if status not in (None, "processing"):
+            return  # failed, cancelled, superseded or expired: no render time to learn from
+
+
+@app.get("/session/{session_id}/jobs")
+async def list_session_jobs(session_id: str):
+    """Render job ledger: in-flight renders by target turn, plus recently retired ones"""
+    session = await run_store(sessions.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    jobs = sorted(session["renders"].values(), key=lambda e: e["turn"])
+    with_video = [e for e in jobs if e.get("longcatJobId")]
+    timings = await asyncio.gather(*(video_job_timings(e["longcatJobId"]) for e in with_video))
+    for entry, video_timings in zip(with_video, timings):
+        entry["timestamps"].update(video_timings)
+    return {
+        "sessionId": session_id,
+        "turn": session["turn"],
+        "jobs": jobs,
+        "history": session.get("jobHistory", [])
+    }
+
+
+@app.delete("/session/{session_id}/jobs/{job_id}")
+async def cancel_session_job(session_id: str, job_id: str):
+    """
+    Cancel an in-flight render (job_id is its renderId). A queued LongCat job is dropped
+    right away; one the worker hasn't submitted yet is dropped when its clip-ready arrives.
+    """
+    outcome = {}
+    
+    def cancel(session: Dict):
+        outcome.clear()
+        turn = next((t for t, e in session["renders"].items() if e["renderId"] == job_id), None)
+        if turn is None:
+            return False
+        entry = retire_render(session, turn, "cancelled")
+        session["speculation"]["cancelled"] += 1
+        if entry["turn"] == session["turn"] + 1:
+            session["queues"][entry["teacher"]]["status"] = "idle"
+            session["queues"][entry["teacher"]]["nextClipId"] = None
+        outcome["entry"] = entry
+    
+    if await run_store(sessions.update, session_id, cancel) is None:
         raise HTTPException(status_code=404, detail="Session not found")
+    if "entry" not in outcome:
+        raise HTTPException(status_code=404, detail="Job not found or already finished")
+    
+    entry = outcome["entry"]
+    video_job = entry.get("longcatJobId")
+    cancelled_video = await cancel_video_jobs([video_job]) if video_job else []
+    logger.info(f"Session {session_id}: cancelled render {job_id} (turn {entry['turn']}, {entry['teacher']})")
+    return {
+        "status": "cancelled",
+        "jobId": job_id,
+        "turn": entry["turn"],
+        "teacher": entry["teacher"],
+        "longcatJobId": video_job,
+        "videoCancelled": bool(cancelled_video)
+    }
+
+
+async def end_session(session_id: str, reason: str) -> Optional[Dict]:
+    """
+    Tear a session down: drop it from the store, cancel its debounce timer and queued
+    LongCat jobs, tell listeners (SESSION_ENDED closes their streams), release its storage
+    leases and, after a grace period, its buffered events. Returns None if already gone.
+    """
+    session = await run_store(sessions.get, session_id)
+    if session is None or not await run_store(sessions.delete, session_id):
+        return None  # Unknown, or ended concurrently (on any worker)
     
-    return sessions[session_id]
+    pending = section_timers.pop(session_id, None)
+    if pending:
+        pending.cancel()
+    await emit_event(session_id, "SESSION_ENDED", {"reason": reason, "turn": session["turn"]})
+    
+    cancelled_jobs = await cancel_session_video_jobs(session_id)
+    await release_artifacts(f"session-{session_id}")
+    asyncio.get_running_loop().call_later(SESSION_EVENT_GRACE, store_pool.submit, event_bus.forget, session_id)
+    session_counts[reason] += 1
+    logger.info(f"Session {session_id} {reason} at turn {session['turn']}, "
+                f"{len(cancelled_jobs)} queued video job(s) cancelled")
+    return {
+        "status": reason,
+        "sessionId": session_id,
+        "turn": session["turn"],
+        "rendersCancelled": len(session["renders"]),
+        "videoJobsCancelled": cancelled_jobs
+    }
+
+
+async def keep_bridging_library_pinned():
+    """Keep the bridging clips' audio/video out of reach of the TTS and LongCat storage janitors"""
+    pinned_keys, pinned_at = None, 0.0
+    while True:
+        keys = bridging_library.artifact_keys()  # reloads the manifest if it changed
+        if keys != pinned_keys or time.monotonic() - pinned_at > BRIDGING_LEASE_REFRESH:
+            if pinned_keys is not None and keys != pinned_keys:
+                await release_artifacts("bridging-library")  # drop clips no longer in the manifest
+            if await lease_artifacts("bridging-library", keys["video"], keys["audio"], BRIDGING_LEASE_TTL):
+                pinned_keys, pinned_at = keys, time.monotonic()
+                logger.info(f"Leased {len(keys['video'])} bridging videos and {len(keys['audio'])} audio files")
+        await asyncio.sleep(BRIDGING_LEASE_CHECK_INTERVAL)
+
+
+async def expire_idle_sessions():
+    """End sessions without activity for SESSION_IDLE_TIMEOUT seconds"""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        cutoff = (datetime.utcnow() - timedelta(seconds=SESSION_IDLE_TIMEOUT)).isoformat()
+        for session_id in await run_store(sessions.list_ids):
+            session = await run_store(sessions.get, session_id)
+            if session is None or session.get("lastActivityAt", session["createdAt"]) > cutoff:
+                continue
+            try:
+                await end_session(session_id, "expired")
+            except Exception as e:
+                logger.error(f"Failed to expire session {session_id}: {e}")
+
+
+@app.post("/session/{session_id}/end")
+async def end_session_endpoint(session_id: str):
+    """End a session explicitly (the UI's End Session button)"""
+    result = await end_session(session_id, "ended")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return result
+
+
+@app.get("/session/{session_id}/listeners")
+async def get_listener_stats(session_id: str):
+    """Queue depth and overflow counters for this session's SSE listeners (this worker)"""
+    if not await run_store(sessions.__contains__, session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return event_bus.listener_stats(session_id)
+
+
+def format_sse(event: Dict) -> str:
+    """SSE frame; numbered events carry an id: line so clients can resume"""
+    event_id = event.get("eventId")
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}data: {json.dumps(event)}\n\n"
 
 
 @app.get("/session/{session_id}/events")
-async def stream_events(session_id: str):
-    """SSE event stream for session"""
-    if session_id not in sessions:
+async def stream_events(session_id: str, request: Request, lastEventId: Optional[int] = None):
+    """
+    SSE event stream for session
+    Reconnecting clients send Last-Event-ID (or ?lastEventId=) and get the buffered
+    events they missed replayed before live ones
+    """
+    if not await run_store(sessions.__contains__, session_id):
         raise HTTPException(status_code=404, detail="Session not found")
     
+    last_event_id = lastEventId
+    header = request.headers.get("last-event-id")
+    if header:
+        try:
+            last_event_id = int(header)
+        except ValueError:
+            pass
+    
     async def event_generator():
-        # Create a queue for this listener
-        queue = asyncio.Queue()
-        event_streams[session_id].append(queue)
+        # Create a queue for this listener before reading the replay log so nothing falls in between
+        listener = event_bus.subscribe(session_id)
+        missed = await event_bus.recent(session_id, last_event_id) if last_event_id is not None else []
+        last_sent = missed[-1]["eventId"] if missed else 0
         
         try:
-            # Send initial connection event
-            yield f"data: {json.dumps({'type': 'CONNECTED', 'sessionId': session_id})}\n\n"
+            # Send initial connection event (unnumbered, so it doesn't move the client's position)
+            yield f"retry: {SSE_RETRY_MS}\n"
+            yield format_sse({'type': 'CONNECTED', 'sessionId': session_id, 'replayed': len(missed)})
+            
+            for event in missed:
+                yield format_sse(event)
             
             while True:
-                try:
-                    # Wait for event with timeout
-                    event = await asyncio.wait_for(queue.get(), timeout=30.0)
-                    yield f"data: {json.dumps(event)}\n\n"
-                except asyncio.TimeoutError:
+                # Wait for event with timeout
+                event = await listener.get(timeout=30.0)
+                if listener.closed:
+                    # Disconnected by the overflow policy; the client resumes via Last-Event-ID
+                    break
+                if event is None:
+                    if await request.is_disconnected():
+                        break
+                    # Stop if the session ended unnoticed (an open stream is not user activity:
+                    # the frontend's listener stays connected after the user leaves)
+                    if not await run_store(sessions.__contains__, session_id):
+                        break
                     # Send keepalive
                     yield f": keepalive\n\n"
+                    continue
+                if event["eventId"] <= last_sent:
+                    continue  # Already sent in the replay
+                last_sent = event["eventId"]
+                yield format_sse(event)
+                if event["type"] == "SESSION_ENDED":
+                    break
         finally:
             # Remove listener when disconnected
-            if session_id in event_streams:
-                try:
-                    event_streams[session_id].remove(queue)
-                except:
-                    pass
+            event_bus.unsubscribe(session_id, listener)
     
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
@@ -351,17 +973,124 @@ async def stream_events(session_id: str):
 # Helper Functions
 # ============================================================================
 
-async def enqueue_render_job(session_id: str, teacher: str, co_teacher: str):
-    """Enqueue a render job for n8n worker"""
-    if session_id not in sessions:
-        return
+def is_transient(response: Optional[httpx.Response], error: Optional[Exception]) -> bool:
+    """
+    Failures where n8n never got the job are worth retrying: connection errors, 429 and
+    gateway/unavailable responses. A read timeout is not - the webhook only responds once
+    the whole workflow has finished, so the job is already running.
+    """
+    if error is not None:
+        return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+    return response.status_code in (429, 502, 503, 504)
+
+
+async def post_with_retry(url: str, payload: Dict) -> httpx.Response:
+    """POST through the shared client, retrying transient failures with jittered backoff"""
+    client = http_client or httpx.AsyncClient(timeout=DISPATCH_TIMEOUT)  # before startup (e.g. scripts)
+    for attempt in range(DISPATCH_RETRIES + 1):
+        response, error = None, None
+        try:
+            response = await client.post(url, json=payload)
+        except Exception as e:
+            error = e
+        if attempt == DISPATCH_RETRIES or not is_transient(response, error):
+            break
+        delay = DISPATCH_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+        logger.warning(f"Dispatch to {url} failed ({error or response.status_code}), "
+                       f"retry {attempt + 1}/{DISPATCH_RETRIES} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+    if client is not http_client:
+        await client.aclose()
+    if error is not None:
+        raise error
+    return response
+
+
+async def cancel_video_jobs(job_ids: List[str]) -> List[str]:
+    """Drop LongCat jobs that are still queued; returns the ids LongCat cancelled"""
+    async def cancel(job_id: str) -> Optional[str]:
+        try:
+            response = await http_client.delete(f"{LONGCAT_API_URL}/job/{job_id}")
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not cancel LongCat job {job_id}: {e}")
+            return None
+        # 409: already running or finished, nothing left to free
+        return job_id if response.status_code == 200 else None
     
-    session = sessions[session_id]
+    results = await asyncio.gather(*(cancel(job_id) for job_id in job_ids))
+    return [job_id for job_id in results if job_id]
+
+
+async def cancel_session_video_jobs(session_id: str) -> List[str]:
+    """Drop every queued LongCat job of a session"""
+    try:
+        response = await http_client.post(f"{LONGCAT_API_URL}/jobs/cancel", json={"session_id": session_id})
+        response.raise_for_status()
+        return response.json().get("cancelled", [])
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning(f"Could not cancel LongCat jobs of session {session_id}: {e}")
+        return []
+
+
+async def lease_artifacts(owner: str, video_keys: List[str], audio_keys: List[str], ttl_seconds: float) -> bool:
+    """
+    Protect LongCat videos / TTS audio from the storage janitors until released or ttl_seconds pass
+    Returns False if either service could not be reached
+    """
+    leased = True
+    for base_url, keys in ((LONGCAT_API_URL, video_keys), (TTS_API_URL, audio_keys)):
+        keys = [key for key in keys if key]
+        if not keys:
+            continue
+        try:
+            response = await http_client.post(f"{base_url}/storage/leases", json={
+                "owner": owner,
+                "keys": keys,
+                "ttl_seconds": ttl_seconds
+            })
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not lease {owner} artifacts at {base_url}: {e}")
+            leased = False
+    return leased
+
+
+async def release_artifacts(owner: str):
+    """Hand an owner's artifacts back to the storage janitors (evicted by their normal policy)"""
+    for base_url in (LONGCAT_API_URL, TTS_API_URL):
+        try:
+            await http_client.delete(f"{base_url}/storage/leases/{owner}")
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not release {owner} artifacts at {base_url}: {e}")
+
+
+async def set_render_status(session_id: str, render_id: str, status: str):
+    """Update a ledger entry (and the teacher's queue if it is the next turn's render)"""
+    def apply(session: Dict):
+        entry = next((e for e in session["renders"].values() if e["renderId"] == render_id), None)
+        if entry is None:
+            return False
+        entry["status"] = status
+        if entry["turn"] == session["turn"] + 1:
+            session["queues"][entry["teacher"]]["status"] = status
+    await run_store(sessions.update, session_id, apply)
+
+
+async def enqueue_render_job(session_id: str, teacher: str, co_teacher: Optional[str] = None,
+                             turn: Optional[int] = None, render_id: Optional[str] = None,
+                             supersedes: Optional[List[str]] = None):
+    """Enqueue a render job for n8n worker (turn: the turn the clip will be spoken in)"""
+    session = await run_store(sessions.get, session_id)
+    if session is None:
+        return
     
     # Determine which worker (left or right)
     worker_side = "left" if teacher == session["leftTeacher"] else "right"
+    if co_teacher is None:
+        co_teacher = session["rightTeacher"] if teacher == session["leftTeacher"] else session["leftTeacher"]
     
-    # Prepare job payload
+    # Prepare job payload (priority/deadline are forwarded to LongCat's scheduler)
+    speculative = turn is not None and turn > session["turn"] + 1
     job_payload = {
         "sessionId": session_id,
         "teacher": teacher,
@@ -369,26 +1098,30 @@ async def enqueue_render_job(session_id: str, teacher: str, co_teacher: str):
         "role": "renderer" if teacher == session["renderer"] else "speaker",
         "sectionPayload": session.get("currentSnapshot", {}),
         "language": session.get("language", "English"),  # Include language preference
-        "turn": session["turn"]
+        "turn": turn if turn is not None else session["turn"],
+        "renderId": render_id,
+        "supersedes": supersedes or [],
+        "speculative": speculative,
+        "priority": RENDER_PRIORITY_SPECULATIVE if speculative else RENDER_PRIORITY_NEXT,
+        "deadline": time.time() + RENDER_DEADLINE_SECONDS if RENDER_DEADLINE_SECONDS > 0 else None
     }
     
-    # Update queue status
-    session["queues"][teacher]["status"] = "rendering"
-    
     # Call n8n worker webhook
-    worker_url = f"http://localhost:5678/webhook/worker/{worker_side}/run"
+    worker_url = f"{N8N_BASE_URL}/webhook/worker/{worker_side}/run"
     
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.post(worker_url, json=job_payload)
-            if response.status_code == 200:
-                logger.info(f"Enqueued render job for {teacher} (worker: {worker_side})")
-            else:
-                logger.error(f"Failed to enqueue render job: {response.status_code}")
-                session["queues"][teacher]["status"] = "error"
+        response = await post_with_retry(worker_url, job_payload)
+        if response.status_code == 200:
+            logger.info(f"Enqueued render job for {teacher} (worker: {worker_side})")
+        else:
+            logger.error(f"Failed to enqueue render job: {response.status_code}")
+            await set_render_status(session_id, render_id, "error")
+    except httpx.ReadTimeout:
+        # Accepted; the worker webhook answers when the clip is done (clip-ready arrives separately)
+        logger.info(f"Render job for {teacher} dispatched (worker: {worker_side}), workflow still running")
     except Exception as e:
         logger.error(f"Error enqueueing render job: {e}")
-        session["queues"][teacher]["status"] = "error"
+        await set_render_status(session_id, render_id, "error")
 
 
 if __name__ == "__main__":
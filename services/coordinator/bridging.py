@@ -0,0 +1,101 @@
+"""
+Bridging Clips
+Pre-rendered filler clips ("Great question, let me think...") played while the next
+turn is still rendering
+
+The library is a JSON manifest written offline by scripts/generate_bridging_clips.py:
+    {"teacher_a": [{"clipId", "text", "audioUrl", "videoUrl", "jobId", "audioFile", "durationMs"}, ...]}
+
+Clips are picked by estimated remaining render time: the shortest clip that covers the
+gap, so the real clip can follow as soon as it is ready.
+"""
+
+import os
+import json
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RenderTimeEstimator:
+    """Exponential moving average of dispatch -> clip-ready time"""
+
+    def __init__(self, initial_ms: float = 30000.0, alpha: float = 0.2):
+        self.estimate_ms = initial_ms
+        self.alpha = alpha
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def observe(self, duration_ms: float):
+        with self.lock:
+            if self.samples == 0:
+                self.estimate_ms = duration_ms
+            else:
+                self.estimate_ms += self.alpha * (duration_ms - self.estimate_ms)
+            self.samples += 1
+
+    def remaining_ms(self, elapsed_ms: float) -> float:
+        with self.lock:
+            return max(0.0, self.estimate_ms - elapsed_ms)
+
+
+class BridgingLibrary:
+    """Per-teacher filler clips loaded from the manifest (reloaded when it changes)"""
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self.clips: Dict[str, List[Dict]] = {}
+        self.mtime: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            return
+        if mtime == self.mtime:
+            return
+        try:
+            with open(self.manifest_path) as f:
+                clips = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable bridging clip manifest {self.manifest_path}: {e}")
+            return
+        with self.lock:
+            self.clips = {teacher: [c for c in entries if c.get("videoUrl") or c.get("audioUrl")]
+                          for teacher, entries in clips.items()}
+            self.mtime = mtime
+        logger.info(f"Loaded {sum(len(c) for c in self.clips.values())} bridging clips from {self.manifest_path}")
+
+    def choose(self, teacher: str, remaining_ms: float, avoid_clip_id: Optional[str] = None) -> Optional[Dict]:
+        """Shortest clip lasting at least remaining_ms (else the longest), avoiding an immediate repeat"""
+        self._reload()
+        with self.lock:
+            candidates = list(self.clips.get(teacher, []))
+        if len(candidates) > 1:
+            candidates = [c for c in candidates if c.get("clipId") != avoid_clip_id] or candidates
+        if not candidates:
+            return None
+        covering = [c for c in candidates if c.get("durationMs", 0) >= remaining_ms]
+        if covering:
+            clip = min(covering, key=lambda c: c.get("durationMs", 0))
+        else:
+            clip = max(candidates, key=lambda c: c.get("durationMs", 0))
+        return {**clip, "bridging": True}
+
+    def artifact_keys(self) -> Dict[str, List[str]]:
+        """LongCat job ids and TTS audio filenames to keep leased"""
+        self._reload()
+        with self.lock:
+            clips = [c for entries in self.clips.values() for c in entries]
+        return {
+            "video": [c["jobId"] for c in clips if c.get("jobId")],
+            "audio": [c["audioFile"] for c in clips if c.get("audioFile")]
+        }
+
+    def stats(self) -> Dict[str, int]:
+        self._reload()
+        with self.lock:
+            return {teacher: len(entries) for teacher, entries in self.clips.items()}
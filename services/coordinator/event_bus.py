@@ -0,0 +1,331 @@
+"""
+Event Bus
+Fans session events out to SSE listeners, across coordinator workers/replicas if needed
+
+- InProcessEventBus: listeners and buffers in this process only
+- SQLiteEventBus: events are appended to a shared SQLite log; every process tails it and
+  delivers its rows, in log order, to its own listeners
+
+Each session keeps a bounded ring buffer of its most recent events. Event ids are
+monotonically increasing (per session in-process, globally with SQLite) and are added
+to the event as "eventId".
+
+Listener queues are bounded. When a slow client's queue is full the overflow policy
+decides what happens: drop_oldest, coalesce (replace a queued state event of the same
+type, else drop oldest) or disconnect (the client reconnects and replays from its
+Last-Event-ID). Listeners that stop reading are pruned.
+
+publish/recent are coroutines: the SQLite bus runs its queries in a thread and tails the
+log from a poller thread (woken by local publishes), so the event loop never waits on the
+database. Listeners are
+only touched on the loop.
+"""
+
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+import uuid
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+# Events where only the latest one matters to a client that is behind
+STATE_EVENT_TYPES = {"SPEAKER_CHANGED", "SECTION_UPDATED"}
+
+
+class Listener:
+    """Bounded event queue for one SSE client"""
+
+    def __init__(self, maxsize: int, policy: str):
+        self.events: Deque[Dict] = deque()
+        self.maxsize = maxsize
+        self.policy = policy
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.last_read = time.time()
+
+    def offer(self, event: Dict) -> Optional[str]:
+        """Queue event; returns what overflow did ("dropped", "coalesced", "disconnected") or None"""
+        outcome = None
+        if len(self.events) >= self.maxsize:
+            if self.policy == "disconnect":
+                self.close()
+                return "disconnected"
+            outcome = "dropped"
+            if self.policy == "coalesce" and event.get("type") in STATE_EVENT_TYPES:
+                for queued in self.events:
+                    if queued.get("type") == event["type"]:
+                        self.events.remove(queued)
+                        outcome = "coalesced"
+                        break
+            if outcome == "dropped":
+                self.events.popleft()
+        self.events.append(event)
+        self.ready.set()
+        return outcome
+
+    async def get(self, timeout: float) -> Optional[Dict]:
+        """Next event, or None on timeout or once the listener is closed"""
+        if not self.events and not self.closed:
+            self.ready.clear()
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.last_read = time.time()
+        if self.closed or not self.events:
+            return None
+        return self.events.popleft()
+
+    def close(self):
+        self.closed = True
+        self.events.clear()
+        self.ready.set()
+
+
+class EventBus:
+    """Local listener fan-out shared by the bus backends"""
+
+    def __init__(self, buffer_size: int = 200, queue_size: int = 100,
+                 overflow_policy: str = "drop_oldest", stale_seconds: float = 120.0):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown listener overflow policy: {overflow_policy}")
+        self.buffer_size = buffer_size
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.stale_seconds = stale_seconds
+        self.listeners: Dict[str, List[Listener]] = defaultdict(list)
+        # session_id -> {"dropped", "coalesced", "disconnected", "pruned"}
+        self.counters: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"dropped": 0, "coalesced": 0, "disconnected": 0, "pruned": 0}
+        )
+
+    def subscribe(self, session_id: str) -> Listener:
+        listener = Listener(self.queue_size, self.overflow_policy)
+        self.listeners[session_id].append(listener)
+        return listener
+
+    def unsubscribe(self, session_id: str, listener: Listener):
+        listeners = self.listeners.get(session_id)
+        if listeners and listener in listeners:
+            listeners.remove(listener)
+        if session_id in self.listeners and not self.listeners[session_id]:
+            del self.listeners[session_id]
+
+    def listener_count(self, session_id: Optional[str] = None) -> int:
+        if session_id is not None:
+            return len(self.listeners.get(session_id, []))
+        return sum(len(listeners) for listeners in self.listeners.values())
+
+    def _deliver(self, session_id: str, event: Dict):
+        now = time.time()
+        for listener in list(self.listeners.get(session_id, [])):
+            # A client that has a backlog but hasn't read for stale_seconds is gone
+            if listener.events and now - listener.last_read > self.stale_seconds:
+                listener.close()
+                self.unsubscribe(session_id, listener)
+                self.counters[session_id]["pruned"] += 1
+                logger.warning(f"Pruned stalled event listener for session {session_id}")
+                continue
+            outcome = listener.offer(event)
+            if outcome:
+                self.counters[session_id][outcome] += 1
+            if outcome == "disconnected":
+                self.unsubscribe(session_id, listener)
+                logger.warning(f"Disconnected slow event listener for session {session_id}")
+
+    def listener_stats(self, session_id: str) -> Dict:
+        """Queue depths and overflow counters for one session's listeners"""
+        depths = [len(listener.events) for listener in self.listeners.get(session_id, [])]
+        return {
+            "listeners": len(depths),
+            "queueDepths": depths,
+            "maxQueueDepth": max(depths, default=0),
+            "queueSize": self.queue_size,
+            "overflowPolicy": self.overflow_policy,
+            **self.counters.get(session_id, {"dropped": 0, "coalesced": 0, "disconnected": 0, "pruned": 0})
+        }
+
+    async def publish(self, session_id: str, event: Dict) -> Dict:
+        """Assign the next id, buffer the event and deliver it; returns the stored event"""
+        raise NotImplementedError
+
+    async def recent(self, session_id: str, after_id: Optional[int] = None) -> List[Dict]:
+        """Buffered events for session_id, oldest first (only those after after_id if given)"""
+        raise NotImplementedError
+
+    def forget(self, session_id: str):
+        """Drop the buffered events (and id counter) of a finished session; may block"""
+        raise NotImplementedError
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class InProcessEventBus(EventBus):
+    """Single-process bus (the coordinator's original behaviour, plus ids and buffers)"""
+
+    def __init__(self, buffer_size: int = 200, **listener_options):
+        super().__init__(buffer_size, **listener_options)
+        self.buffers: Dict[str, Deque[Dict]] = {}
+        self.next_ids: Dict[str, int] = defaultdict(lambda: 1)
+        self.lock = threading.Lock()
+
+    async def publish(self, session_id: str, event: Dict) -> Dict:
+        with self.lock:
+            event = {**event, "eventId": self.next_ids[session_id]}
+            self.next_ids[session_id] += 1
+            self.buffers.setdefault(session_id, deque(maxlen=self.buffer_size)).append(event)
+        self._deliver(session_id, event)
+        return event
+
+    async def recent(self, session_id: str, after_id: Optional[int] = None) -> List[Dict]:
+        with self.lock:
+            events = list(self.buffers.get(session_id, ()))
+        return [e for e in events if after_id is None or e["eventId"] > after_id]
+
+    def forget(self, session_id: str):
+        with self.lock:
+            self.buffers.pop(session_id, None)
+            self.next_ids.pop(session_id, None)
+        self.counters.pop(session_id, None)
+
+
+class SQLiteEventBus(EventBus):
+    """Shared event log; processes publish locally and tail each other's rows"""
+
+    def __init__(self, db_path: str, buffer_size: int = 200, poll_interval: float = 0.1, **listener_options):
+        super().__init__(buffer_size, **listener_options)
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.origin = uuid.uuid4().hex  # which process wrote a row
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=10.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                origin TEXT NOT NULL,
+                data TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_events_session ON events(session_id, id);
+            """
+        )
+        self.last_seen = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        # Every event, this process's included, reaches listeners through the poller in log
+        # order: clients skip ids below one they've seen, so a local event must never
+        # overtake a lower-id row another process committed first
+        self.poll_thread: Optional[threading.Thread] = None
+        self.wake = threading.Event()  # set by publish to poll right away
+        self.stopping = threading.Event()
+
+    def _append(self, session_id: str, event: Dict) -> Dict:
+        """Write event to the log and trim the session's buffer; returns it with its id"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.execute(
+                    "INSERT INTO events (session_id, origin, data, created_at) VALUES (?, ?, '', ?)",
+                    (session_id, self.origin, time.time())
+                )
+                event = {**event, "eventId": cursor.lastrowid}
+                self.conn.execute("UPDATE events SET data = ? WHERE id = ?", (json.dumps(event), cursor.lastrowid))
+                # Keep only the newest buffer_size events of this session
+                self.conn.execute(
+                    "DELETE FROM events WHERE session_id = ? AND id <= ("
+                    "SELECT id FROM events WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (session_id, session_id, self.buffer_size)
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return event
+
+    async def publish(self, session_id: str, event: Dict) -> Dict:
+        event = await asyncio.to_thread(self._append, session_id, event)
+        self.wake.set()
+        return event
+
+    def _read(self, session_id: str, after_id: Optional[int]) -> List[Dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT data FROM events WHERE session_id = ? AND id > ? ORDER BY id",
+                (session_id, after_id or 0)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    async def recent(self, session_id: str, after_id: Optional[int] = None) -> List[Dict]:
+        return await asyncio.to_thread(self._read, session_id, after_id)
+
+    def forget(self, session_id: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM events WHERE session_id = ?", (session_id,))
+        self.counters.pop(session_id, None)
+
+    def _poll_once(self) -> List[tuple]:
+        """Rows committed since the last poll (by any process), as (session_id, event), in id order"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, session_id, origin, data FROM events WHERE id > ? ORDER BY id",
+                (self.last_seen,)
+            ).fetchall()
+        if rows:
+            self.last_seen = rows[-1][0]
+        return [(session_id, data) for _, session_id, _, data in rows]
+
+    def _deliver_rows(self, events: List[tuple]):
+        for session_id, data in events:
+            if session_id in self.listeners:
+                self._deliver(session_id, json.loads(data))
+
+    def _poll_loop(self, loop: asyncio.AbstractEventLoop):
+        """Poller thread: tail the log and hand new rows to the event loop for delivery"""
+        while not self.stopping.is_set():
+            self.wake.wait(self.poll_interval)
+            self.wake.clear()
+            try:
+                events = self._poll_once()
+            except Exception as e:
+                logger.error(f"Event bus poll failed: {e}")
+                continue
+            if events:
+                loop.call_soon_threadsafe(self._deliver_rows, events)
+
+    async def start(self):
+        self.stopping.clear()
+        self.poll_thread = threading.Thread(
+            target=self._poll_loop, args=(asyncio.get_running_loop(),), name="event-bus-poller", daemon=True
+        )
+        self.poll_thread.start()
+        logger.info(f"Event bus: SQLite log at {self.db_path} (poll {self.poll_interval}s)")
+
+    async def stop(self):
+        if self.poll_thread:
+            self.stopping.set()
+            self.wake.set()
+            await asyncio.to_thread(self.poll_thread.join)
+            self.poll_thread = None
+
+
+def create_event_bus(backend: str, db_path: str, buffer_size: int, poll_interval: float,
+                     **listener_options) -> EventBus:
+    """EVENT_BUS=memory|sqlite; listener_options: queue_size, overflow_policy, stale_seconds"""
+    if backend == "memory":
+        return InProcessEventBus(buffer_size, **listener_options)
+    if backend == "sqlite":
+        return SQLiteEventBus(db_path, buffer_size, poll_interval, **listener_options)
+    raise ValueError(f"Unknown EVENT_BUS backend: {backend}")
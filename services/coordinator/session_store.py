@@ -0,0 +1,163 @@
+"""
+Session Store
+Where the coordinator keeps classroom session state
+
+- MemorySessionStore: process-local dict (single uvicorn worker, lost on restart)
+- SQLiteSessionStore: WAL-mode SQLite file shared by every worker/replica on the host
+  and durable across restarts
+
+Every session carries a "version" that is bumped on each write. compare_and_set only
+writes if the stored version still matches, and update() retries a mutation on conflict,
+so turn swaps stay atomic when several processes handle the same session.
+"""
+
+import copy
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# update() gives up after this many lost compare-and-set races
+MAX_CAS_RETRIES = 16
+
+
+class SessionStore:
+    """Interface shared by the session store backends"""
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def create(self, session: Dict):
+        raise NotImplementedError
+
+    def compare_and_set(self, session_id: str, expected_version: int, session: Dict) -> bool:
+        """Store session only if the stored version is still expected_version"""
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def list_ids(self) -> List[str]:
+        raise NotImplementedError
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __len__(self) -> int:
+        return len(self.list_ids())
+
+    def update(self, session_id: str, mutate: Callable[[Dict], Optional[bool]]) -> Optional[Dict]:
+        """
+        Apply mutate to a copy of the session and write it back atomically.
+        mutate returns False to abort without writing. Returns the stored session
+        (the unchanged one on abort), or None if the session does not exist.
+        """
+        for _ in range(MAX_CAS_RETRIES):
+            session = self.get(session_id)
+            if session is None:
+                return None
+            version = session.get("version", 0)
+            updated = copy.deepcopy(session)
+            if mutate(updated) is False:
+                return session
+            updated["version"] = version + 1
+            if self.compare_and_set(session_id, version, updated):
+                return updated
+        raise RuntimeError(f"Session {session_id} update lost {MAX_CAS_RETRIES} concurrent races")
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store (the coordinator's original behaviour)"""
+
+    def __init__(self):
+        self.sessions: Dict[str, Dict] = {}
+        self.lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self.lock:
+            session = self.sessions.get(session_id)
+            return copy.deepcopy(session) if session is not None else None
+
+    def create(self, session: Dict):
+        with self.lock:
+            self.sessions[session["sessionId"]] = copy.deepcopy({**session, "version": 0})
+
+    def compare_and_set(self, session_id: str, expected_version: int, session: Dict) -> bool:
+        with self.lock:
+            current = self.sessions.get(session_id)
+            if current is None or current.get("version", 0) != expected_version:
+                return False
+            self.sessions[session_id] = copy.deepcopy(session)
+            return True
+
+    def delete(self, session_id: str) -> bool:
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def list_ids(self) -> List[str]:
+        with self.lock:
+            return list(self.sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Durable store; safe to share between processes on one host"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=10.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def create(self, session: Dict):
+        session = {**session, "version": 0}
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, version, data, updated_at) VALUES (?, 0, ?, ?)",
+                (session["sessionId"], json.dumps(session), time.time())
+            )
+
+    def compare_and_set(self, session_id: str, expected_version: int, session: Dict) -> bool:
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE sessions SET version = ?, data = ?, updated_at = ? WHERE session_id = ? AND version = ?",
+                (session["version"], json.dumps(session), time.time(), session_id, expected_version)
+            )
+        return cursor.rowcount == 1
+
+    def delete(self, session_id: str) -> bool:
+        with self.lock:
+            cursor = self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+        return cursor.rowcount == 1
+
+    def list_ids(self) -> List[str]:
+        with self.lock:
+            rows = self.conn.execute("SELECT session_id FROM sessions").fetchall()
+        return [r[0] for r in rows]
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store(backend: str, db_path: str) -> SessionStore:
+    """SESSION_STORE=memory|sqlite"""
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        logger.info(f"Session store: SQLite at {db_path}")
+        return SQLiteSessionStore(db_path)
+    raise ValueError(f"Unknown SESSION_STORE backend: {backend}")
@@ -3,29 +3,44 @@ LongCat-Video-Avatar API Service
 Wraps LongCat-Video-Avatar pipeline for HTTP API access
 
 Memory Management:
-- Queue system: Only 1 video generation at a time (prevents concurrent model loads)
-- Process monitoring: Track and kill stuck processes
+- Queue system: Event-driven scheduler, GPU_SLOT_CONCURRENCY jobs per GPU slot (default 1)
+- Device pool: LONGCAT_DEVICES split into slots of CONTEXT_PARALLEL_SIZE GPUs
+- Warm worker: Pipeline is loaded once in a supervised worker process (see worker.py)
+- Process monitoring: Track and kill stuck processes (one-shot subprocess mode)
 - Explicit cleanup: Clear GPU memory after each job
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import os
 import sys
 import json
 import uuid
+import shutil
 import subprocess
 import tempfile
 import signal
 import psutil
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Dict, List
+from urllib.parse import urlparse, unquote
 import asyncio
 import logging
-from collections import deque
 import threading
 import time
+import httpx
+
+from worker import WorkerSupervisor, WorkerError
+from scheduler import JobScheduler
+from clip_cache import ClipCache
+from streaming import SegmentStream
+from job_store import JobStore
+
+# Shared helpers live in services/shared (copied to /app/shared in Docker images)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.static_media import media_response
+from shared.storage_janitor import StorageJanitor, storage_router
 
 app = FastAPI(title="LongCat-Video-Avatar Service")
 
@@ -42,6 +57,19 @@ else:
 CONTEXT_PARALLEL_SIZE = int(os.getenv("CONTEXT_PARALLEL_SIZE", "1"))
 RESOLUTION = os.getenv("RESOLUTION", "480p")
 NUM_SEGMENTS = int(os.getenv("NUM_SEGMENTS", "1"))
+GENERATION_TIMEOUT = int(os.getenv("GENERATION_TIMEOUT", "3600"))  # 1 hour
+# "persistent": keep the pipeline loaded in a warm worker; "subprocess": torchrun per job
+WORKER_MODE = os.getenv("LONGCAT_WORKER_MODE", "persistent")
+# "longcat" for the real model, "fake" for the CPU-only test pipeline
+LONGCAT_PIPELINE = os.getenv("LONGCAT_PIPELINE", "longcat")
+# Shared-volume audio handoff: URLs served by the local TTS service are read straight from its AUDIO_DIR
+PROJECT_ROOT = Path(__file__).parent.parent.parent.resolve()
+TTS_AUDIO_DIR = os.path.realpath(os.getenv("TTS_AUDIO_DIR", str(PROJECT_ROOT / "outputs" / "tts")))
+LOCAL_AUDIO_HOSTS = set(os.getenv("LOCAL_AUDIO_HOSTS", "localhost,127.0.0.1,0.0.0.0").split(","))
+AUDIO_DOWNLOAD_TIMEOUT = float(os.getenv("AUDIO_DOWNLOAD_TIMEOUT", "60"))
+CLIP_CACHE_ENABLED = os.getenv("CLIP_CACHE_ENABLED", "1") == "1"
+CLIP_CACHE_MAX_ENTRIES = int(os.getenv("CLIP_CACHE_MAX_ENTRIES", "500"))
+CLIP_CACHE_MAX_BYTES = int(os.getenv("CLIP_CACHE_MAX_BYTES", str(20 * 1024 ** 3)))  # 20 GB
 
 # Teacher mapping
 TEACHER_IMAGES = {
@@ -71,6 +99,17 @@ class GenerateRequest(BaseModel):
     text_prompt: Optional[str] = None  # Optional text prompt override
     resolution: Optional[str] = "480p"  # "480p" or "720p"
     num_segments: Optional[int] = 1  # Number of video segments
+    priority: Optional[int] = 0  # Higher runs first (e.g. next speaker turn > stale re-render)
+    deadline: Optional[float] = None  # Unix timestamp; queued jobs past it are dropped
+    session_id: Optional[str] = None
+    turn: Optional[int] = None  # The session turn the clip is for (reported in /status)
+    render_id: Optional[str] = None  # The coordinator's render this job is for
+    supersedes: Optional[List[str]] = None  # Render ids this job replaces; their queued jobs are dropped
+    use_cache: Optional[bool] = True  # Reuse an identical finished clip if one exists
+
+
+class CancelRequest(BaseModel):
+    session_id: str  # Cancel every queued job of this session
 
 
 class GenerateResponse(BaseModel):
@@ -80,14 +119,61 @@ class GenerateResponse(BaseModel):
     status: str = "processing"
 
 
-# Job tracking
-jobs = {}
+# Job tracking (SQLite, survives restarts)
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(OUTPUT_DIR, "jobs.db"))
+jobs = JobStore(JOB_DB_PATH)
+
+# HLS segment streams of running jobs (playback can start before the whole video is done);
+# finished streams are dropped from here and served from stream_{job_id} on disk
+streams: Dict[str, SegmentStream] = {}
+
+# Finished clips keyed by content hash (avatar, audio, prompt, resolution, segments);
+# eviction skips videos the storage janitor protects (janitor is defined below)
+clip_cache = ClipCache(
+    os.path.join(OUTPUT_DIR, "clip_cache.json"),
+    max_entries=CLIP_CACHE_MAX_ENTRIES,
+    max_bytes=CLIP_CACHE_MAX_BYTES,
+    protect=lambda: janitor.protected_keys()
+)
+
+# Storage budgets for OUTPUT_DIR (videos, streams, scratch dirs); queued/running jobs and
+# leased keys (e.g. a live session's job ids) are never evicted
+VIDEO_STORAGE_MAX_BYTES = int(os.getenv("VIDEO_STORAGE_MAX_BYTES", str(50 * 1024 ** 3)))
+VIDEO_STORAGE_TTL_HOURS = float(os.getenv("VIDEO_STORAGE_TTL_HOURS", "72"))
+STORAGE_JANITOR_INTERVAL = float(os.getenv("STORAGE_JANITOR_INTERVAL", "300"))
+STORAGE_JANITOR_MIN_AGE = float(os.getenv("STORAGE_JANITOR_MIN_AGE", "600"))  # seconds a new file is kept regardless
+
+# Queue system: each GPU slot runs GPU_SLOT_CONCURRENCY jobs at a time (default 1)
+GPU_SLOT_CONCURRENCY = int(os.getenv("GPU_SLOT_CONCURRENCY", "1"))
+
+
+def build_device_slots(devices: str, group_size: int) -> Dict[str, str]:
+    """Split the device list into slots of CONTEXT_PARALLEL_SIZE devices: slot name -> CUDA_VISIBLE_DEVICES"""
+    device_ids = [d.strip() for d in devices.split(",") if d.strip()]
+    group_size = max(1, group_size)
+    slots = {}
+    for start in range(0, len(device_ids) - group_size + 1, group_size):
+        group = device_ids[start:start + group_size]
+        slots[f"gpu{'+'.join(group)}"] = ",".join(group)
+    if not slots:
+        raise ValueError(f"LONGCAT_DEVICES={devices!r} has fewer than {group_size} devices")
+    return slots
 
-# Queue system: Only allow 1 video generation at a time
-generation_queue = deque()
-generation_lock = threading.Lock()
-current_generation = None  # Track current generation process
-current_generation_pid = None  # Track PID for cleanup
+
+# Device pool: GPU 1 by default (GPU 0 is shared with other services); e.g. "0,1,2,3" for 4 slots
+LONGCAT_DEVICES = os.getenv("LONGCAT_DEVICES", "1")
+DEVICE_SLOTS = build_device_slots(LONGCAT_DEVICES, CONTEXT_PARALLEL_SIZE)
+
+
+def slot_of(lane: str) -> str:
+    """Lanes are named "<slot>" or "<slot>/<n>" when a slot runs several jobs"""
+    return lane.split("/")[0]
+
+# Warm worker supervisors, one per scheduler lane (created on first job)
+warm_workers: Dict[str, WorkerSupervisor] = {}
+warm_worker_lock = threading.Lock()
+fallback_jobs = {"count": 0}  # jobs run as one-shot subprocesses because the warm worker was down
 
 
 def cleanup_gpu_memory():
@@ -131,71 +217,144 @@ def kill_stuck_processes():
         logger.warning(f"Error killing stuck processes: {e}")
 
 
-def process_generation_queue():
-    """Process the generation queue (runs in background thread)"""
-    global current_generation, current_generation_pid
-    
-    while True:
-        try:
-            with generation_lock:
-                if not generation_queue or current_generation is not None:
-                    time.sleep(1)
-                    continue
-                
-                # Get next job from queue
-                job_data = generation_queue.popleft()
-                current_generation = job_data
-                current_generation_pid = None
-            
-            # Process the job
-            job_id = job_data['job_id']
-            logger.info(f"Processing queued job {job_id}")
-            
+def kill_process_tree(pid: int):
+    """Kill one generation process and its torchrun children (leaves other slots alone)"""
+    try:
+        parent = psutil.Process(pid)
+        for proc in parent.children(recursive=True) + [parent]:
             try:
-                # Run generation
-                generate_video_background_sync(
-                    job_id,
-                    job_data['input_json_path'],
-                    job_data['audio_path'],
-                    job_data['resolution'],
-                    job_data['num_segments']
-                )
-            finally:
-                # Cleanup after job completes
-                with generation_lock:
-                    current_generation = None
-                    current_generation_pid = None
-                
-                # Clear GPU memory
-                cleanup_gpu_memory()
-                
-                # Kill any stuck processes
-                kill_stuck_processes()
-                
-                logger.info(f"Job {job_id} completed, queue has {len(generation_queue)} items remaining")
+                proc.kill()
+            except psutil.NoSuchProcess:
+                pass
+    except psutil.NoSuchProcess:
+        pass
+
+
+def run_queued_job(job_data: Dict, lane: str):
+    """Run one scheduled job on a lane (called from scheduler threads)"""
+    try:
+        generate_video_background_sync(
+            job_data['job_id'],
+            job_data['input_json_path'],
+            job_data['audio_path'],
+            job_data['resolution'],
+            job_data['num_segments'],
+            lane
+        )
+    finally:
+        # Clear GPU memory
+        cleanup_gpu_memory()
         
-        except Exception as e:
-            logger.error(f"Error in queue processor: {e}", exc_info=True)
-            with generation_lock:
-                current_generation = None
-                current_generation_pid = None
-            time.sleep(1)
+        # Kill any stuck one-shot processes (warm workers are supervised separately).
+        # The sweep matches every slot's processes, so only use it with a single lane.
+        if len(scheduler.lanes) == 1 and (WORKER_MODE != "persistent" or any(w.failed for w in warm_workers.values())):
+            kill_stuck_processes()
+
 
+def drop_queued_job(job_data: Dict, reason: str):
+    """Mark a job that was superseded, expired or cancelled in the queue and remove its inputs"""
+    job_id = job_data['job_id']
+    jobs.update(job_id, status=reason, error=f"Job {reason} before generation started", finished_at=time.time())
+    try:
+        os.remove(job_data['input_json_path'])
+    except OSError:
+        pass
+    release_audio(job_data['audio_path'])
+
+
+# Start scheduler lanes (event-driven, no polling)
+scheduler = JobScheduler(
+    run_queued_job,
+    slots=list(DEVICE_SLOTS),
+    concurrency=GPU_SLOT_CONCURRENCY,
+    on_drop=drop_queued_job,
+    drop_expired=os.getenv("DROP_EXPIRED_JOBS", "1") == "1"
+)
+scheduler.start()
+
+
+def resolve_local_audio(audio_url: str) -> Optional[str]:
+    """Map a TTS /audio/ URL (or file path) on this host to the file in TTS_AUDIO_DIR"""
+    parsed = urlparse(audio_url)
+    if parsed.scheme in ("http", "https"):
+        if parsed.hostname not in LOCAL_AUDIO_HOSTS or not parsed.path.startswith("/audio/"):
+            return None
+        candidate = os.path.join(TTS_AUDIO_DIR, unquote(os.path.basename(parsed.path)))
+    elif parsed.scheme in ("", "file"):
+        candidate = unquote(parsed.path)
+    else:
+        return None
+    
+    candidate = os.path.realpath(candidate)
+    if os.path.dirname(candidate) != TTS_AUDIO_DIR or not os.path.isfile(candidate):
+        return None
+    return candidate
 
-# Start queue processor thread
-queue_thread = threading.Thread(target=process_generation_queue, daemon=True)
-queue_thread.start()
+
+async def fetch_audio(audio_url: str, job_id: str) -> str:
+    """
+    Get a local path for the job's audio without blocking the event loop.
+    Local TTS files are hard-linked (or used in place); remote URLs are streamed to a temp file.
+    """
+    local_path = resolve_local_audio(audio_url)
+    if local_path:
+        link_path = os.path.join(OUTPUT_DIR, f"audio_{job_id}{os.path.splitext(local_path)[1]}")
+        try:
+            os.link(local_path, link_path)
+            logger.info(f"Audio handoff: hard-linked {local_path} -> {link_path}")
+            return link_path
+        except OSError as e:
+            logger.info(f"Audio handoff: using {local_path} in place (hard link failed: {e})")
+            return local_path
+    
+    audio_temp = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
+    try:
+        async with httpx.AsyncClient(timeout=AUDIO_DOWNLOAD_TIMEOUT) as client:
+            async with client.stream("GET", audio_url) as response:
+                if response.status_code != 200:
+                    raise HTTPException(status_code=400, detail=f"Failed to download audio from {audio_url}")
+                async for chunk in response.aiter_bytes():
+                    audio_temp.write(chunk)
+    except httpx.HTTPError as e:
+        audio_temp.close()
+        os.remove(audio_temp.name)
+        raise HTTPException(status_code=400, detail=f"Failed to download audio from {audio_url}: {e}")
+    except HTTPException:
+        audio_temp.close()
+        os.remove(audio_temp.name)
+        raise
+    audio_temp.close()
+    return audio_temp.name
+
+
+def release_audio(audio_path: str):
+    """Remove a job's audio copy/link, never the TTS service's own file"""
+    if os.path.dirname(os.path.realpath(audio_path)) == TTS_AUDIO_DIR:
+        return
+    try:
+        os.remove(audio_path)
+    except OSError:
+        pass
+
+
+def warm_worker_errors() -> Dict[str, str]:
+    """Lanes whose warm worker gave up (jobs there reload the checkpoint every time)"""
+    return {lane: worker.last_error for lane, worker in warm_workers.items() if worker.failed}
 
 
 @app.get("/")
 async def root():
+    worker_errors = warm_worker_errors()
     return {
         "service": "LongCat-Video-Avatar",
-        "status": "ready",
+        "status": "degraded" if worker_errors else "ready",
         "checkpoint_dir": CHECKPOINT_DIR,
         "resolution": RESOLUTION,
-        "queue_size": len(generation_queue),
-        "current_generation": current_generation['job_id'] if current_generation else None
+        "queue_size": scheduler.queue_size(),
+        "current_generation": next(iter(scheduler.running_job_ids()), None),
+        "worker_mode": WORKER_MODE,
+        "warm_worker_errors": worker_errors or None,
+        "fallback_jobs": fallback_jobs["count"]
     }
 
 
@@ -203,17 +362,130 @@ async def root():
 async def status():
     """Check service status and model availability"""
     model_exists = os.path.exists(CHECKPOINT_DIR)
+    worker_errors = warm_worker_errors()
+    jobs_by_status = await asyncio.to_thread(jobs.count_by_status)
     return {
-        "status": "ready" if model_exists else "models_not_found",
+        "status": "models_not_found" if not model_exists else "degraded" if worker_errors else "ready",
         "model_path": CHECKPOINT_DIR,
         "model_exists": model_exists,
         "output_dir": OUTPUT_DIR,
-        "active_jobs": len([j for j in jobs.values() if j["status"] == "processing"]),
-        "queue_size": len(generation_queue),
-        "current_generation": current_generation['job_id'] if current_generation else None
+        "active_jobs": jobs_by_status.get("processing", 0),
+        "jobs_by_status": jobs_by_status,
+        "queue_size": scheduler.queue_size(),
+        "current_generation": next(iter(scheduler.running_job_ids()), None),
+        "device_slots": DEVICE_SLOTS,
+        "scheduler": scheduler.stats(),
+        "clip_cache": clip_cache.stats() if CLIP_CACHE_ENABLED else None,
+        "storage": janitor.status(),
+        "worker_mode": WORKER_MODE,
+        "workers": {lane: worker.status() for lane, worker in warm_workers.items()},
+        "warm_worker_errors": worker_errors or None,
+        "fallback_jobs": fallback_jobs["count"]
     }
 
 
+def active_job_keys() -> set:
+    """Job ids the janitor must not touch (queued or running)"""
+    return set(jobs.active_ids()) | set(scheduler.running_job_ids())
+
+
+janitor = StorageJanitor(
+    "longcat",
+    OUTPUT_DIR,
+    max_bytes=VIDEO_STORAGE_MAX_BYTES,
+    ttl_seconds=VIDEO_STORAGE_TTL_HOURS * 3600,
+    interval=STORAGE_JANITOR_INTERVAL,
+    min_age_seconds=STORAGE_JANITOR_MIN_AGE,
+    exclude=["jobs.db*", "clip_cache.json*"],
+    protect=active_job_keys
+)
+app.include_router(storage_router(janitor))
+
+
+@app.on_event("startup")
+async def start_janitor():
+    janitor.start()
+    clip_cache.start()
+
+
+@app.on_event("shutdown")
+async def flush_clip_cache():
+    clip_cache.flush()
+
+
+def stream_dir(job_id: str) -> str:
+    return os.path.join(OUTPUT_DIR, f"stream_{job_id}")
+
+
+def get_stream(job_id: str) -> Optional[SegmentStream]:
+    """A running job's stream, else the one its run left on disk (None if it never published)"""
+    stream = streams.get(job_id)
+    if stream is None:
+        stream = SegmentStream.from_disk(job_id, stream_dir(job_id))
+    return stream
+
+
+@app.on_event("startup")
+async def close_interrupted_streams():
+    """Close playlists left open when the previous process stopped mid-job (re-queued jobs start over)"""
+    for name in os.listdir(OUTPUT_DIR):
+        job_id = name[len("stream_"):]
+        if not name.startswith("stream_") or job_id in streams:
+            continue
+        stream = SegmentStream.from_disk(job_id, stream_dir(job_id))
+        job = await asyncio.to_thread(jobs.get, job_id)
+        if stream and not stream.finished and (job is None or job["status"] != "processing"):
+            stream.finish()
+
+
+def requeue_unfinished_jobs() -> int:
+    """Re-queue jobs that were queued or running when the service last stopped; returns how many"""
+    recovered = 0
+    for job in jobs.unfinished():
+        job_data = job["job_data"]
+        if not job_data or not os.path.exists(job_data["input_json_path"]) or not os.path.exists(job_data["audio_path"]):
+            jobs.update(job["job_id"], status="failed", error="Job inputs lost across service restart",
+                        finished_at=time.time())
+            continue
+        if job["started_at"]:
+            logger.info(f"Job {job['job_id']} was interrupted mid-generation, re-queueing")
+        rejected = scheduler.submit(job_data)
+        if rejected:
+            drop_queued_job(job_data, rejected)
+        else:
+            recovered += 1
+    return recovered
+
+
+@app.on_event("startup")
+async def recover_queued_jobs():
+    """Re-queue jobs that were queued or running when the service last stopped"""
+    recovered = await asyncio.to_thread(requeue_unfinished_jobs)
+    if recovered:
+        logger.info(f"✅ Recovered {recovered} queued jobs from {JOB_DB_PATH}")
+
+
+@app.on_event("startup")
+async def preload_worker():
+    """Load the pipeline before the first job arrives"""
+    if WORKER_MODE == "persistent" and os.getenv("LONGCAT_WORKER_PRELOAD", "1") == "1":
+        def preload(lane: str):
+            try:
+                get_warm_worker(lane).ensure_started()
+            except WorkerError as e:
+                logger.error(f"❌ Warm worker {lane} failed to load, jobs will reload the checkpoint "
+                             f"in one-shot subprocesses (status: degraded): {e}")
+        for lane in scheduler.lanes:
+            threading.Thread(target=preload, args=(lane,), daemon=True).start()
+
+
+@app.on_event("shutdown")
+async def shutdown_worker():
+    """Stop the warm worker so it does not outlive the API process"""
+    for worker in warm_workers.values():
+        worker.stop()
+
+
 @app.post("/generate", response_model=GenerateResponse)
 async def generate_video(request: GenerateRequest, background_tasks: BackgroundTasks):
     """
@@ -256,17 +528,31 @@ async def generate_video(request: GenerateRequest, background_tasks: BackgroundT
         # Create output directory
         os.makedirs(OUTPUT_DIR, exist_ok=True)
         
-        # Download audio file
-        import requests
-        audio_response = requests.get(request.audio_url)
-        if audio_response.status_code != 200:
-            raise HTTPException(status_code=400, detail=f"Failed to download audio from {request.audio_url}")
+        # Get audio: shared-volume handoff for local TTS files, async streaming download otherwise
+        audio_path = await fetch_audio(request.audio_url, job_id)
         
-        # Save audio to temp file
-        audio_temp = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        audio_temp.write(audio_response.content)
-        audio_temp.close()
-        audio_path = audio_temp.name
+        # Serve identical requests from the clip cache
+        cache_key = None
+        if CLIP_CACHE_ENABLED and request.use_cache:
+            cache_key = await asyncio.to_thread(
+                clip_cache.make_key,
+                avatar_path, audio_path, text_prompt,
+                request.resolution, request.num_segments, LONGCAT_PIPELINE
+            )
+            cached = clip_cache.get(cache_key)
+            if cached:
+                release_audio(audio_path)
+                cached_job_id = cached["job_id"]
+                if not await asyncio.to_thread(jobs.__contains__, cached_job_id):
+                    await asyncio.to_thread(jobs.create, cached_job_id, "completed", avatar_id=request.avatar_id,
+                                            output_path=cached["path"], finished_at=time.time())
+                logger.info(f"Clip cache hit for job {job_id}: reusing {cached_job_id}")
+                return GenerateResponse(
+                    video_url=f"/video/{cached_job_id}",
+                    video_path=cached["path"],
+                    job_id=cached_job_id,
+                    status="completed"
+                )
         
         # Create input JSON for LongCat-Video
         input_json_path = os.path.join(OUTPUT_DIR, f"input_{job_id}.json")
@@ -281,29 +567,46 @@ async def generate_video(request: GenerateRequest, background_tasks: BackgroundT
         with open(input_json_path, 'w') as f:
             json.dump(input_data, f)
         
-        # Track job
-        jobs[job_id] = {
-            "status": "processing",
+        # Add to queue instead of starting immediately
+        job_data = {
+            "job_id": job_id,
+            "input_json_path": input_json_path,
+            "audio_path": audio_path,
+            "resolution": request.resolution,
+            "num_segments": request.num_segments,
             "avatar_id": request.avatar_id,
-            "output_path": None
+            "priority": request.priority,
+            "deadline": request.deadline,
+            "session_id": request.session_id,
+            "turn": request.turn,
+            "render_id": request.render_id,
+            "supersedes": request.supersedes or []
         }
         
-        # Add to queue instead of starting immediately
-        with generation_lock:
-            generation_queue.append({
-                "job_id": job_id,
-                "input_json_path": input_json_path,
-                "audio_path": audio_path,
-                "resolution": request.resolution,
-                "num_segments": request.num_segments
-            })
-            logger.info(f"Job {job_id} added to queue (queue size: {len(generation_queue)})")
+        # Track job
+        await asyncio.to_thread(
+            jobs.create, job_id, "processing", job_data=job_data,
+            avatar_id=request.avatar_id,
+            session_id=request.session_id,
+            turn=request.turn,
+            priority=request.priority,
+            deadline=request.deadline,
+            cache_key=cache_key
+        )
+        
+        # Submitting may drop superseded queued jobs, which updates the store and removes their inputs
+        rejected = await asyncio.to_thread(scheduler.submit, job_data)
+        if rejected:
+            logger.info(f"Job {job_id} rejected: render {request.render_id} was already superseded")
+            await asyncio.to_thread(drop_queued_job, job_data, rejected)
+        else:
+            logger.info(f"Job {job_id} added to queue (queue size: {scheduler.queue_size()})")
         
         return GenerateResponse(
             video_url=f"/video/{job_id}",
             video_path=f"{OUTPUT_DIR}/video_{job_id}.mp4",
             job_id=job_id,
-            status="processing"
+            status=rejected or "processing"
         )
     
     except HTTPException:
@@ -317,188 +620,278 @@ async def generate_video(request: GenerateRequest, background_tasks: BackgroundT
         raise HTTPException(status_code=500, detail=f"Video generation failed: {str(e)}")
 
 
+def resolve_python_executable() -> str:
+    """Pick the Python that has LongCat-Video's dependencies (conda env, not the API venv)"""
+    # CRITICAL: Use conda Python explicitly, not venv Python
+    # Check if we're in conda environment
+    python_exe = sys.executable
+    conda_prefix = os.getenv("CONDA_PREFIX", "")
+    
+    # If we're in conda, use conda Python explicitly
+    if conda_prefix and "longcat-video" in conda_prefix:
+        # We're in conda environment, use it
+        conda_python = os.path.join(conda_prefix, "bin", "python")
+        if os.path.exists(conda_python):
+            python_exe = conda_python
+            logger.info(f"Using conda Python: {python_exe}")
+        else:
+            logger.warning(f"Conda Python not found at {conda_python}, using {python_exe}")
+    else:
+        # Try to find conda Python from CONDA_DEFAULT_ENV
+        conda_env = os.getenv("CONDA_DEFAULT_ENV", "")
+        if conda_env == "longcat-video":
+            conda_base = os.getenv("CONDA_BASE", os.path.expanduser("~/.conda"))
+            conda_python = os.path.join(conda_base, "envs", "longcat-video", "bin", "python")
+            if os.path.exists(conda_python):
+                python_exe = conda_python
+                logger.info(f"Found conda Python via CONDA_DEFAULT_ENV: {python_exe}")
+            else:
+                logger.warning(f"Conda Python not found, using {python_exe}")
+        else:
+            logger.warning(f"Not in conda longcat-video environment (CONDA_DEFAULT_ENV={conda_env}), using {python_exe}")
+    
+    return python_exe
+
+
+def build_generation_env(lane: str) -> dict:
+    """Environment shared by the torchrun subprocess and the warm worker, pinned to the lane's GPUs"""
+    env = os.environ.copy()
+    env["PYTHONPATH"] = f"{LONGCAT_VIDEO_DIR}:{env.get('PYTHONPATH', '')}"
+    env["LONGCAT_VIDEO_DIR"] = LONGCAT_VIDEO_DIR
+    env["CHECKPOINT_DIR"] = CHECKPOINT_DIR
+    env["CONTEXT_PARALLEL_SIZE"] = str(CONTEXT_PARALLEL_SIZE)
+    # Pin to the slot's GPUs and enable memory optimization
+    env["CUDA_VISIBLE_DEVICES"] = DEVICE_SLOTS[slot_of(lane)]
+    env["PYTORCH_CUDA_ALLOC_CONF"] = "expandable_segments:True"  # Help with memory fragmentation
+    return env
+
+
+def get_warm_worker(lane: str) -> WorkerSupervisor:
+    """Create the lane's warm worker supervisor on first use and start its health monitor"""
+    with warm_worker_lock:
+        if lane not in warm_workers:
+            warm_worker = WorkerSupervisor(
+                name=lane.replace("/", "_"),
+                python_exe=resolve_python_executable(),
+                pipeline=LONGCAT_PIPELINE,
+                env=build_generation_env(lane),
+                cwd=LONGCAT_VIDEO_DIR if os.path.isdir(LONGCAT_VIDEO_DIR) else None,
+                nproc=CONTEXT_PARALLEL_SIZE if LONGCAT_PIPELINE == "longcat" else 1
+            )
+            threading.Thread(target=warm_worker.monitor, daemon=True).start()
+            warm_workers[lane] = warm_worker
+        return warm_workers[lane]
+
+
+def find_output_video(job_output_dir: str) -> Optional[str]:
+    """
+    Locate the MP4 produced for a job (top level first, then subdirectories); the newest
+    save wins, as the script re-saves the growing video after each continuation segment
+    """
+    saved = [os.path.join(job_output_dir, file) for file in os.listdir(job_output_dir) if file.endswith(".mp4")]
+    if saved:
+        return max(saved, key=os.path.getmtime)
+    
+    for root, dirs, files in os.walk(job_output_dir):
+        for file in files:
+            if file.endswith(".mp4"):
+                return os.path.join(root, file)
+    return None
+
+
+def run_generation_warm(job_id: str, input_json_path: str, job_output_dir: str, resolution: str, num_segments: int, lane: str, stream: SegmentStream) -> Optional[str]:
+    """
+    Run a job on the lane's warm worker.
+    Returns an error message, or None on success. Raises WorkerError if the worker is unavailable.
+    """
+    worker = get_warm_worker(lane)
+    worker.ensure_started()
+    scheduler.set_pid(lane, worker.pid)
+    logger.info(f"Dispatching job {job_id} to warm worker {lane} (PID: {worker.pid})")
+    
+    result = worker.run_job({
+        "job_id": job_id,
+        "input_json_path": input_json_path,
+        "output_dir": job_output_dir,
+        "resolution": resolution,
+        "num_segments": num_segments
+    }, timeout=GENERATION_TIMEOUT, on_segment=lambda message: stream.publish(message["index"], message["path"]))
+    
+    if not result.get("ok"):
+        return result.get("error", "Generation failed")
+    return None
+
+
+def run_generation_subprocess(job_id: str, input_json_path: str, job_output_dir: str, resolution: str, num_segments: int, lane: str) -> Optional[str]:
+    """
+    Run a job in a one-shot torchrun subprocess (reloads the checkpoint every time).
+    Returns an error message, or None on success.
+    """
+    # Build command - use python -m torch.distributed.run to ensure correct environment
+    script_path = os.path.join(LONGCAT_VIDEO_DIR, "run_demo_avatar_single_audio_to_video.py")
+    
+    # Verify script file exists
+    if not os.path.exists(script_path):
+        error_msg = f"LongCat-Video script not found: {script_path}\n"
+        error_msg += f"LONGCAT_VIDEO_DIR: {LONGCAT_VIDEO_DIR}\n"
+        error_msg += f"Directory exists: {os.path.exists(LONGCAT_VIDEO_DIR)}\n"
+        if os.path.exists(LONGCAT_VIDEO_DIR):
+            error_msg += f"Files in directory: {', '.join(os.listdir(LONGCAT_VIDEO_DIR)[:10])}\n"
+        error_msg += "\nTo fix this, run:\n"
+        error_msg += "  bash scripts/clone_longcat_video.sh"
+        logger.error(error_msg)
+        return error_msg
+    
+    python_exe = resolve_python_executable()
+    
+    cmd = [
+        python_exe,
+        "-m", "torch.distributed.run",
+        f"--nproc_per_node={CONTEXT_PARALLEL_SIZE}",
+        script_path,
+        f"--context_parallel_size={CONTEXT_PARALLEL_SIZE}",
+        f"--checkpoint_dir={CHECKPOINT_DIR}",
+        "--stage_1=ai2v",  # Audio-Image-to-Video
+        f"--input_json={input_json_path}",
+        f"--output_dir={job_output_dir}",
+        f"--resolution={resolution}",
+        f"--num_segments={num_segments}"
+    ]
+    
+    # Set environment
+    env = build_generation_env(lane)
+    
+    # Run generation
+    logger.info(f"Running command: {' '.join(cmd)}")
+    logger.info(f"Working directory: {LONGCAT_VIDEO_DIR}")
+    logger.info(f"Python executable: {python_exe}")
+    logger.info(f"CONDA_PREFIX: {os.getenv('CONDA_PREFIX', 'not set')}")
+    logger.info(f"CONDA_DEFAULT_ENV: {os.getenv('CONDA_DEFAULT_ENV', 'not set')}")
+    
+    # Start process and track PID
+    process = subprocess.Popen(
+        cmd,
+        cwd=LONGCAT_VIDEO_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True
+    )
+    
+    scheduler.set_pid(lane, process.pid)
+    logger.info(f"Started generation process with PID: {process.pid}")
+    
+    # Wait for completion with timeout
+    try:
+        stdout, stderr = process.communicate(timeout=GENERATION_TIMEOUT)
+        returncode = process.returncode
+    except subprocess.TimeoutExpired:
+        logger.error(f"Generation timeout for job {job_id}, killing process {process.pid}")
+        kill_process_tree(process.pid)
+        process.wait()
+        return "Generation timeout"
+    
+    if returncode != 0:
+        error_msg = f"Generation failed with exit code {returncode}"
+        if stdout:
+            logger.error(f"STDOUT: {stdout}")
+            error_msg += f"\nSTDOUT: {stdout[-2000:]}"  # Last 2000 chars
+        if stderr:
+            logger.error(f"STDERR: {stderr}")
+            error_msg += f"\nSTDERR: {stderr[-2000:]}"  # Last 2000 chars
+        logger.error(f"Full error: {error_msg}")
+        return error_msg
+    
+    return None
+
+
 def generate_video_background_sync(
     job_id: str,
     input_json_path: str,
     audio_path: str,
     resolution: str,
-    num_segments: int
+    num_segments: int,
+    lane: str
 ):
     """
-    Synchronous video generation (called from queue processor)
+    Synchronous video generation (called from a scheduler lane)
     """
-    global current_generation_pid
-    
+    job_output_dir = os.path.join(OUTPUT_DIR, f"job_{job_id}")
+    stream = None
     try:
         logger.info(f"Starting video generation for job {job_id}")
+        jobs.update(job_id, started_at=time.time())
         
         # Prepare output directory
-        job_output_dir = os.path.join(OUTPUT_DIR, f"job_{job_id}")
         os.makedirs(job_output_dir, exist_ok=True)
+        stream = streams[job_id] = SegmentStream(job_id, stream_dir(job_id))
         
-        # Build command - use python -m torch.distributed.run to ensure correct environment
-        script_path = os.path.join(LONGCAT_VIDEO_DIR, "run_demo_avatar_single_audio_to_video.py")
-        
-        # Verify script file exists
-        if not os.path.exists(script_path):
-            error_msg = f"LongCat-Video script not found: {script_path}\n"
-            error_msg += f"LONGCAT_VIDEO_DIR: {LONGCAT_VIDEO_DIR}\n"
-            error_msg += f"Directory exists: {os.path.exists(LONGCAT_VIDEO_DIR)}\n"
-            if os.path.exists(LONGCAT_VIDEO_DIR):
-                error_msg += f"Files in directory: {', '.join(os.listdir(LONGCAT_VIDEO_DIR)[:10])}\n"
-            error_msg += "\nTo fix this, run:\n"
-            error_msg += "  bash scripts/clone_longcat_video.sh"
-            logger.error(error_msg)
-            jobs[job_id]["status"] = "failed"
-            jobs[job_id]["error"] = error_msg
-            return
-        
-        # CRITICAL: Use conda Python explicitly, not venv Python
-        # Check if we're in conda environment
-        python_exe = sys.executable
-        conda_prefix = os.getenv("CONDA_PREFIX", "")
-        
-        # If we're in conda, use conda Python explicitly
-        if conda_prefix and "longcat-video" in conda_prefix:
-            # We're in conda environment, use it
-            conda_python = os.path.join(conda_prefix, "bin", "python")
-            if os.path.exists(conda_python):
-                python_exe = conda_python
-                logger.info(f"Using conda Python: {python_exe}")
-            else:
-                logger.warning(f"Conda Python not found at {conda_python}, using {python_exe}")
-        else:
-            # Try to find conda Python from CONDA_DEFAULT_ENV
-            conda_env = os.getenv("CONDA_DEFAULT_ENV", "")
-            if conda_env == "longcat-video":
-                conda_base = os.getenv("CONDA_BASE", os.path.expanduser("~/.conda"))
-                conda_python = os.path.join(conda_base, "envs", "longcat-video", "bin", "python")
-                if os.path.exists(conda_python):
-                    python_exe = conda_python
-                    logger.info(f"Found conda Python via CONDA_DEFAULT_ENV: {python_exe}")
-                else:
-                    logger.warning(f"Conda Python not found, using {python_exe}")
-            else:
-                logger.warning(f"Not in conda longcat-video environment (CONDA_DEFAULT_ENV={conda_env}), using {python_exe}")
-        
-        cmd = [
-            python_exe,
-            "-m", "torch.distributed.run",
-            f"--nproc_per_node={CONTEXT_PARALLEL_SIZE}",
-            script_path,
-            f"--context_parallel_size={CONTEXT_PARALLEL_SIZE}",
-            f"--checkpoint_dir={CHECKPOINT_DIR}",
-            "--stage_1=ai2v",  # Audio-Image-to-Video
-            f"--input_json={input_json_path}",
-            f"--output_dir={job_output_dir}",
-            f"--resolution={resolution}",
-            f"--num_segments={num_segments}"
-        ]
-        
-        # Set environment
-        env = os.environ.copy()
-        env["PYTHONPATH"] = f"{LONGCAT_VIDEO_DIR}:{env.get('PYTHONPATH', '')}"
-        # Set CUDA device to GPU 1 (which is empty) and memory optimization
-        env["CUDA_VISIBLE_DEVICES"] = "1"  # Use GPU 1 instead of GPU 0
-        env["PYTORCH_CUDA_ALLOC_CONF"] = "expandable_segments:True"  # Help with memory fragmentation
-        
-        # Run generation
-        logger.info(f"Running command: {' '.join(cmd)}")
-        logger.info(f"Working directory: {LONGCAT_VIDEO_DIR}")
-        logger.info(f"Python executable: {python_exe}")
-        logger.info(f"CONDA_PREFIX: {os.getenv('CONDA_PREFIX', 'not set')}")
-        logger.info(f"CONDA_DEFAULT_ENV: {os.getenv('CONDA_DEFAULT_ENV', 'not set')}")
-        
-        # Start process and track PID
-        process = subprocess.Popen(
-            cmd,
-            cwd=LONGCAT_VIDEO_DIR,
-            env=env,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        
-        current_generation_pid = process.pid
-        logger.info(f"Started generation process with PID: {current_generation_pid}")
-        
-        # Wait for completion with timeout
-        try:
-            stdout, stderr = process.communicate(timeout=3600)  # 1 hour timeout
-            returncode = process.returncode
-        except subprocess.TimeoutExpired:
-            logger.error(f"Generation timeout for job {job_id}, killing process {process.pid}")
-            process.kill()
-            process.wait()
-            jobs[job_id]["status"] = "failed"
-            jobs[job_id]["error"] = "Generation timeout"
-            return
+        error = None
+        ran_warm = False
+        if WORKER_MODE == "persistent":
+            try:
+                error = run_generation_warm(job_id, input_json_path, job_output_dir, resolution, num_segments, lane, stream)
+                ran_warm = True
+            except WorkerError as e:
+                fallback_jobs["count"] += 1
+                logger.error(f"Warm worker unavailable ({e}), falling back to one-shot subprocess")
+        if not ran_warm:
+            error = run_generation_subprocess(job_id, input_json_path, job_output_dir, resolution, num_segments, lane)
         
-        if returncode != 0:
-            error_msg = f"Generation failed with exit code {returncode}"
-            if stdout:
-                logger.error(f"STDOUT: {stdout}")
-                error_msg += f"\nSTDOUT: {stdout[-2000:]}"  # Last 2000 chars
-            if stderr:
-                logger.error(f"STDERR: {stderr}")
-                error_msg += f"\nSTDERR: {stderr[-2000:]}"  # Last 2000 chars
-            logger.error(f"Full error: {error_msg}")
-            jobs[job_id]["status"] = "failed"
-            jobs[job_id]["error"] = error_msg
+        if error:
+            jobs.update(job_id, status="failed", error=error, finished_at=time.time())
             return
         
         # Find output video
-        output_video = None
-        for file in os.listdir(job_output_dir):
-            if file.endswith(".mp4"):
-                output_video = os.path.join(job_output_dir, file)
-                break
-        
-        if not output_video:
-            # Try to find in subdirectories
-            for root, dirs, files in os.walk(job_output_dir):
-                for file in files:
-                    if file.endswith(".mp4"):
-                        output_video = os.path.join(root, file)
-                        break
-                if output_video:
-                    break
+        output_video = find_output_video(job_output_dir)
         
         if output_video:
-            # Copy to final location
+            # Move to final location (same filesystem, so no copy)
             final_video = os.path.join(OUTPUT_DIR, f"video_{job_id}.mp4")
-            import shutil
-            shutil.copy2(output_video, final_video)
+            try:
+                os.replace(output_video, final_video)
+            except OSError:
+                shutil.copy2(output_video, final_video)
             
-            jobs[job_id]["status"] = "completed"
-            jobs[job_id]["output_path"] = final_video
+            jobs.update(job_id, status="completed", output_path=final_video, finished_at=time.time())
             logger.info(f"Video generation completed: {final_video}")
+            
+            cache_key = jobs.get(job_id)["cache_key"]
+            if cache_key:
+                clip_cache.put(cache_key, job_id, final_video)
+            
+            # Pipelines without segment callbacks publish the whole video as one segment
+            if not stream.segments:
+                stream.publish(0, final_video)
         else:
             logger.error(f"No output video found in {job_output_dir}")
-            jobs[job_id]["status"] = "failed"
-            jobs[job_id]["error"] = "No output video generated"
-        
-        # Cleanup temp files
-        try:
-            os.remove(input_json_path)
-            os.remove(audio_path)
-        except:
-            pass
+            jobs.update(job_id, status="failed", error="No output video generated", finished_at=time.time())
     
     except Exception as e:
         logger.error(f"Error in background generation: {e}", exc_info=True)
-        jobs[job_id]["status"] = "failed"
-        jobs[job_id]["error"] = str(e)
+        jobs.update(job_id, status="failed", error=str(e), finished_at=time.time())
+    
+    finally:
+        # Close the playlist (served from disk from now on) and clean up temp files, whatever
+        # the outcome (published segments are hardlinks or remuxed copies, so the scratch dir can go)
+        if stream is not None:
+            stream.finish()
+            streams.pop(job_id, None)
+        try:
+            os.remove(input_json_path)
+        except OSError:
+            pass
+        shutil.rmtree(job_output_dir, ignore_errors=True)
+        release_audio(audio_path)
 
 
 @app.get("/video/{job_id}")
-async def get_video(job_id: str):
+async def get_video(job_id: str, request: Request):
     """Stream generated video"""
-    if job_id not in jobs:
+    job = await asyncio.to_thread(jobs.get, job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    job = jobs[job_id]
-    
     if job["status"] == "processing":
         return JSONResponse(
             status_code=202,
@@ -508,20 +901,87 @@ async def get_video(job_id: str):
     if job["status"] == "failed":
         raise HTTPException(status_code=500, detail=job.get("error", "Generation failed"))
     
+    if job["status"] in ("superseded", "expired", "cancelled"):
+        raise HTTPException(status_code=410, detail=job.get("error", f"Job {job['status']}"))
+    
     video_path = job.get("output_path")
     if not video_path or not os.path.exists(video_path):
         raise HTTPException(status_code=404, detail="Video not found")
     
-    return FileResponse(video_path, media_type="video/mp4")
+    return media_response(request, video_path, "video/mp4")
+
+
+@app.get("/video/{job_id}/playlist.m3u8")
+async def get_playlist(job_id: str, request: Request):
+    """HLS event playlist of the segments finished so far"""
+    job = await asyncio.to_thread(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    stream = get_stream(job_id)
+    if not stream or not stream.contiguous():
+        if job["status"] != "processing":
+            raise HTTPException(status_code=404, detail=f"No segments published (job {job['status']})")
+        return JSONResponse(
+            status_code=202,
+            content={"status": job["status"], "message": "No segments ready yet"}
+        )
+    
+    return media_response(request, stream.playlist_path, "application/vnd.apple.mpegurl", immutable=False)
+
+
+@app.get("/video/{job_id}/segment/{index}")
+async def get_segment(job_id: str, index: int, request: Request):
+    """Serve one published segment"""
+    stream = get_stream(job_id)
+    segment_path = stream.segment_path(index) if stream else None
+    if not segment_path or not os.path.exists(segment_path):
+        raise HTTPException(status_code=404, detail="Segment not found")
+    
+    media_type = "video/mp2t" if segment_path.endswith(".ts") else "video/mp4"
+    return media_response(request, segment_path, media_type)
+
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 50, offset: int = 0, status: Optional[str] = None, session_id: Optional[str] = None):
+    """Paginated job listing, newest first"""
+    limit = max(1, min(limit, 500))
+    return await asyncio.to_thread(jobs.list, limit=limit, offset=max(0, offset), status=status, session_id=session_id)
 
 
 @app.get("/job/{job_id}")
 async def get_job_status(job_id: str):
     """Get job status"""
-    if job_id not in jobs:
+    job = await asyncio.to_thread(jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    stream = get_stream(job_id)
+    if stream:
+        job.update(stream.status())
+        job["playlist_url"] = f"/video/{job_id}/playlist.m3u8"
+    return job
+
+
+@app.delete("/job/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a queued job (a running or finished job can no longer be cancelled)"""
+    job = await asyncio.to_thread(jobs.get, job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    return jobs[job_id]
+    if await asyncio.to_thread(scheduler.cancel, job_id=job_id):
+        return {"job_id": job_id, "status": "cancelled"}
+    if job["status"] == "cancelled":
+        return {"job_id": job_id, "status": "cancelled"}
+    raise HTTPException(status_code=409, detail=f"Job is not queued (status: {job['status']})")
+
+
+@app.post("/jobs/cancel")
+async def cancel_session_jobs(request: CancelRequest):
+    """Cancel all queued jobs of a session (e.g. when the classroom session ends)"""
+    cancelled = await asyncio.to_thread(scheduler.cancel, session_id=request.session_id)
+    return {"session_id": request.session_id, "cancelled": cancelled}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,186 @@
+"""
+Content-Addressed Clip Cache
+Reuses finished videos when the same teacher says the same line again
+
+Key: sha256 of (avatar image bytes, audio bytes, text_prompt, resolution, num_segments, pipeline)
+Entries point at the final video_{job_id}.mp4 files in OUTPUT_DIR; the index is a JSON file
+next to them. Least-recently-used entries (and their videos) are evicted once the entry or
+byte budget is exceeded, except videos the storage janitor protects (leased by a session or
+the bridging library). Hits only touch memory; last-used times are flushed to the index
+every save_interval seconds.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Callable, Optional, Dict, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """sha256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ClipCache:
+    """LRU clip cache persisted as a JSON index under OUTPUT_DIR"""
+
+    def __init__(self, index_path: str, max_entries: int = 500, max_bytes: int = 20 * 1024 ** 3,
+                 protect: Optional[Callable[[], Set[str]]] = None, save_interval: float = 30):
+        self.index_path = index_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.protect = protect
+        self.save_interval = save_interval
+        self.dirty = False
+        self.lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}  # key -> {"job_id", "path", "size", "created", "last_used"}
+        self.image_hashes: Dict[str, Tuple[float, int, str]] = {}  # path -> (mtime, size, sha256)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path) as f:
+                entries = json.load(f)
+            self.entries = {k: v for k, v in entries.items() if os.path.exists(v.get("path", ""))}
+            logger.info(f"Loaded clip cache index with {len(self.entries)} entries")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable clip cache index {self.index_path}: {e}")
+
+    def _save(self):
+        """Write the index atomically (caller holds the lock)"""
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.index_path)
+        self.dirty = False
+
+    def flush(self):
+        """Persist last-used times recorded by hits since the last save"""
+        with self.lock:
+            if self.dirty:
+                self._save()
+
+    def run(self):
+        """Flush loop (runs in a daemon thread)"""
+        while True:
+            time.sleep(self.save_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning(f"Could not save clip cache index {self.index_path}: {e}")
+
+    def start(self):
+        threading.Thread(target=self.run, name="clip-cache-flush", daemon=True).start()
+
+    def _image_hash(self, path: str) -> str:
+        """Avatar images rarely change, so reuse the hash while mtime/size match"""
+        stat = os.stat(path)
+        cached = self.image_hashes.get(path)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+        digest = hash_file(path)
+        self.image_hashes[path] = (stat.st_mtime, stat.st_size, digest)
+        return digest
+
+    def make_key(self, avatar_path: str, audio_path: str, text_prompt: str,
+                 resolution: str, num_segments: int, pipeline: str) -> str:
+        parts = [
+            self._image_hash(avatar_path),
+            hash_file(audio_path),
+            text_prompt or "",
+            resolution or "",
+            str(num_segments),
+            pipeline
+        ]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the entry for key (and mark it recently used), or None on a miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and not os.path.exists(entry["path"]):
+                del self.entries[key]
+                self.dirty = True
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            entry["last_used"] = time.time()
+            self.dirty = True
+            return dict(entry)
+
+    def put(self, key: str, job_id: str, path: str):
+        """Record a finished video and evict LRU entries beyond the budgets"""
+        with self.lock:
+            now = time.time()
+            self.entries[key] = {
+                "job_id": job_id,
+                "path": path,
+                "size": os.path.getsize(path),
+                "created": now,
+                "last_used": now
+            }
+            self._evict(keep=key)
+            self._save()
+
+    def _protected_keys(self) -> Optional[Set[str]]:
+        """The janitor's protected keys, or None if they can't be read (then no file is deleted)"""
+        if not self.protect:
+            return set()
+        try:
+            return self.protect()
+        except Exception as e:
+            logger.warning(f"Could not read protected clips, evicting index entries only: {e}")
+            return None
+
+    def _evict(self, keep: Optional[str] = None):
+        """Drop least-recently-used entries other than keep until within budget (caller holds the lock)"""
+        total = sum(e["size"] for e in self.entries.values())
+        if len(self.entries) <= self.max_entries and total <= self.max_bytes:
+            return
+        protected = self._protected_keys()
+        for key, entry in sorted(self.entries.items(), key=lambda item: item[1]["last_used"]):
+            if len(self.entries) <= self.max_entries and total <= self.max_bytes:
+                break
+            name = os.path.basename(entry["path"])
+            if key == keep or (protected and any(k in name for k in protected)):
+                continue  # Leased (live session, bridging library): stays cached and on disk
+            del self.entries[key]
+            total -= entry["size"]
+            self.evictions += 1
+            if protected is None:
+                continue  # The janitor removes the file by its own policy
+            try:
+                os.remove(entry["path"])
+            except OSError:
+                pass
+            logger.info(f"Evicted cached clip {entry['job_id']} ({entry['size']} bytes)")
+
+    def stats(self) -> Dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": sum(e["size"] for e in self.entries.values()),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,136 @@
+"""
+Durable Job Store
+SQLite (WAL mode) table of LongCat-Video jobs so status survives service restarts
+
+- One row per job: status, output path, error, scheduling fields and timings
+- job_data keeps the queued payload so unfinished jobs can be re-queued on startup
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = (
+    "job_id", "status", "avatar_id", "session_id", "turn", "priority", "deadline",
+    "output_path", "error", "cache_key", "created_at", "started_at", "finished_at"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    avatar_id TEXT,
+    session_id TEXT,
+    turn INTEGER,
+    priority INTEGER,
+    deadline REAL,
+    output_path TEXT,
+    error TEXT,
+    cache_key TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    job_data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs(session_id);
+"""
+
+
+class JobStore:
+    """Thread-safe SQLite job table"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        return {column: row[column] for column in COLUMNS}
+
+    def create(self, job_id: str, status: str, job_data: Optional[Dict] = None, **fields):
+        fields = {k: v for k, v in fields.items() if k in COLUMNS}
+        fields.update(job_id=job_id, status=status, created_at=fields.get("created_at") or time.time())
+        names = list(fields) + ["job_data"]
+        values = list(fields.values()) + [json.dumps(job_data) if job_data else None]
+        with self.lock:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO jobs ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                values
+            )
+
+    def update(self, job_id: str, **fields):
+        fields = {k: v for k, v in fields.items() if k in COLUMNS and k != "job_id"}
+        if not fields:
+            return
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", list(fields.values()) + [job_id])
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._row(row)
+
+    def __contains__(self, job_id: str) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)).fetchone() is not None
+
+    def list(self, limit: int = 50, offset: int = 0, status: Optional[str] = None,
+             session_id: Optional[str] = None) -> Dict:
+        """Newest-first page of jobs with the total matching count"""
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if session_id:
+            where.append("session_id = ?")
+            params.append(session_id)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        with self.lock:
+            total = self.conn.execute(f"SELECT COUNT(*) FROM jobs {clause}", params).fetchone()[0]
+            rows = self.conn.execute(
+                f"SELECT * FROM jobs {clause} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                params + [limit, offset]
+            ).fetchall()
+        return {"jobs": [self._row(r) for r in rows], "total": total, "limit": limit, "offset": offset}
+
+    def count_by_status(self) -> Dict[str, int]:
+        with self.lock:
+            rows = self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def unfinished(self) -> List[Dict]:
+        """Jobs that were queued or running when the service stopped, oldest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT job_id, job_data, started_at FROM jobs WHERE status = 'processing' ORDER BY created_at"
+            ).fetchall()
+        return [
+            {"job_id": r["job_id"], "started_at": r["started_at"],
+             "job_data": json.loads(r["job_data"]) if r["job_data"] else None}
+            for r in rows
+        ]
+
+    def active_ids(self) -> List[str]:
+        """Job ids still queued or running"""
+        with self.lock:
+            rows = self.conn.execute("SELECT job_id FROM jobs WHERE status = 'processing'").fetchall()
+        return [r["job_id"] for r in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,226 @@
+"""
+LongCat-Video-Avatar Worker Adapter
+Default LONGCAT_WORKER_ENTRYPOINT for the warm worker (see worker.py)
+
+The upstream demo script (run_demo_avatar_single_audio_to_video.py, cloned by
+scripts/clone_longcat_video.sh) loads every model and runs one job per invocation. This
+adapter imports it once and runs its generate(args) for each job in the same process,
+with from_pretrained memoized for transformers/diffusers models, tokenizers, processors
+and feature extractors: the tokenizer, text encoder, VAE, wav2vec and DiT weights are read
+from CHECKPOINT_DIR on the first job (or the warm-up job) and reused by every job after it.
+Process-group setup is made idempotent so the script can initialize it on every call.
+
+Reused instances are the ones the previous job left behind, so this relies on the script
+only doing per-run things to them that are idempotent (.to(device, dtype), .eval(),
+requires_grad_(False)). A checkout that mutates them differently per run (offload hooks,
+fusing/unloading LoRA, deleting submodules) needs LONGCAT_WORKER_MEMOIZE=0: jobs then
+reload the weights but still skip the import and CUDA/process-group startup.
+
+While a job runs, a SegmentWatcher publishes every video the script saves under the job's
+output_dir (one per generated segment) through on_segment, so playback can start after the
+first segment instead of the whole video.
+"""
+
+import os
+import sys
+import socket
+import logging
+import tempfile
+import importlib
+import threading
+from typing import Callable, Dict, List, Optional
+
+from streaming import probe_duration, cut_tail
+
+logger = logging.getLogger(__name__)
+
+LONGCAT_SCRIPT = os.getenv("LONGCAT_SCRIPT", "run_demo_avatar_single_audio_to_video")
+# Optional input json (cond_image/cond_audio/prompt) run once at startup so the weights
+# are resident before the first real job; without it the first job pays the load
+WARMUP_INPUT_JSON = os.getenv("LONGCAT_WORKER_WARMUP_JSON", "")
+# What the script's saves hold: "cumulative" (every save has all frames so far, the
+# continuation loop re-saving the growing video) or "separate" (one file per segment)
+SEGMENT_OUTPUT = os.getenv("LONGCAT_SEGMENT_OUTPUT", "cumulative")
+SEGMENT_POLL_INTERVAL = float(os.getenv("LONGCAT_SEGMENT_POLL_INTERVAL", "1.0"))
+MEMOIZE_MODELS = os.getenv("LONGCAT_WORKER_MEMOIZE", "1") == "1"
+
+_loaded_models: Dict[tuple, object] = {}
+
+
+def _memoize_from_pretrained(base: type):
+    """Make base.from_pretrained (and inherited uses of it) return the instance loaded first"""
+    original = base.from_pretrained.__func__
+
+    def from_pretrained(cls, *args, **kwargs):
+        key = (cls, repr(args), repr(sorted(kwargs.items())))
+        if key not in _loaded_models:
+            _loaded_models[key] = original(cls, *args, **kwargs)
+        return _loaded_models[key]
+
+    base.from_pretrained = classmethod(from_pretrained)
+
+
+def _make_process_group_reusable():
+    """The script sets up (and may tear down) the process group per run; keep the first one"""
+    import torch.distributed as dist
+
+    init_process_group = dist.init_process_group
+
+    def init_once(*args, **kwargs):
+        if not dist.is_initialized():
+            init_process_group(*args, **kwargs)
+
+    dist.init_process_group = init_once
+    dist.destroy_process_group = lambda *args, **kwargs: None
+
+
+def _single_process_env():
+    """Without torchrun (context_parallel_size 1) the script still reads the rank variables"""
+    if "RANK" in os.environ:
+        return
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    os.environ.update(RANK="0", LOCAL_RANK="0", WORLD_SIZE="1", MASTER_ADDR="127.0.0.1", MASTER_PORT=str(port))
+
+
+class AvatarPipeline:
+    """The imported demo script plus the settings every job shares"""
+
+    def __init__(self, script, checkpoint_dir: str, context_parallel_size: int):
+        self.script = script
+        self.checkpoint_dir = checkpoint_dir
+        self.context_parallel_size = context_parallel_size
+        self.jobs_done = 0
+
+    def args(self, input_json_path: str, output_dir: str, resolution: str, num_segments: int):
+        """Parse the same flags the one-shot torchrun command passes (see run_generation_subprocess)"""
+        argv = [
+            f"{LONGCAT_SCRIPT}.py",
+            f"--context_parallel_size={self.context_parallel_size}",
+            f"--checkpoint_dir={self.checkpoint_dir}",
+            "--stage_1=ai2v",
+            f"--input_json={input_json_path}",
+            f"--output_dir={output_dir}",
+            f"--resolution={resolution}",
+            f"--num_segments={num_segments}"
+        ]
+        saved_argv = sys.argv
+        sys.argv = argv
+        try:
+            return self.script._parse_args()
+        finally:
+            sys.argv = saved_argv
+
+
+class SegmentWatcher:
+    """
+    Publishes the videos the script saves under output_dir, in order, as stream segments.
+    A save counts as finished once its size held for a poll and ffprobe can read it; for
+    cumulative saves only the part after what was already published is cut out and sent.
+    """
+
+    def __init__(self, output_dir: str, on_segment: Callable[[int, str], None]):
+        self.output_dir = output_dir
+        self.on_segment = on_segment
+        self.segment_dir = os.path.join(output_dir, "segments")
+        self.sizes: Dict[str, int] = {}
+        self.seen = set()
+        self.index = 0
+        self.published_seconds = 0.0
+        self.broken = False
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="segment-watcher", daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stopping.set()
+        self.thread.join()
+        if exc_type is None:
+            self._scan(final=True)  # the last save finished with the job
+
+    def _run(self):
+        while not self.stopping.wait(SEGMENT_POLL_INTERVAL):
+            try:
+                self._scan(final=False)
+            except Exception as e:
+                logger.warning(f"Segment watcher scan failed: {e}")
+
+    def _saved_videos(self) -> List[str]:
+        """Unpublished videos under output_dir (not our segments dir), oldest first"""
+        found = []
+        for root, dirs, files in os.walk(self.output_dir):
+            dirs[:] = [d for d in dirs if os.path.join(root, d) != self.segment_dir]
+            found += [os.path.join(root, name) for name in files
+                      if name.endswith(".mp4") and os.path.join(root, name) not in self.seen]
+        return sorted(found, key=os.path.getmtime)
+
+    def _scan(self, final: bool):
+        for path in self._saved_videos():
+            size = os.path.getsize(path)
+            if not final and self.sizes.get(path) != size:
+                self.sizes[path] = size
+                break  # still being written; later saves wait for it
+            duration = probe_duration(path)
+            if duration is None and not final:
+                break
+            self.seen.add(path)
+            if duration is not None and not self.broken:
+                self._publish(path, duration)
+
+    def _publish(self, path: str, duration: float):
+        segment = path
+        if SEGMENT_OUTPUT == "cumulative" and self.index > 0:
+            if duration <= self.published_seconds + 0.05:
+                return  # re-save without new frames
+            os.makedirs(self.segment_dir, exist_ok=True)
+            segment = os.path.join(self.segment_dir, f"segment_{self.index:03d}.mp4")
+            if not cut_tail(path, self.published_seconds, segment):
+                # Later tails would be misaligned; the stream stops here (the full video still completes the job)
+                logger.error(f"Could not cut segment {self.index} from {path}; no further segments published")
+                self.broken = True
+                return
+        self.on_segment(self.index, segment)
+        self.index += 1
+        self.published_seconds = duration if SEGMENT_OUTPUT == "cumulative" else self.published_seconds + duration
+
+
+def load_pipeline(checkpoint_dir: str, context_parallel_size: int) -> AvatarPipeline:
+    """Import the demo script and prepare it for in-process reuse; raises if it cannot be used"""
+    if not os.path.isdir(checkpoint_dir):
+        raise FileNotFoundError(f"LongCat checkpoint not found: {checkpoint_dir}")
+    script = importlib.import_module(LONGCAT_SCRIPT)
+    for hook in ("_parse_args", "generate"):
+        if not callable(getattr(script, hook, None)):
+            raise RuntimeError(f"{LONGCAT_SCRIPT} has no {hook}(); the adapter needs a newer LongCat-Video checkout")
+
+    if MEMOIZE_MODELS:
+        import transformers
+        import diffusers
+        for base in (transformers.PreTrainedModel, transformers.PreTrainedTokenizerBase,
+                     transformers.ProcessorMixin, transformers.FeatureExtractionMixin, diffusers.ModelMixin):
+            _memoize_from_pretrained(base)
+    _make_process_group_reusable()
+    _single_process_env()
+
+    pipe = AvatarPipeline(script, checkpoint_dir, context_parallel_size)
+    if WARMUP_INPUT_JSON:
+        with tempfile.TemporaryDirectory(prefix="longcat_warmup_") as output_dir:
+            generate(pipe, WARMUP_INPUT_JSON, output_dir, os.getenv("RESOLUTION", "480p"), 1)
+        logger.info(f"LongCat warm-up done, {len(_loaded_models)} models resident")
+    return pipe
+
+
+def generate(pipe: AvatarPipeline, input_json_path: str, output_dir: str, resolution: str, num_segments: int,
+             on_segment: Optional[Callable[[int, str], None]] = None):
+    """Run one job through the script; models loaded by earlier jobs are reused"""
+    args = pipe.args(input_json_path, output_dir, resolution, num_segments)
+    if on_segment is None or os.getenv("RANK", "0") != "0":
+        pipe.script.generate(args)  # only rank 0 saves videos
+    else:
+        with SegmentWatcher(output_dir, on_segment):
+            pipe.script.generate(args)
+    pipe.jobs_done += 1
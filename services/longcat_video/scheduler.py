@@ -0,0 +1,248 @@
+"""
+Generation Job Scheduler
+Condition-variable scheduler for LongCat-Video jobs (no polling)
+
+- Each GPU slot runs `concurrency` lanes; a lane is a thread that runs one job at a time
+- Lanes sleep on a shared Condition and wake as soon as a job is enqueued
+- Jobs run by priority class, then earliest deadline first, then FIFO
+- A job naming render ids in "supersedes" (the coordinator's re-render of the same turn for
+  new content) drops the queued jobs of those renders; superseded render ids are remembered,
+  so a late submit of one is rejected, until the session's jobs are cancelled or for
+  superseded_ttl. Jobs for other turns never supersede each other.
+- Jobs whose deadline has passed are dropped instead of run
+- Queue depth, wait time and run time are tracked for /status
+"""
+
+import time
+import heapq
+import logging
+import itertools
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> Dict:
+        buckets = {f"le_{bound}": n for bound, n in zip(self.buckets, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "mean": round(self.total / self.count, 3) if self.count else None,
+            "max": round(self.max, 3),
+            "buckets": buckets
+        }
+
+
+class JobScheduler:
+    """Runs queued jobs on per-slot lanes, waking on enqueue/finish"""
+
+    def __init__(self, run_job: Callable[[Dict, str], None], slots: List[str], concurrency: int = 1,
+                 on_drop: Optional[Callable[[Dict, str], None]] = None, drop_expired: bool = True,
+                 superseded_ttl: float = 3600.0):
+        self.run_job = run_job
+        self.on_drop = on_drop
+        self.drop_expired = drop_expired
+        self.slots = list(slots)
+        self.concurrency = max(1, concurrency)
+        self.cond = threading.Condition()
+        self.heap: List[Tuple] = []  # (-priority, deadline, seq, job_id)
+        self.pending: Dict[str, Dict] = {}  # job_id -> queued job
+        # render_id -> (session_id, when it was superseded)
+        self.superseded: Dict[str, Tuple[Optional[str], float]] = {}
+        self.superseded_ttl = superseded_ttl
+        self.seq = itertools.count()
+        self.dropped = {"superseded": 0, "expired": 0, "cancelled": 0}
+        self.running: Dict[str, Dict] = {}  # lane -> {"job_id", "pid", "started_at"}
+        self.wait_time = Histogram()
+        self.run_time = Histogram()
+        self.completed = 0
+        self.threads: List[threading.Thread] = []
+
+    @property
+    def lanes(self) -> List[str]:
+        if self.concurrency == 1:
+            return list(self.slots)
+        return [f"{slot}/{i}" for slot in self.slots for i in range(self.concurrency)]
+
+    def start(self):
+        for lane in self.lanes:
+            thread = threading.Thread(target=self._lane_loop, args=(lane,), name=f"lane-{lane}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        logger.info(f"Scheduler started with lanes: {self.lanes}")
+
+    def submit(self, job: Dict) -> Optional[str]:
+        """
+        Enqueue a job and wake one idle lane.
+        Returns "superseded" if a job already superseded the render this one is for.
+        """
+        dropped = []
+        with self.cond:
+            job["enqueued_at"] = time.monotonic()
+            if job.get("render_id") and job["render_id"] in self.superseded:
+                self.dropped["superseded"] += 1
+                return "superseded"
+            replaced = set(job.get("supersedes") or [])
+            for render_id in replaced:
+                self.superseded[render_id] = (job.get("session_id"), job["enqueued_at"])
+            for queued in list(self.pending.values()):
+                if queued.get("render_id") in replaced:
+                    dropped.append(self._remove(queued["job_id"], "superseded"))
+
+            deadline = job.get("deadline") or float("inf")
+            heapq.heappush(self.heap, (-(job.get("priority") or 0), deadline, next(self.seq), job["job_id"]))
+            self.pending[job["job_id"]] = job
+            self.cond.notify()
+        self._notify_dropped(dropped)
+        return None
+
+    def _remove(self, job_id: str, reason: str) -> Tuple[Dict, str]:
+        """Drop a queued job (caller holds the condition); heap entry is skipped lazily"""
+        job = self.pending.pop(job_id)
+        self.dropped[reason] = self.dropped.get(reason, 0) + 1
+        logger.info(f"Dropped queued job {job_id} ({reason})")
+        return job, reason
+
+    def cancel(self, job_id: Optional[str] = None, session_id: Optional[str] = None) -> List[str]:
+        """
+        Drop queued jobs by id and/or session; returns the cancelled job ids.
+        Running jobs are left alone (they finish and are cleaned up by the storage janitor).
+        """
+        dropped = []
+        with self.cond:
+            for queued in list(self.pending.values()):
+                if job_id is not None and queued["job_id"] != job_id:
+                    continue
+                if session_id is not None and queued.get("session_id") != session_id:
+                    continue
+                if job_id is None and session_id is None:
+                    continue
+                dropped.append(self._remove(queued["job_id"], "cancelled"))
+            if session_id is not None:
+                # The session is over; forget its superseded renders
+                for render_id, (owner, _) in list(self.superseded.items()):
+                    if owner == session_id:
+                        del self.superseded[render_id]
+        self._notify_dropped(dropped)
+        return [job["job_id"] for job, _ in dropped]
+
+    def _prune_superseded(self):
+        """Forget renders superseded more than superseded_ttl ago (caller holds the condition)"""
+        cutoff = time.monotonic() - self.superseded_ttl
+        for render_id, (_, when) in list(self.superseded.items()):
+            if when < cutoff:
+                del self.superseded[render_id]
+
+    def _notify_dropped(self, dropped: List[Tuple[Dict, str]]):
+        if self.on_drop:
+            for job, reason in dropped:
+                self.on_drop(job, reason)
+
+    def _next_job(self, dropped: List[Tuple[Dict, str]]) -> Optional[Dict]:
+        """
+        Block until a runnable job is available (caller holds the condition).
+        Returns None when jobs were dropped and the queue ran dry, so they get reported.
+        """
+        while True:
+            while not self.heap:
+                if dropped:
+                    return None
+                self.cond.wait()
+            _, deadline, _, job_id = heapq.heappop(self.heap)
+            if job_id not in self.pending:
+                continue  # superseded or cancelled while queued
+            if self.drop_expired and deadline < time.time():
+                dropped.append(self._remove(job_id, "expired"))
+                continue
+            return self.pending.pop(job_id)
+
+    def _lane_loop(self, lane: str):
+        while True:
+            dropped = []
+            with self.cond:
+                job = self._next_job(dropped)
+                started = time.monotonic()
+                if job is not None:
+                    self.wait_time.observe(started - job["enqueued_at"])
+                    self.running[lane] = {"job_id": job["job_id"], "pid": None, "started_at": started}
+            self._notify_dropped(dropped)
+            if job is None:
+                continue
+
+            logger.info(f"[{lane}] Processing queued job {job['job_id']}")
+            try:
+                self.run_job(job, lane)
+            except Exception as e:
+                logger.error(f"[{lane}] Error running job {job['job_id']}: {e}", exc_info=True)
+            finally:
+                with self.cond:
+                    self.run_time.observe(time.monotonic() - started)
+                    self.running.pop(lane, None)
+                    self.completed += 1
+                    self._prune_superseded()
+                    self.cond.notify_all()
+                logger.info(f"[{lane}] Job {job['job_id']} finished, queue has {self.queue_size()} items remaining")
+
+    def set_pid(self, lane: str, pid: Optional[int]):
+        with self.cond:
+            if lane in self.running:
+                self.running[lane]["pid"] = pid
+
+    def queue_size(self) -> int:
+        with self.cond:
+            return len(self.pending)
+
+    def running_job_ids(self) -> List[str]:
+        with self.cond:
+            return [state["job_id"] for state in self.running.values()]
+
+    def stats(self) -> Dict:
+        with self.cond:
+            now = time.monotonic()
+            return {
+                "queue_depth": len(self.pending),
+                "queued": [
+                    {"job_id": job["job_id"], "priority": job.get("priority") or 0,
+                     "deadline": job.get("deadline"), "session_id": job.get("session_id"),
+                     "turn": job.get("turn")}
+                    for job in self.pending.values()
+                ],
+                "dropped": dict(self.dropped),
+                "superseded_renders": len(self.superseded),
+                "lanes": self.lanes,
+                "concurrency_per_slot": self.concurrency,
+                "running": {
+                    lane: {"job_id": state["job_id"], "pid": state["pid"],
+                           "elapsed": round(now - state["started_at"], 1)}
+                    for lane, state in self.running.items()
+                },
+                "completed": self.completed,
+                "wait_time_seconds": self.wait_time.to_dict(),
+                "run_time_seconds": self.run_time.to_dict()
+            }
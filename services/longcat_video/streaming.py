@@ -0,0 +1,164 @@
+"""
+Segment Streaming
+Publishes finished LongCat segments as an HLS event playlist while the rest still render
+
+Layout per job: OUTPUT_DIR/stream_{job_id}/
+- segment_000.ts, segment_001.ts, ...  (remuxed to MPEG-TS with ffmpeg; raw MP4 copy if unavailable)
+- playlist.m3u8                        (EVENT playlist, closed with EXT-X-ENDLIST when the job ends)
+
+Streams of finished jobs are rebuilt from this layout on demand (SegmentStream.from_disk)
+"""
+
+import os
+import math
+import shutil
+import logging
+import threading
+import subprocess
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Used for EXTINF when ffprobe cannot measure a segment
+DEFAULT_SEGMENT_SECONDS = float(os.getenv("DEFAULT_SEGMENT_SECONDS", "5.0"))
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """Segment duration in seconds via ffprobe, or None"""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", path],
+            capture_output=True, text=True, timeout=30
+        )
+        return float(result.stdout.strip()) if result.returncode == 0 else None
+    except (OSError, ValueError, subprocess.TimeoutExpired):
+        return None
+
+
+def remux_to_ts(src: str, dst: str) -> bool:
+    """Copy the streams into an MPEG-TS container (no re-encode)"""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", src, "-c", "copy",
+             "-bsf:v", "h264_mp4toannexb", "-f", "mpegts", dst],
+            capture_output=True, timeout=120
+        )
+        return result.returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def cut_tail(src: str, start_seconds: float, dst: str) -> bool:
+    """Re-encode src from start_seconds to the end (frame-accurate, unlike a stream copy)"""
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-ss", f"{start_seconds:.3f}", "-i", src,
+             "-c:v", "libx264", "-preset", "veryfast", "-c:a", "aac", dst],
+            capture_output=True, timeout=300
+        )
+        return result.returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+class SegmentStream:
+    """Published segments and playlist for one job"""
+
+    def __init__(self, job_id: str, stream_dir: str):
+        self.job_id = job_id
+        self.stream_dir = stream_dir
+        self.segments: Dict[int, Dict] = {}  # index -> {"file", "duration"}
+        self.finished = False
+        self.lock = threading.Lock()
+        os.makedirs(stream_dir, exist_ok=True)
+
+    @classmethod
+    def from_disk(cls, job_id: str, stream_dir: str) -> Optional["SegmentStream"]:
+        """Rebuild a stream published earlier (possibly by another process) from its playlist, or None"""
+        try:
+            with open(os.path.join(stream_dir, "playlist.m3u8")) as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None
+        stream = cls(job_id, stream_dir)
+        files = {name.split(".")[0]: name for name in os.listdir(stream_dir) if name.startswith("segment_")}
+        duration = None
+        for line in lines:
+            if line.startswith("#EXTINF:"):
+                duration = float(line[len("#EXTINF:"):].rstrip(","))
+            elif line.startswith("segment/") and duration is not None:
+                index = int(line.split("/", 1)[1])
+                filename = files.get(f"segment_{index:03d}")
+                if filename:
+                    stream.segments[index] = {"file": filename, "duration": duration}
+                duration = None
+        stream.finished = "#EXT-X-ENDLIST" in lines
+        return stream
+
+    def publish(self, index: int, src_path: str):
+        """Make one finished segment playable and append it to the playlist"""
+        ts_file = f"segment_{index:03d}.ts"
+        if remux_to_ts(src_path, os.path.join(self.stream_dir, ts_file)):
+            filename = ts_file
+        else:
+            filename = f"segment_{index:03d}{os.path.splitext(src_path)[1] or '.mp4'}"
+            dst = os.path.join(self.stream_dir, filename)
+            try:
+                os.link(src_path, dst)
+            except OSError:
+                shutil.copyfile(src_path, dst)
+        duration = probe_duration(os.path.join(self.stream_dir, filename)) or DEFAULT_SEGMENT_SECONDS
+
+        with self.lock:
+            self.segments[index] = {"file": filename, "duration": duration}
+            self._write_playlist()
+        logger.info(f"Published segment {index} for job {self.job_id} ({duration:.1f}s)")
+
+    def finish(self):
+        with self.lock:
+            self.finished = True
+            self._write_playlist()
+
+    def contiguous(self) -> List[Dict]:
+        """Segments playable in order (stops at the first gap)"""
+        ready = []
+        index = 0
+        while index in self.segments:
+            ready.append(self.segments[index])
+            index += 1
+        return ready
+
+    def _write_playlist(self):
+        """Rewrite playlist.m3u8 atomically (caller holds the lock)"""
+        ready = self.contiguous()
+        target = max([math.ceil(s["duration"]) for s in ready] or [math.ceil(DEFAULT_SEGMENT_SECONDS)])
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{target}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for index, segment in enumerate(ready):
+            lines.append(f"#EXTINF:{segment['duration']:.3f},")
+            lines.append(f"segment/{index}")
+        if self.finished:
+            lines.append("#EXT-X-ENDLIST")
+        tmp_path = os.path.join(self.stream_dir, "playlist.m3u8.tmp")
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.playlist_path)
+
+    @property
+    def playlist_path(self) -> str:
+        return os.path.join(self.stream_dir, "playlist.m3u8")
+
+    def segment_path(self, index: int) -> Optional[str]:
+        with self.lock:
+            segment = self.segments.get(index)
+        return os.path.join(self.stream_dir, segment["file"]) if segment else None
+
+    def status(self) -> Dict:
+        with self.lock:
+            return {"segments_ready": len(self.contiguous()), "finished": self.finished}
@@ -0,0 +1,458 @@
+"""
+LongCat-Video-Avatar Warm Worker
+Long-lived process that loads the avatar pipeline once and serves jobs over a local socket
+
+Protocol (pickled dicts over a multiprocessing.connection Unix socket):
+- worker -> {"op": "ready", "ok": bool, "load_seconds": float, "error": str}
+- {"op": "ping"}     -> {"op": "pong", "pipeline": str, "jobs_done": int}
+- {"op": "generate", "job_id", "input_json_path", "output_dir", "resolution", "num_segments"}
+                     -> zero or more {"op": "segment", "job_id", "index": int, "path": str}
+                     -> {"op": "result", "job_id", "ok": bool, "error": str}
+- {"op": "shutdown"} -> worker exits
+
+Pipelines:
+- "longcat": imports LONGCAT_WORKER_ENTRYPOINT (default longcat_adapter, which wraps the
+  upstream demo script; or a module in LONGCAT_VIDEO_DIR), which must expose
+  load_pipeline(checkpoint_dir, context_parallel_size) and
+  generate(pipe, input_json_path, output_dir, resolution, num_segments[, on_segment])
+  on_segment(index, path) is passed when generate accepts it, to publish finished segments early
+- "fake": CPU-only stand-in that writes placeholder MP4s (protocol testing without a GPU)
+"""
+
+import os
+import sys
+import json
+import time
+import secrets
+import logging
+import argparse
+import inspect
+import importlib
+import subprocess
+import threading
+from multiprocessing.connection import Listener, Client
+from typing import Callable, Optional, Dict, List
+
+logger = logging.getLogger(__name__)
+
+WORKER_STARTUP_TIMEOUT = float(os.getenv("LONGCAT_WORKER_STARTUP_TIMEOUT", "900"))
+WORKER_HEALTH_INTERVAL = float(os.getenv("LONGCAT_WORKER_HEALTH_INTERVAL", "15"))
+WORKER_PING_TIMEOUT = float(os.getenv("LONGCAT_WORKER_PING_TIMEOUT", "10"))
+WORKER_MAX_RESTARTS = int(os.getenv("LONGCAT_WORKER_MAX_RESTARTS", "5"))
+
+
+# ============================================================================
+# Pipelines (run inside the worker process)
+# ============================================================================
+
+class FakePipeline:
+    """CPU-only pipeline that mimics LongCat output layout"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.load_delay = float(os.getenv("LONGCAT_FAKE_LOAD_SECONDS", "0"))
+        self.segment_delay = float(os.getenv("LONGCAT_FAKE_SEGMENT_SECONDS", "0.1"))
+
+    def load(self):
+        time.sleep(self.load_delay)
+
+    def generate(self, input_json_path: str, output_dir: str, resolution: str, num_segments: int,
+                 on_segment: Optional[Callable[[int, str], None]] = None):
+        with open(input_json_path) as f:
+            input_data = json.load(f)
+        if "cond_image" not in input_data or "cond_audio" not in input_data:
+            raise ValueError("input json missing cond_image/cond_audio")
+
+        segment_dir = os.path.join(output_dir, "segments")
+        os.makedirs(segment_dir, exist_ok=True)
+        video = b""
+        for index in range(max(1, num_segments or 1)):
+            time.sleep(self.segment_delay)
+            data = f"fake-longcat-{resolution}-segment-{index}".encode()
+            segment_path = os.path.join(segment_dir, f"segment_{index:03d}.mp4")
+            with open(segment_path, "wb") as f:
+                f.write(data)
+            video += data
+            if on_segment:
+                on_segment(index, segment_path)
+        with open(os.path.join(output_dir, "output.mp4"), "wb") as f:
+            f.write(video)
+
+
+class LongCatPipeline:
+    """LongCat-Video-Avatar pipeline loaded once through the entrypoint hooks"""
+
+    name = "longcat"
+
+    def __init__(self):
+        self.longcat_dir = os.environ["LONGCAT_VIDEO_DIR"]
+        self.checkpoint_dir = os.environ["CHECKPOINT_DIR"]
+        self.context_parallel_size = int(os.getenv("CONTEXT_PARALLEL_SIZE", "1"))
+        self.entrypoint_name = os.getenv("LONGCAT_WORKER_ENTRYPOINT", "longcat_adapter")
+        self.entrypoint = None
+        self.pipe = None
+
+    def load(self):
+        if self.longcat_dir not in sys.path:
+            sys.path.insert(0, self.longcat_dir)
+        self.entrypoint = importlib.import_module(self.entrypoint_name)
+        for hook in ("load_pipeline", "generate"):
+            if not callable(getattr(self.entrypoint, hook, None)):
+                raise RuntimeError(
+                    f"{self.entrypoint_name} does not expose {hook}(); "
+                    f"set LONGCAT_WORKER_ENTRYPOINT or use LONGCAT_WORKER_MODE=subprocess"
+                )
+        self.pipe = self.entrypoint.load_pipeline(self.checkpoint_dir, self.context_parallel_size)
+
+    def generate(self, input_json_path: str, output_dir: str, resolution: str, num_segments: int,
+                 on_segment: Optional[Callable[[int, str], None]] = None):
+        kwargs = {}
+        if on_segment and "on_segment" in inspect.signature(self.entrypoint.generate).parameters:
+            kwargs["on_segment"] = on_segment
+        self.entrypoint.generate(self.pipe, input_json_path, output_dir, resolution, num_segments, **kwargs)
+
+
+PIPELINES = {
+    "fake": FakePipeline,
+    "longcat": LongCatPipeline,
+}
+
+
+# ============================================================================
+# Worker process
+# ============================================================================
+
+def _broadcast(message: Optional[Dict]) -> Optional[Dict]:
+    """Share a message from rank 0 with the other context-parallel ranks"""
+    if int(os.getenv("WORLD_SIZE", "1")) <= 1:
+        return message
+    import torch.distributed as dist
+    if not dist.is_initialized():
+        dist.init_process_group(backend="nccl")
+    box = [message]
+    dist.broadcast_object_list(box, src=0)
+    return box[0]
+
+
+def serve(socket_path: str, pipeline_name: str):
+    """Worker main loop: load once, then handle requests until shutdown"""
+    rank = int(os.getenv("RANK", "0"))
+    pipeline = PIPELINES[pipeline_name]()
+
+    conn = None
+    if rank == 0:
+        authkey = bytes.fromhex(os.environ["LONGCAT_WORKER_AUTHKEY"])
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        listener = Listener(socket_path, family="AF_UNIX", authkey=authkey)
+        conn = listener.accept()
+        listener.close()
+
+    started = time.time()
+    try:
+        pipeline.load()
+        ready = {"op": "ready", "ok": True, "load_seconds": round(time.time() - started, 2)}
+    except Exception as e:
+        logger.error(f"Pipeline load failed: {e}", exc_info=True)
+        ready = {"op": "ready", "ok": False, "error": str(e)}
+    if conn:
+        conn.send(ready)
+    if not ready["ok"]:
+        return 1
+
+    try:
+        return _serve_loop(conn, pipeline)
+    except (BrokenPipeError, ConnectionResetError):
+        logger.warning("Supervisor connection lost, exiting")
+        return 0
+
+
+def _serve_loop(conn, pipeline) -> int:
+    """Handle ping/generate/shutdown requests until told to stop"""
+    jobs_done = 0
+    while True:
+        message = None
+        if conn:
+            try:
+                message = conn.recv()
+            except EOFError:
+                message = {"op": "shutdown"}
+        message = _broadcast(message)
+        op = message.get("op")
+
+        if op == "shutdown":
+            return 0
+        if op == "ping":
+            if conn:
+                conn.send({"op": "pong", "pipeline": pipeline.name, "jobs_done": jobs_done})
+            continue
+        if op == "generate":
+            job_id = message["job_id"]
+            result = {"op": "result", "job_id": job_id, "ok": True}
+
+            def on_segment(index: int, path: str):
+                if conn:
+                    conn.send({"op": "segment", "job_id": job_id, "index": index, "path": path})
+
+            try:
+                pipeline.generate(
+                    message["input_json_path"],
+                    message["output_dir"],
+                    message["resolution"],
+                    message["num_segments"],
+                    on_segment=on_segment
+                )
+                jobs_done += 1
+            except Exception as e:
+                logger.error(f"Job {message['job_id']} failed: {e}", exc_info=True)
+                result.update(ok=False, error=str(e))
+            if conn:
+                conn.send(result)
+
+
+# ============================================================================
+# Supervisor (runs inside the API service)
+# ============================================================================
+
+class WorkerError(Exception):
+    """Raised when the warm worker cannot run a job"""
+
+
+class WorkerSupervisor:
+    """Starts, health-checks and restarts one warm worker process"""
+
+    def __init__(self, name: str, python_exe: str, pipeline: str, env: Dict[str, str],
+                 cwd: Optional[str] = None, nproc: int = 1, socket_dir: Optional[str] = None):
+        self.name = name
+        self.python_exe = python_exe
+        self.pipeline = pipeline
+        self.env = env
+        self.cwd = cwd
+        self.nproc = nproc
+        socket_dir = socket_dir or os.getenv("LONGCAT_WORKER_SOCKET_DIR", "/tmp")
+        self.socket_path = os.path.join(socket_dir, f"longcat_worker_{os.getpid()}_{name}.sock")
+        self.authkey = secrets.token_bytes(16)
+        self.process: Optional[subprocess.Popen] = None
+        self.conn = None
+        self.lock = threading.RLock()
+        self.busy = False
+        self.restarts = 0
+        self.failed = False
+        self.started_once = False
+        self.last_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.last_health_check: Optional[float] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    def _command(self) -> List[str]:
+        worker_script = os.path.abspath(__file__)
+        args = [worker_script, f"--socket={self.socket_path}", f"--pipeline={self.pipeline}"]
+        if self.nproc > 1:
+            return [self.python_exe, "-m", "torch.distributed.run", f"--nproc_per_node={self.nproc}"] + args
+        return [self.python_exe] + args
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None and self.conn is not None
+
+    def start(self):
+        """Launch the worker and wait until the pipeline is loaded"""
+        env = dict(self.env)
+        env["LONGCAT_WORKER_AUTHKEY"] = self.authkey.hex()
+        cmd = self._command()
+        logger.info(f"[{self.name}] Starting warm worker: {' '.join(cmd)}")
+        self.process = subprocess.Popen(cmd, cwd=self.cwd, env=env)
+
+        deadline = time.time() + WORKER_STARTUP_TIMEOUT
+        while self.conn is None:
+            if self.process.poll() is not None:
+                raise WorkerError(f"worker exited during startup (code {self.process.returncode})")
+            if time.time() > deadline:
+                self._kill()
+                raise WorkerError("worker did not open its socket in time")
+            try:
+                self.conn = Client(self.socket_path, family="AF_UNIX", authkey=self.authkey)
+            except (FileNotFoundError, ConnectionRefusedError):
+                time.sleep(0.2)
+
+        while not self.conn.poll(1.0):
+            if self.process.poll() is not None or time.time() > deadline:
+                self._kill()
+                raise WorkerError("worker did not finish loading the pipeline in time")
+        ready = self.conn.recv()
+        if not ready.get("ok"):
+            self._kill()
+            raise WorkerError(f"pipeline load failed: {ready.get('error')}")
+        self.load_seconds = ready.get("load_seconds")
+        logger.info(f"✅ [{self.name}] Warm worker ready (PID {self.pid}, load {self.load_seconds}s)")
+
+    def _kill(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except OSError:
+                pass
+            self.conn = None
+        if self.process is not None and self.process.poll() is None:
+            # torch.distributed.run spawns one child per rank; take them down too
+            try:
+                import psutil
+                for child in psutil.Process(self.process.pid).children(recursive=True):
+                    child.kill()
+            except Exception:
+                pass
+            self.process.kill()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        self.process = None
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
+
+    def restart(self, reason: str):
+        """Kill and relaunch the worker, giving up after WORKER_MAX_RESTARTS"""
+        logger.warning(f"[{self.name}] Restarting warm worker: {reason}")
+        self.last_error = reason
+        self._kill()
+        self.restarts += 1
+        if self.restarts > WORKER_MAX_RESTARTS:
+            self.failed = True
+            raise WorkerError(f"worker restarted {self.restarts - 1} times, giving up")
+        self.start()
+
+    def _restart_later(self, reason: str):
+        """
+        Kill the worker now and relaunch it from a background thread, so the job that
+        failed gets its result without waiting out the reload (the relaunch takes the
+        lock once run_job has returned, so the next job waits for it instead)
+        """
+        self.last_error = reason
+        self._kill()
+
+        def relaunch():
+            with self.lock:
+                if self.failed or self.is_alive():
+                    return
+                try:
+                    self.restart(reason)
+                except WorkerError as e:
+                    logger.error(f"[{self.name}] {e}")
+
+        threading.Thread(target=relaunch, daemon=True).start()
+
+    def ensure_started(self):
+        """Start the worker on first use, or restart it if it has died"""
+        with self.lock:
+            if self.failed:
+                raise WorkerError(self.last_error or "worker unavailable")
+            if self.is_alive():
+                return
+            if self.started_once:
+                self.restart("worker not running")
+                return
+            self.started_once = True
+            try:
+                self.start()
+            except WorkerError as e:
+                self.failed = True
+                self.last_error = str(e)
+                raise
+
+    def run_job(self, job: Dict, timeout: float = 3600,
+                on_segment: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Send a generate request and block until the worker answers (segment messages go to on_segment)"""
+        with self.lock:
+            self.ensure_started()
+            self.busy = True
+            try:
+                self.conn.send({"op": "generate", **job})
+                deadline = time.time() + timeout
+                while True:
+                    try:
+                        if self.conn.poll(1.0):
+                            message = self.conn.recv()
+                            if message.get("op") == "segment":
+                                if on_segment:
+                                    try:
+                                        on_segment(message)
+                                    except Exception as e:
+                                        logger.warning(f"[{self.name}] Failed to publish segment: {e}")
+                                continue
+                            self.restarts = 0
+                            return message
+                    except (EOFError, OSError):
+                        self._restart_later(f"connection lost during job {job['job_id']}")
+                        return {"ok": False, "error": "Worker crashed during generation"}
+                    if self.process.poll() is not None:
+                        self._restart_later(f"worker died during job {job['job_id']}")
+                        return {"ok": False, "error": "Worker crashed during generation"}
+                    if time.time() > deadline:
+                        self._restart_later(f"job {job['job_id']} timed out")
+                        return {"ok": False, "error": "Generation timeout"}
+            finally:
+                self.busy = False
+
+    def check_health(self):
+        """Ping an idle worker and restart it if it is dead or unresponsive"""
+        if self.failed or self.process is None or not self.lock.acquire(blocking=False):
+            return
+        try:
+            self.last_health_check = time.time()
+            try:
+                if self.process.poll() is not None:
+                    raise WorkerError(f"worker exited with code {self.process.returncode}")
+                self.conn.send({"op": "ping"})
+                if not self.conn.poll(WORKER_PING_TIMEOUT):
+                    raise WorkerError("ping timed out")
+                self.conn.recv()
+            except (WorkerError, EOFError, OSError) as e:
+                try:
+                    self.restart(str(e))
+                except WorkerError as restart_error:
+                    logger.error(f"[{self.name}] {restart_error}")
+        finally:
+            self.lock.release()
+
+    def monitor(self):
+        """Health-check loop (runs in a daemon thread)"""
+        while not self.failed:
+            time.sleep(WORKER_HEALTH_INTERVAL)
+            self.check_health()
+
+    def stop(self):
+        with self.lock:
+            if self.conn is not None:
+                try:
+                    self.conn.send({"op": "shutdown"})
+                except OSError:
+                    pass
+            self._kill()
+
+    def status(self) -> Dict:
+        return {
+            "name": self.name,
+            "pipeline": self.pipeline,
+            "pid": self.pid,
+            "alive": self.is_alive(),
+            "busy": self.busy,
+            "failed": self.failed,
+            "restarts": self.restarts,
+            "load_seconds": self.load_seconds,
+            "last_error": self.last_error,
+            "last_health_check": self.last_health_check
+        }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="LongCat-Video-Avatar warm worker")
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--pipeline", choices=sorted(PIPELINES), default="longcat")
+    args = parser.parse_args()
+    sys.exit(serve(args.socket, args.pipeline))
@@ -0,0 +1,3 @@
+"""
+Shared helpers imported by the FastAPI services (tts, animation, longcat_video)
+"""
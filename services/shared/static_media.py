@@ -0,0 +1,114 @@
+"""
+Static Media Serving
+Range requests, conditional GETs and cache headers for generated audio/video files
+
+- Range: bytes=... -> 206 Partial Content (single range; multi-range falls back to 200)
+- ETag / Last-Modified -> 304 Not Modified on If-None-Match / If-Modified-Since
+- UUID-named artifacts never change, so they get long-lived immutable Cache-Control
+"""
+
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from shared.storage_janitor import record_served
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+CHUNK_SIZE = 64 * 1024
+
+
+def make_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=" range into inclusive (start, end).
+    Returns None if unsatisfiable; raises ValueError if it should be ignored (malformed/multi-range).
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        raise ValueError("unsupported range")
+    start_str, _, end_str = spec.strip().partition("-")
+    if not start_str:
+        if not end_str:
+            raise ValueError("malformed range")
+        suffix = int(end_str)
+        if suffix == 0 or size == 0:
+            return None
+        return max(0, size - suffix), size - 1
+    start = int(start_str)
+    end = int(end_str) if end_str else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _if_range_matches(request: Request, etag: str, last_modified: str) -> bool:
+    if_range = request.headers.get("if-range")
+    return if_range is None or if_range.strip() in (etag, last_modified)
+
+
+def _iter_file(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def media_response(request: Request, path: str, media_type: str, immutable: bool = True) -> Response:
+    """FileResponse with byte ranges, validators and cache headers"""
+    stat = os.stat(path)
+    record_served(path)
+    etag = make_etag(stat)
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+    }
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except ValueError:
+            return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.st_size}"})
+        start, end = byte_range
+        headers.update({
+            "Content-Range": f"bytes {start}-{end}/{stat.st_size}",
+            "Content-Length": str(end - start + 1),
+        })
+        return StreamingResponse(_iter_file(path, start, end), status_code=206,
+                                 media_type=media_type, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
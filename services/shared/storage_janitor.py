@@ -0,0 +1,283 @@
+"""
+Storage Janitor
+Keeps generated-artifact directories (videos, audio) within size and age budgets
+
+- Every top-level entry (file or job directory) in the managed directory is one artifact
+- Artifacts older than the TTL are removed first, then least-recently-served ones until
+  the directory fits max_bytes
+- Artifacts whose names contain a leased key (job id, audio filename) are never touched;
+  sessions take leases and release them when they end. Leases are saved to
+  .storage_leases.json in the directory, so they survive service restarts
+"""
+
+import os
+import json
+import time
+import shutil
+import fnmatch
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from fastapi import APIRouter
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+LEASE_FILENAME = ".storage_leases.json"
+
+# path -> last time it was served (fed by static_media.media_response)
+_last_served: Dict[str, float] = {}
+_last_served_lock = threading.Lock()
+
+
+def record_served(path: str):
+    with _last_served_lock:
+        _last_served[os.path.realpath(path)] = time.time()
+
+
+def _path_size(path: str) -> int:
+    if os.path.isdir(path) and not os.path.islink(path):
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
+    try:
+        return os.lstat(path).st_size
+    except OSError:
+        return 0
+
+
+def _prune_last_served(directory: str):
+    """Forget served times of files under directory that no longer exist (removed by other paths)"""
+    prefix = os.path.realpath(directory) + os.sep
+    with _last_served_lock:
+        paths = [p for p in _last_served if p.startswith(prefix)]
+    gone = [p for p in paths if not os.path.exists(p)]
+    with _last_served_lock:
+        for path in gone:
+            _last_served.pop(path, None)
+
+
+def _last_used(path: str) -> float:
+    """Most recent of mtime and last served time (for directories, any file inside)"""
+    try:
+        latest = os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+    with _last_served_lock:
+        if os.path.isdir(path):
+            prefix = os.path.realpath(path) + os.sep
+            served = [t for p, t in _last_served.items() if p.startswith(prefix)]
+        else:
+            served = [_last_served.get(os.path.realpath(path), 0.0)]
+    return max([latest] + served)
+
+
+class StorageJanitor:
+    """Background evictor for one artifact directory"""
+
+    def __init__(self, name: str, directory: str, max_bytes: int, ttl_seconds: float,
+                 interval: float = 300, min_age_seconds: float = 600,
+                 exclude: Iterable[str] = (), protect: Optional[Callable[[], Set[str]]] = None):
+        self.name = name
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.interval = interval
+        self.min_age_seconds = min_age_seconds
+        self.exclude = list(exclude)
+        self.protect = protect
+        self.exclude.append(LEASE_FILENAME + "*")
+        self.lease_path = os.path.join(directory, LEASE_FILENAME)
+        self.lock = threading.Lock()
+        self.leases: Dict[str, Dict] = {}  # owner -> {"keys": set, "expires_at": float}
+        self._load_leases()
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.last_run: Optional[float] = None
+        self.last_usage = 0
+
+    # ------------------------------------------------------------------ leases
+
+    def _load_leases(self):
+        try:
+            with open(self.lease_path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"[{self.name}] Could not read leases from {self.lease_path}: {e}")
+            return
+        now = time.time()
+        self.leases = {owner: {"keys": set(lease["keys"]), "expires_at": lease["expires_at"]}
+                       for owner, lease in saved.items() if lease["expires_at"] >= now}
+        logger.info(f"[{self.name}] Restored {len(self.leases)} storage leases")
+
+    def _save_leases(self):
+        """Write the lease table atomically (caller holds self.lock)"""
+        saved = {owner: {"keys": sorted(lease["keys"]), "expires_at": lease["expires_at"]}
+                 for owner, lease in self.leases.items()}
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self.lease_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(saved, f)
+            os.replace(tmp_path, self.lease_path)
+        except OSError as e:
+            logger.warning(f"[{self.name}] Could not save leases to {self.lease_path}: {e}")
+
+    def pin(self, owner: str, keys: Iterable[str], ttl_seconds: float = 24 * 3600):
+        """Protect artifacts whose names contain any of keys until released (or the lease expires)"""
+        with self.lock:
+            lease = self.leases.setdefault(owner, {"keys": set(), "expires_at": 0.0})
+            lease["keys"].update(k for k in keys if k)
+            lease["expires_at"] = time.time() + ttl_seconds
+            self._save_leases()
+
+    def release(self, owner: str) -> bool:
+        with self.lock:
+            released = self.leases.pop(owner, None) is not None
+            if released:
+                self._save_leases()
+            return released
+
+    def protected_keys(self) -> Set[str]:
+        """Keys of leased or callback-protected artifacts (expired leases are dropped)"""
+        now = time.time()
+        with self.lock:
+            expired = [o for o, lease in self.leases.items() if lease["expires_at"] < now]
+            for owner in expired:
+                del self.leases[owner]
+            if expired:
+                self._save_leases()
+            keys = set().union(*(lease["keys"] for lease in self.leases.values())) if self.leases else set()
+        if self.protect:
+            try:
+                keys |= self.protect()
+            except Exception as e:
+                logger.warning(f"[{self.name}] protect callback failed, skipping sweep: {e}")
+                raise
+        return keys
+
+    # ------------------------------------------------------------------ sweep
+
+    def _artifacts(self) -> List[Dict]:
+        artifacts = []
+        for name in os.listdir(self.directory):
+            if any(fnmatch.fnmatch(name, pattern) for pattern in self.exclude):
+                continue
+            path = os.path.join(self.directory, name)
+            artifacts.append({"name": name, "path": path, "size": _path_size(path), "last_used": _last_used(path)})
+        return artifacts
+
+    def _remove(self, artifact: Dict, reason: str):
+        try:
+            if os.path.isdir(artifact["path"]) and not os.path.islink(artifact["path"]):
+                shutil.rmtree(artifact["path"])
+            else:
+                os.remove(artifact["path"])
+        except OSError as e:
+            logger.warning(f"[{self.name}] Could not remove {artifact['path']}: {e}")
+            return False
+        self.evicted_files += 1
+        self.evicted_bytes += artifact["size"]
+        with _last_served_lock:
+            _last_served.pop(os.path.realpath(artifact["path"]), None)
+        logger.info(f"[{self.name}] Evicted {artifact['name']} ({artifact['size']} bytes, {reason})")
+        return True
+
+    def sweep(self) -> Dict:
+        """Run one eviction pass; returns a summary"""
+        if not os.path.isdir(self.directory):
+            return {"removed": 0}
+        try:
+            protected = self.protected_keys()
+        except Exception:
+            return {"removed": 0}
+
+        now = time.time()
+        artifacts = self._artifacts()
+        usage = sum(a["size"] for a in artifacts)
+        removed = 0
+
+        def evictable(artifact: Dict) -> bool:
+            if now - artifact["last_used"] < self.min_age_seconds:
+                return False
+            return not any(key in artifact["name"] for key in protected)
+
+        # Least recently served first
+        for artifact in sorted(artifacts, key=lambda a: a["last_used"]):
+            expired = now - artifact["last_used"] > self.ttl_seconds
+            if not expired and usage <= self.max_bytes:
+                continue
+            if not evictable(artifact):
+                continue
+            if self._remove(artifact, "ttl" if expired else "size"):
+                usage -= artifact["size"]
+                removed += 1
+
+        _prune_last_served(self.directory)
+        self.last_run = now
+        self.last_usage = usage
+        return {"removed": removed, "usage_bytes": usage}
+
+    def run(self):
+        """Sweep loop (runs in a daemon thread)"""
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"[{self.name}] Janitor sweep failed: {e}", exc_info=True)
+            time.sleep(self.interval)
+
+    def start(self):
+        threading.Thread(target=self.run, name=f"janitor-{self.name}", daemon=True).start()
+        logger.info(f"[{self.name}] Storage janitor watching {self.directory} "
+                    f"(max {self.max_bytes} bytes, ttl {self.ttl_seconds}s)")
+
+    def status(self) -> Dict:
+        with self.lock:
+            leases = {owner: {"keys": len(lease["keys"]), "expires_at": lease["expires_at"]}
+                      for owner, lease in self.leases.items()}
+        return {
+            "directory": self.directory,
+            "usage_bytes": self.last_usage,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "min_age_seconds": self.min_age_seconds,
+            "evicted_files": self.evicted_files,
+            "evicted_bytes": self.evicted_bytes,
+            "last_run": self.last_run,
+            "leases": leases
+        }
+
+
+class LeaseRequest(BaseModel):
+    owner: str  # e.g. a coordinator session id
+    keys: List[str]  # job ids / filenames to keep
+    ttl_seconds: Optional[float] = 24 * 3600
+
+
+def storage_router(janitor: StorageJanitor) -> APIRouter:
+    """/storage endpoints for inspecting the janitor and managing leases"""
+    router = APIRouter()
+
+    @router.get("/storage")
+    async def storage_status():
+        return janitor.status()
+
+    @router.post("/storage/leases")
+    async def create_lease(request: LeaseRequest):
+        janitor.pin(request.owner, request.keys, request.ttl_seconds)
+        return {"status": "ok", "owner": request.owner}
+
+    @router.delete("/storage/leases/{owner}")
+    async def release_lease(owner: str):
+        return {"status": "ok" if janitor.release(owner) else "not_found", "owner": owner}
+
+    return router
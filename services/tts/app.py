@@ -1,18 +1,42 @@
 """
 TTS Service - Piper or Coqui TTS
-Handles text-to-speech conversion with chunking support
+Handles text-to-speech conversion with chunking support, and sentence-level streaming
+(/tts/stream) so downstream stages can start on the first sentence, and batched synthesis
+(/tts/batch) for bulk pre-generation
 """
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
 import io
 import os
+import sys
+import json
+import time
 import uuid
+import wave
 import base64
-from typing import Optional
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Literal, Tuple
 from pathlib import Path
 
+import numpy as np
+import yaml
+
+# Shared helpers live in services/shared (copied to /app/shared in Docker images)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from shared.static_media import media_response
+from shared.storage_janitor import StorageJanitor, record_served, storage_router
+from piper_engine import PiperEngine, chunk_pcm, split_sentences, to_wav, wav_header
+from tts_cache import TTSCache
+from audio_codecs import MEDIA_TYPES, encode_audio, extension, media_type
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
 app = FastAPI(title="AI Teacher TTS Service")
 
 # Model selection: "piper" or "coqui"
@@ -32,18 +56,121 @@ except Exception as e:
 # Ensure AUDIO_DIR is absolute
 AUDIO_DIR = os.path.abspath(AUDIO_DIR)
 
+# Voice models and synthesis settings (configs/tts_config.yaml; mounted at /app/configs in Docker)
+TTS_CONFIG = os.getenv("TTS_CONFIG", str(PROJECT_ROOT / "configs" / "tts_config.yaml"))
+try:
+    with open(TTS_CONFIG) as f:
+        tts_config = yaml.safe_load(f) or {}
+except OSError:
+    logger.warning(f"TTS config {TTS_CONFIG} not found, using defaults")
+    tts_config = {}
+piper_config = tts_config.get("piper", {})
+audio_config = tts_config.get("audio", {})
+CHUNK_DURATION = float(audio_config.get("chunk_duration", 2.0))  # seconds per streamed/returned chunk
+CHUNK_OVERLAP = float(audio_config.get("overlap", 0.2))  # seconds repeated from the previous chunk
+
+# Synthesis runs in a thread pool (ONNX Runtime releases the GIL); each voice session
+# gets the cores divided between the workers
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", str(piper_config.get("workers", 2))))
+TTS_ORT_THREADS = int(os.getenv("TTS_ORT_THREADS", str(max(1, (os.cpu_count() or 2) // TTS_WORKERS))))
+synthesis_pool = ThreadPoolExecutor(max_workers=TTS_WORKERS, thread_name_prefix="tts")
+TTS_BATCH_MAX_ITEMS = int(os.getenv("TTS_BATCH_MAX_ITEMS", str(piper_config.get("batch_max_items", 256))))
+
+# Result cache: repeated (text, voice, speed) requests reuse the saved tts-{key}.wav
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "1") == "1"
+tts_cache = TTSCache(AUDIO_DIR, memory_bytes=int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(64 * 1024 ** 2))))
+
+piper_engine = PiperEngine(
+    model_dir=os.getenv("PIPER_MODEL_DIR", piper_config.get("model_dir", "/app/models")),
+    voices={v["id"]: v["model_path"] for v in piper_config.get("voices", []) if v.get("model_path")},
+    pool_size=int(os.getenv("PIPER_POOL_SIZE", str(piper_config.get("pool_size", 4)))),
+    threads=TTS_ORT_THREADS,
+    default_voice=TTS_VOICE,
+    sentence_silence=float(piper_config.get("sentence_silence", 0.2))
+)
+
+# Storage budgets for AUDIO_DIR; files leased by live sessions are never evicted, and
+# fresh files get min_age so LongCat can still pick them up
+janitor = StorageJanitor(
+    "tts",
+    AUDIO_DIR,
+    max_bytes=int(os.getenv("AUDIO_STORAGE_MAX_BYTES", str(5 * 1024 ** 3))),
+    ttl_seconds=float(os.getenv("AUDIO_STORAGE_TTL_HOURS", "72")) * 3600,
+    interval=float(os.getenv("STORAGE_JANITOR_INTERVAL", "300")),
+    min_age_seconds=float(os.getenv("STORAGE_JANITOR_MIN_AGE", "600"))
+)
+app.include_router(storage_router(janitor))
+
+
+@app.on_event("startup")
+async def start_janitor():
+    janitor.start()
+
+
+@app.on_event("startup")
+async def preload_voices():
+    """Load the configured voices in the background so first requests are warm"""
+    if TTS_MODEL == "piper":
+        voices = piper_config.get("preload") or [TTS_VOICE]
+        asyncio.get_running_loop().run_in_executor(synthesis_pool, piper_engine.preload, voices)
+
+
+@app.on_event("shutdown")
+async def stop_synthesis_pool():
+    synthesis_pool.shutdown(wait=False, cancel_futures=True)
+
 
 class TTSRequest(BaseModel):
     text: str
     voice: Optional[str] = None
     speed: Optional[float] = 1.0
     chunk: Optional[bool] = False  # Return chunks for streaming
+    use_cache: Optional[bool] = True  # Reuse audio already synthesized for the same text/voice/speed
+    # url: JSON with audio_url only; binary: the audio itself; base64: JSON with audio_base64 too
+    response: Literal["url", "binary", "base64"] = "url"
+    audio_format: Literal["wav", "flac", "opus"] = "wav"  # opus = Ogg Opus (browsers); LongCat needs wav
+
+
+class TTSStreamRequest(TTSRequest):
+    # wav: one WAV over chunked HTTP; pcm: raw 16-bit mono (rate in X-Sample-Rate);
+    # sse: events with base64 WAV chunks that overlap by audio.overlap
+    format: Literal["wav", "pcm", "sse"] = "wav"
+
+
+class TTSBatchItem(BaseModel):
+    text: str
+    voice: Optional[str] = None
+    speed: Optional[float] = 1.0
+
+
+class TTSBatchRequest(BaseModel):
+    items: List[TTSBatchItem]
+    use_cache: Optional[bool] = True
+    audio_format: Literal["wav", "flac", "opus"] = "wav"
+
+
+class TTSBatchResult(BaseModel):
+    index: int  # position in the request's items
+    voice: Optional[str] = None
+    audio_url: Optional[str] = None
+    cache: Optional[str] = None
+    error: Optional[str] = None
+
+
+class TTSBatchResponse(BaseModel):
+    results: List[TTSBatchResult]
+    succeeded: int
+    failed: int
+    voices: List[str]  # in the order they were synthesized
+    elapsed_ms: int
 
 
 class TTSResponse(BaseModel):
     audio_url: Optional[str] = None
     audio_base64: Optional[str] = None
     chunks: Optional[list] = None
+    audio_format: Optional[str] = None
+    cache: Optional[str] = None  # memory / disk / coalesced / synthesized (None: cache bypassed)
 
 
 @app.get("/")
@@ -51,107 +178,355 @@ async def root():
     return {
         "service": "TTS",
         "model": TTS_MODEL,
-        "status": "ready"
+        "status": "ready",
+        "workers": TTS_WORKERS,
+        "engine": piper_engine.status() if TTS_MODEL == "piper" else None,
+        "cache": tts_cache.stats() if TTS_CACHE_ENABLED else None,
+        "storage": janitor.status()
     }
 
 
-@app.post("/tts", response_model=TTSResponse)
+@app.post("/tts", response_model=TTSResponse, response_model_exclude_none=True)
 async def generate_speech(request: TTSRequest):
     """
     Generate speech from text
+    Returns the audio_url by default; the audio itself with response=binary, or inline
+    as base64 only with response=base64
     """
     try:
         voice = request.voice or TTS_VOICE
         text = request.text
         
         if TTS_MODEL == "piper":
-            # Piper TTS implementation
-            audio_data = await generate_piper_tts(text, voice, request.speed)
+            # Piper TTS implementation (cache by the voice actually used)
+            voice = piper_engine.resolve(voice)
+            synthesize = generate_piper_tts
         elif TTS_MODEL == "coqui":
             # Coqui TTS implementation
-            audio_data = await generate_coqui_tts(text, voice, request.speed)
+            synthesize = generate_coqui_tts
         else:
             raise HTTPException(status_code=400, detail=f"Unknown TTS model: {TTS_MODEL}")
         
+        if TTS_CACHE_ENABLED and request.use_cache:
+            # Cached (or coalesced onto an identical in-flight request); the file is saved either way
+            key = tts_cache.make_key(text, voice, request.speed, TTS_MODEL)
+            audio_data, source = await tts_cache.get_or_synthesize(
+                key, lambda: synthesize(text, voice, request.speed)
+            )
+            wav_filename = tts_cache.filename(key)
+        else:
+            audio_data, source = await synthesize(text, voice, request.speed), None
+            wav_filename = None
+        
         # If chunking requested, split audio
         if request.chunk:
             chunks = chunk_audio(audio_data)
-            return TTSResponse(chunks=chunks)
+            return TTSResponse(chunks=chunks, cache=source)
         
-        # Save audio to file and return URL
-        audio_id = str(uuid.uuid4())
-        audio_filename = f"{audio_id}.wav"
-        audio_path = os.path.join(AUDIO_DIR, audio_filename)
-        
-        # If audio_data is base64, decode it
-        if isinstance(audio_data, str) and not audio_data.startswith("piper_") and not audio_data.startswith("coqui_"):
-            try:
-                audio_bytes = base64.b64decode(audio_data)
-            except:
-                # If not base64, treat as placeholder and create empty file for now
-                audio_bytes = b""  # Placeholder - will be replaced when TTS is implemented
-        else:
-            # Placeholder - create empty file
-            audio_bytes = b""  # Will be replaced when actual TTS is implemented
-        
-        # Save audio file (even if empty, so we have a file to serve)
-        with open(audio_path, 'wb') as f:
-            f.write(audio_bytes)
-        
-        # ALWAYS return a valid audio_url (required for LongCat-Video)
-        # Use absolute path to ensure it works
+        # Save audio to file and return URL (ALWAYS required for LongCat-Video)
+        audio_filename, audio_bytes = await encode_for_response(audio_data, request.audio_format, wav_filename)
         audio_url = f"http://localhost:8001/audio/{audio_filename}"
         
-        # Ensure audio_url is never None or empty
-        if not audio_url or audio_url == "None":
-            raise HTTPException(
-                status_code=500, 
-                detail=f"Failed to generate audio_url. AUDIO_DIR: {AUDIO_DIR}, filename: {audio_filename}"
-            )
+        if request.response == "binary":
+            return Response(content=audio_bytes, media_type=media_type(request.audio_format),
+                            headers={"X-Audio-Url": audio_url, "X-TTS-Cache": source or "bypass"})
+        return TTSResponse(
+            audio_url=audio_url,
+            audio_base64=base64.b64encode(audio_bytes).decode("ascii") if request.response == "base64" else None,
+            audio_format=request.audio_format,
+            cache=source
+        )
         
-        return TTSResponse(audio_url=audio_url, audio_base64=audio_data if audio_data else None)
-    
+    except HTTPException:
+        raise
+    except FileNotFoundError as e:
+        # Voice model not installed (see entrypoint.sh / docs/DEPLOYMENT.md)
+        raise HTTPException(status_code=503, detail=f"Voice model not installed: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def generate_piper_tts(text: str, voice: str, speed: float) -> str:
+async def generate_piper_tts(text: str, voice: str, speed: float) -> bytes:
     """
-    Generate TTS using Piper
-    TODO: Implement Piper TTS
+    Generate TTS using Piper (ONNX Runtime, in-process)
+    Runs in the synthesis thread pool so the event loop keeps serving audio and health checks
     """
-    # Placeholder - implement actual Piper TTS
-    # See: https://github.com/rhasspy/piper
-    return "piper_audio_base64_placeholder"
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(synthesis_pool, piper_engine.synthesize, text, voice, speed)
 
 
-async def generate_coqui_tts(text: str, voice: str, speed: float) -> str:
+async def generate_coqui_tts(text: str, voice: str, speed: float) -> bytes:
     """
-    Generate TTS using Coqui TTS
-    TODO: Implement Coqui TTS
+    Coqui TTS is not supported (TTS_MODEL=coqui answers 501); see https://github.com/coqui-ai/TTS
     """
-    # Placeholder - implement actual Coqui TTS
-    # See: https://github.com/coqui-ai/TTS
-    return "coqui_audio_base64_placeholder"
+    raise HTTPException(status_code=501, detail="Coqui TTS is not implemented yet; use TTS_MODEL=piper")
 
 
-def chunk_audio(audio_data: str, chunk_duration: float = 2.0) -> list:
+def chunk_audio(audio_data: bytes, chunk_duration: float = CHUNK_DURATION, overlap: float = CHUNK_OVERLAP) -> list:
     """
-    Split audio into chunks for streaming
+    Split a WAV into chunk_duration-second WAVs (base64) for streaming
     """
-    # TODO: Implement audio chunking
-    return [audio_data]  # Placeholder
+    pcm, sample_rate = read_wav(audio_data)
+    return [base64.b64encode(to_wav(chunk, sample_rate)).decode("ascii")
+            for _, chunk in chunk_pcm(pcm, sample_rate, chunk_duration, overlap)]
+
+
+def read_wav(audio_data: bytes) -> Tuple[np.ndarray, int]:
+    """(int16 PCM, sample rate) of mono 16-bit WAV bytes"""
+    with wave.open(io.BytesIO(audio_data)) as wav:
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16), wav.getframerate()
+
+
+async def encode_for_response(audio_data: bytes, audio_format: str, wav_filename: Optional[str]) -> Tuple[str, bytes]:
+    """
+    Audio in audio_format, saved to AUDIO_DIR; returns (filename, bytes)
+    Compressed versions of cached audio are saved under the same key, so each is encoded once
+    File reads and writes run in a thread, like the cache's, to keep the event loop free
+    """
+    if audio_format == "wav":
+        if wav_filename is None:
+            wav_filename = f"{uuid.uuid4()}.wav"
+            await asyncio.to_thread(save_audio, wav_filename, audio_data)
+        return wav_filename, audio_data
+    
+    stem = os.path.splitext(wav_filename)[0] if wav_filename else str(uuid.uuid4())
+    audio_filename = f"{stem}.{extension(audio_format)}"
+    if wav_filename:
+        encoded = await asyncio.to_thread(load_audio, audio_filename)
+        if encoded is not None:
+            return audio_filename, encoded
+    
+    pcm, sample_rate = read_wav(audio_data)
+    loop = asyncio.get_running_loop()
+    encoded = await loop.run_in_executor(synthesis_pool, encode_audio, pcm, sample_rate, audio_format)
+    await asyncio.to_thread(save_audio, audio_filename, encoded)
+    return audio_filename, encoded
+
+
+def load_audio(audio_filename: str) -> Optional[bytes]:
+    """Audio saved earlier in AUDIO_DIR (marked as served for the janitor), or None if it is gone"""
+    audio_path = os.path.join(AUDIO_DIR, audio_filename)
+    try:
+        with open(audio_path, "rb") as f:
+            audio_data = f.read()
+    except FileNotFoundError:
+        return None
+    record_served(audio_path)
+    return audio_data
+
+
+def save_audio(audio_filename: str, audio_data: bytes) -> str:
+    """Write audio to AUDIO_DIR and return its URL"""
+    audio_path = os.path.join(AUDIO_DIR, audio_filename)
+    # Write to a temp name first so LongCat never picks up a partial file
+    tmp_path = f"{audio_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(audio_data)
+    os.replace(tmp_path, audio_path)
+    return f"http://localhost:8001/audio/{audio_filename}"
+
+
+async def synthesize_sentences(sentences: List[str], voice: str, speed: float):
+    """
+    Yield each sentence's PCM in order; up to TTS_WORKERS sentences synthesize
+    concurrently, so later ones are usually done by the time earlier ones are sent
+    """
+    loop = asyncio.get_running_loop()
+    in_flight = deque()
+    queued = iter(sentences)
+    try:
+        while True:
+            for sentence in queued:
+                in_flight.append(loop.run_in_executor(
+                    synthesis_pool, piper_engine.synthesize_pcm, sentence, voice, speed
+                ))
+                if len(in_flight) >= TTS_WORKERS:
+                    break
+            if not in_flight:
+                return
+            pcm, _ = await in_flight.popleft()
+            yield pcm
+    finally:
+        for future in in_flight:
+            future.cancel()  # Client went away; drop sentences not started yet
+
+
+@app.post("/tts/stream")
+async def stream_speech(request: TTSStreamRequest):
+    """
+    Stream speech sentence by sentence as it is synthesized
+    Chunks are audio.chunk_duration seconds; the whole utterance is also saved and its
+    URL sent in the X-Audio-Url header (available once the stream completes) and the
+    final SSE event. Cached utterances are streamed straight from the cache.
+    """
+    if TTS_MODEL != "piper":
+        raise HTTPException(status_code=501, detail=f"Streaming is not supported for TTS model: {TTS_MODEL}")
+    sentences = split_sentences(request.text)
+    if not sentences:
+        raise HTTPException(status_code=400, detail="No text to synthesize")
+    voice = piper_engine.resolve(request.voice or TTS_VOICE)
+    
+    key, cached_pcm = None, None
+    audio_filename = f"{uuid.uuid4()}.wav"
+    if TTS_CACHE_ENABLED and request.use_cache:
+        key = tts_cache.make_key(request.text, voice, request.speed, TTS_MODEL)
+        audio_filename = tts_cache.filename(key)
+        cached = await tts_cache.lookup(key)
+        if cached is not None:
+            cached_pcm, sample_rate = read_wav(cached)
+        else:
+            tts_cache.count_miss()
+    if cached_pcm is None:
+        try:
+            sample_rate = piper_engine.sample_rate(voice)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    
+    silence = np.zeros(int(sample_rate * piper_engine.sentence_silence), dtype=np.int16)
+    overlap = CHUNK_OVERLAP if request.format == "sse" else 0.0  # byte streams are continuous
+    
+    async def audio_chunks():
+        """(sentence index, offset in samples, PCM chunk); saves the full utterance at the end"""
+        if cached_pcm is not None:
+            for start, chunk in chunk_pcm(cached_pcm, sample_rate, CHUNK_DURATION, overlap):
+                yield None, start, chunk
+            return
+        parts = []
+        position = 0
+        index = 0
+        async for pcm in synthesize_sentences(sentences, voice, request.speed or 1.0):
+            if parts and len(silence):
+                pcm = np.concatenate([silence, pcm])
+            for start, chunk in chunk_pcm(pcm, sample_rate, CHUNK_DURATION, overlap):
+                yield index, position + start, chunk
+            parts.append(pcm)
+            position += len(pcm)
+            index += 1
+        audio = to_wav(np.concatenate(parts), sample_rate)
+        if key is not None:
+            await tts_cache.store(key, audio)
+        else:
+            await asyncio.to_thread(save_audio, audio_filename, audio)
+    
+    async def byte_stream():
+        if request.format == "wav":
+            yield wav_header(sample_rate)
+        try:
+            async for _, _, chunk in audio_chunks():
+                yield chunk.tobytes()
+        except Exception as e:
+            logger.error(f"Streaming synthesis failed: {e}")  # Headers are sent; the stream just ends
+    
+    async def event_stream():
+        chunk_index = 0
+        try:
+            async for sentence, offset, chunk in audio_chunks():
+                event = {
+                    "type": "chunk",
+                    "index": chunk_index,
+                    "sentence": sentence,
+                    "offsetMs": round(offset * 1000 / sample_rate),
+                    "durationMs": round(len(chunk) * 1000 / sample_rate),
+                    "audio_base64": base64.b64encode(to_wav(chunk, sample_rate)).decode("ascii")
+                }
+                chunk_index += 1
+                yield f"data: {json.dumps(event)}\n\n"
+            done = {'type': 'done', 'chunks': chunk_index, 'sentences': len(sentences),
+                    'audio_url': audio_url, 'cached': cached_pcm is not None}
+            yield f"data: {json.dumps(done)}\n\n"
+        except Exception as e:
+            logger.error(f"Streaming synthesis failed: {e}")
+            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+    
+    audio_url = f"http://localhost:8001/audio/{audio_filename}"
+    headers = {"X-Audio-Url": audio_url, "X-Sample-Rate": str(sample_rate), "X-Sentences": str(len(sentences)),
+               "X-TTS-Cache": "hit" if cached_pcm is not None else "miss" if key else "bypass"}
+    if request.format == "sse":
+        return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+    media_type = "audio/wav" if request.format == "wav" else f"audio/L16;rate={sample_rate};channels=1"
+    return StreamingResponse(byte_stream(), media_type=media_type, headers=headers)
+
+
+async def synthesize_batch_item(index: int, item: TTSBatchItem, voice: str,
+                                 use_cache: bool, audio_format: str) -> TTSBatchResult:
+    """One batch item; failures are returned as the item's error rather than raised"""
+    try:
+        if not item.text.strip():
+            raise ValueError("No text to synthesize")
+        if use_cache:
+            key = tts_cache.make_key(item.text, voice, item.speed, TTS_MODEL)
+            audio_data, source = await tts_cache.get_or_synthesize(
+                key, lambda: generate_piper_tts(item.text, voice, item.speed)
+            )
+            wav_filename = tts_cache.filename(key)
+        else:
+            audio_data, source = await generate_piper_tts(item.text, voice, item.speed), None
+            wav_filename = None
+        audio_filename, _ = await encode_for_response(audio_data, audio_format, wav_filename)
+        return TTSBatchResult(index=index, voice=voice, audio_url=f"http://localhost:8001/audio/{audio_filename}",
+                              cache=source)
+    except Exception as e:
+        logger.warning(f"Batch item {index} failed: {e}")
+        return TTSBatchResult(index=index, voice=voice, error=str(e) or type(e).__name__)
+
+
+@app.post("/tts/batch", response_model=TTSBatchResponse, response_model_exclude_none=True)
+async def generate_speech_batch(request: TTSBatchRequest):
+    """
+    Synthesize many utterances in one call (filler clips, greetings, lesson intros)
+    Items are grouped by voice and each group runs back to back, so every model is loaded
+    once and stays warm for its items; within a group up to TTS_WORKERS items synthesize at
+    a time, which also leaves live /tts requests queued behind at most that many.
+    Results come back in request order, each with its URL or its error.
+    """
+    if TTS_MODEL != "piper":
+        raise HTTPException(status_code=501, detail=f"Batch synthesis is not supported for TTS model: {TTS_MODEL}")
+    if not request.items:
+        raise HTTPException(status_code=400, detail="No items to synthesize")
+    if len(request.items) > TTS_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413,
+                            detail=f"Batch has {len(request.items)} items; the limit is {TTS_BATCH_MAX_ITEMS}")
+    started = time.monotonic()
+    use_cache = TTS_CACHE_ENABLED and request.use_cache
+    
+    groups: "OrderedDict[str, List[int]]" = OrderedDict()
+    for index, item in enumerate(request.items):
+        groups.setdefault(piper_engine.resolve(item.voice or TTS_VOICE), []).append(index)
+    
+    results: List[Optional[TTSBatchResult]] = [None] * len(request.items)
+    slots = asyncio.Semaphore(TTS_WORKERS)
+    
+    async def run(index: int, voice: str):
+        async with slots:
+            results[index] = await synthesize_batch_item(
+                index, request.items[index], voice, use_cache, request.audio_format
+            )
+    
+    for voice, indices in groups.items():
+        await asyncio.gather(*(run(index, voice) for index in indices))
+    
+    failed = sum(1 for result in results if result.error)
+    logger.info(f"Batch of {len(results)} items across {len(groups)} voices: {failed} failed, "
+                f"{time.monotonic() - started:.1f}s")
+    return TTSBatchResponse(
+        results=results,
+        succeeded=len(results) - failed,
+        failed=failed,
+        voices=list(groups),
+        elapsed_ms=int((time.monotonic() - started) * 1000)
+    )
 
 
 @app.get("/audio/{filename}")
-async def get_audio(filename: str):
+async def get_audio(filename: str, request: Request):
     """
     Serve audio files
     """
     audio_path = os.path.join(AUDIO_DIR, filename)
     if not os.path.exists(audio_path):
         raise HTTPException(status_code=404, detail="Audio file not found")
-    return FileResponse(audio_path, media_type="audio/wav")
+    audio_type = MEDIA_TYPES.get(os.path.splitext(filename)[1].lstrip("."), "audio/wav")
+    return media_response(request, audio_path, audio_type)
 
 
 @app.get("/voices")
@@ -160,12 +535,9 @@ async def list_voices():
     List available voices
     """
     return {
-        "voices": [
-            "en_US-lessac-medium",
-            "en_US-lessac-high",
-            "en_GB-alba-medium",
-            # Add more voices
-        ]
+        "voices": piper_engine.available_voices(),
+        "default": TTS_VOICE,
+        "loaded": piper_engine.status()["loaded"]
     }
 
 
@@ -0,0 +1,50 @@
+"""
+Audio Codecs
+Output formats for synthesized speech: WAV (what LongCat consumes), FLAC (lossless,
+about half the size) and Opus in Ogg (several times smaller, for browsers)
+"""
+
+import io
+from typing import Dict
+
+import numpy as np
+
+from piper_engine import to_wav
+
+# format -> (file extension, content type)
+AUDIO_FORMATS: Dict[str, tuple] = {
+    "wav": ("wav", "audio/wav"),
+    "flac": ("flac", "audio/flac"),
+    "opus": ("ogg", "audio/ogg; codecs=opus")
+}
+MEDIA_TYPES = {extension: media_type for extension, media_type in AUDIO_FORMATS.values()}
+
+OPUS_SAMPLE_RATE = 24000  # Opus only takes 8/12/16/24/48 kHz; 24 kHz is plenty for speech
+
+
+def extension(audio_format: str) -> str:
+    return AUDIO_FORMATS[audio_format][0]
+
+
+def media_type(audio_format: str) -> str:
+    return AUDIO_FORMATS[audio_format][1]
+
+
+def encode_audio(pcm: np.ndarray, sample_rate: int, audio_format: str) -> bytes:
+    """Encode mono int16 PCM; blocking (run it off the event loop)"""
+    if audio_format == "wav":
+        return to_wav(pcm, sample_rate)
+
+    import soundfile
+
+    buffer = io.BytesIO()
+    if audio_format == "flac":
+        soundfile.write(buffer, pcm, sample_rate, format="FLAC", subtype="PCM_16")
+    elif audio_format == "opus":
+        import soxr
+
+        resampled = soxr.resample(pcm.astype(np.float32) / 32768.0, sample_rate, OPUS_SAMPLE_RATE)
+        soundfile.write(buffer, resampled, OPUS_SAMPLE_RATE, format="OGG", subtype="OPUS")
+    else:
+        raise ValueError(f"Unsupported audio format: {audio_format}")
+    return buffer.getvalue()
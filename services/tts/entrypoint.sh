@@ -0,0 +1,27 @@
+#!/bin/sh
+# Fetch the default Piper voice into PIPER_MODEL_DIR if it isn't there yet (the models
+# directory is usually a mounted volume, so this can't happen at build time), then start
+# the service. Set PIPER_FETCH_DEFAULT_VOICE=0 to skip; without the voice /tts answers 503.
+
+MODEL_DIR="${PIPER_MODEL_DIR:-/app/models}"
+VOICE="${TTS_VOICE:-en_US-lessac-medium}"
+VOICES_URL="${PIPER_VOICES_URL:-https://huggingface.co/rhasspy/piper-voices/resolve/main}"
+
+if [ "${PIPER_FETCH_DEFAULT_VOICE:-1}" = "1" ] && [ ! -f "$MODEL_DIR/$VOICE.onnx.json" ]; then
+    # en_US-lessac-medium -> en/en_US/lessac/medium/en_US-lessac-medium
+    locale="${VOICE%%-*}"
+    rest="${VOICE#*-}"
+    url="$VOICES_URL/${locale%%_*}/$locale/${rest%-*}/${rest##*-}/$VOICE"
+    echo "Fetching Piper voice $VOICE into $MODEL_DIR"
+    mkdir -p "$MODEL_DIR"
+    if curl -fsSL -o "$MODEL_DIR/$VOICE.onnx.part" "$url.onnx" \
+        && curl -fsSL -o "$MODEL_DIR/$VOICE.onnx.json.part" "$url.onnx.json"; then
+        mv "$MODEL_DIR/$VOICE.onnx.part" "$MODEL_DIR/$VOICE.onnx"
+        mv "$MODEL_DIR/$VOICE.onnx.json.part" "$MODEL_DIR/$VOICE.onnx.json"
+    else
+        rm -f "$MODEL_DIR/$VOICE.onnx.part" "$MODEL_DIR/$VOICE.onnx.json.part"
+        echo "Could not fetch Piper voice $VOICE; /tts will answer 503 until it is installed" >&2
+    fi
+fi
+
+exec python app.py
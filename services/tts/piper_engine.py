@@ -0,0 +1,302 @@
+"""
+Piper Engine
+In-process Piper synthesis on ONNX Runtime (CPU)
+
+Voices are Piper models: <voice>.onnx plus its <voice>.onnx.json config (espeak voice,
+phoneme id map, sample rate, inference scales), as published at
+https://huggingface.co/rhasspy/piper-voices
+
+Loaded voices are kept in an LRU pool keyed by voice id, so each model's InferenceSession
+is created once and reused by every request for that voice.
+"""
+
+import io
+import os
+import re
+import json
+import struct
+import time
+import wave
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PAD = "_"  # padding between phonemes
+BOS = "^"  # beginning of sentence
+EOS = "$"  # end of sentence
+SENTENCE_END = re.compile(r"(?<=[.!?。！？])\s+")
+
+
+class LatencyStats:
+    """Running count / average / max of synthesis latencies (ms)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def observe(self, ms: float):
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.last_ms = ms
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else None,
+            "max_ms": round(self.max_ms, 1),
+            "last_ms": round(self.last_ms, 1)
+        }
+
+
+class PiperVoice:
+    """One loaded Piper model: its ONNX Runtime session and phonemization settings"""
+
+    def __init__(self, voice_id: str, model_path: str, threads: int = 1):
+        import onnxruntime
+
+        config_path = f"{model_path}.json"
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+
+        self.voice_id = voice_id
+        self.sample_rate = config["audio"]["sample_rate"]
+        self.espeak_voice = config.get("espeak", {}).get("voice", "en-us")
+        self.phoneme_type = config.get("phoneme_type", "espeak")
+        self.phoneme_id_map: Dict[str, List[int]] = config["phoneme_id_map"]
+        self.num_speakers = config.get("num_speakers", 1)
+        inference = config.get("inference", {})
+        self.noise_scale = inference.get("noise_scale", 0.667)
+        self.length_scale = inference.get("length_scale", 1.0)
+        self.noise_w = inference.get("noise_w", 0.8)
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options,
+                                                    providers=["CPUExecutionProvider"])
+
+    def phonemize(self, text: str) -> List[List[str]]:
+        """Phonemes per sentence"""
+        from piper_phonemize import phonemize_codepoints, phonemize_espeak
+
+        if self.phoneme_type == "text":
+            return phonemize_codepoints(text)
+        return phonemize_espeak(text, self.espeak_voice)
+
+    def phoneme_ids(self, phonemes: List[str]) -> List[int]:
+        ids = list(self.phoneme_id_map[BOS])
+        for phoneme in phonemes:
+            if phoneme not in self.phoneme_id_map:
+                continue  # Not in this voice's alphabet
+            ids.extend(self.phoneme_id_map[phoneme])
+            ids.extend(self.phoneme_id_map[PAD])
+        ids.extend(self.phoneme_id_map[EOS])
+        return ids
+
+    def synthesize_ids(self, ids: List[int], speed: float = 1.0, speaker_id: Optional[int] = None) -> np.ndarray:
+        """Run the model on one sentence; returns int16 PCM"""
+        text = np.expand_dims(np.array(ids, dtype=np.int64), 0)
+        inputs = {
+            "input": text,
+            "input_lengths": np.array([text.shape[1]], dtype=np.int64),
+            "scales": np.array([self.noise_scale, self.length_scale / max(speed, 0.1), self.noise_w],
+                               dtype=np.float32)
+        }
+        if self.num_speakers > 1:
+            inputs["sid"] = np.array([speaker_id or 0], dtype=np.int64)
+
+        audio = self.session.run(None, inputs)[0].squeeze((0, 1))
+        peak = max(0.01, float(np.max(np.abs(audio))))
+        return np.clip(audio * (32767.0 / peak), -32767, 32767).astype(np.int16)
+
+    def synthesize(self, text: str, speed: float = 1.0, sentence_silence: float = 0.0) -> np.ndarray:
+        """Whole text as int16 PCM, sentences joined by sentence_silence seconds of silence"""
+        silence = np.zeros(int(self.sample_rate * sentence_silence), dtype=np.int16)
+        parts = []
+        for phonemes in self.phonemize(text):
+            if parts and len(silence):
+                parts.append(silence)
+            parts.append(self.synthesize_ids(self.phoneme_ids(phonemes), speed))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int16)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences (split after ., ! or ? and whitespace) for independent synthesis"""
+    return [sentence.strip() for sentence in SENTENCE_END.split(text) if sentence.strip()]
+
+
+def wav_header(sample_rate: int, data_bytes: int = 0xFFFFFFFF - 36) -> bytes:
+    """
+    Mono 16-bit WAV header; the default (maximal) size marks a stream of unknown length,
+    which players read until the connection closes
+    """
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", data_bytes + 36, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16,
+        b"data", data_bytes
+    )
+
+
+def chunk_pcm(pcm: np.ndarray, sample_rate: int, chunk_duration: float,
+              overlap: float = 0.0) -> List[Tuple[int, np.ndarray]]:
+    """
+    Split PCM into chunk_duration-second pieces as (first sample, piece); each piece after
+    the first repeats the last overlap seconds of the previous one (for clients that
+    crossfade independently played chunks)
+    """
+    step = max(1, int(sample_rate * chunk_duration))
+    lead = min(int(sample_rate * overlap), step - 1)
+    return [(max(0, start - lead), pcm[max(0, start - lead):start + step]) for start in range(0, len(pcm), step)]
+
+
+def to_wav(pcm: np.ndarray, sample_rate: int) -> bytes:
+    """Mono 16-bit WAV file bytes"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+class PiperEngine:
+    """
+    LRU pool of loaded voices (at most pool_size) plus per-voice latency stats.
+    Synthesis is blocking; callers run it in a thread pool.
+    """
+
+    def __init__(self, model_dir: str, voices: Optional[Dict[str, str]] = None, pool_size: int = 4,
+                 threads: int = 1, default_voice: str = "en_US-lessac-medium", sentence_silence: float = 0.2):
+        self.model_dir = model_dir
+        self.voice_paths = dict(voices or {})  # voice id -> .onnx path (configured overrides)
+        self.pool_size = max(1, pool_size)
+        self.threads = max(1, threads)
+        self.default_voice = default_voice
+        self.sentence_silence = sentence_silence
+        self.pool: "OrderedDict[str, PiperVoice]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.load_locks: Dict[str, threading.Lock] = {}
+        self.stats: Dict[str, Dict] = {}
+        self.evictions = 0
+
+    def model_path(self, voice_id: str) -> Optional[str]:
+        path = self.voice_paths.get(voice_id) or os.path.join(self.model_dir, f"{voice_id}.onnx")
+        return path if os.path.exists(path) and os.path.exists(f"{path}.json") else None
+
+    def available_voices(self) -> List[str]:
+        """Voices with a model (and config) on disk"""
+        found = set(v for v in self.voice_paths if self.model_path(v))
+        if os.path.isdir(self.model_dir):
+            found |= {name[:-len(".onnx")] for name in os.listdir(self.model_dir)
+                      if name.endswith(".onnx") and os.path.exists(os.path.join(self.model_dir, f"{name}.json"))}
+        return sorted(found)
+
+    def resolve(self, voice_id: Optional[str]) -> str:
+        """Voice to use: the requested one if its model exists, else the default"""
+        voice_id = voice_id or self.default_voice
+        if voice_id != self.default_voice and self.model_path(voice_id) is None:
+            logger.warning(f"No Piper model for voice {voice_id}, using {self.default_voice}")
+            return self.default_voice
+        return voice_id
+
+    def sample_rate(self, voice_id: str) -> int:
+        """Output sample rate of a voice (read from its config if it isn't loaded)"""
+        with self.lock:
+            voice = self.pool.get(voice_id)
+        if voice is not None:
+            return voice.sample_rate
+        model_path = self.model_path(voice_id)
+        if model_path is None:
+            raise FileNotFoundError(f"Piper model for voice {voice_id} not found in {self.model_dir}")
+        with open(f"{model_path}.json", encoding="utf-8") as f:
+            return json.load(f)["audio"]["sample_rate"]
+
+    def _voice_stats(self, voice_id: str) -> Dict:
+        return self.stats.setdefault(voice_id, {
+            "loads": 0, "load_ms": None, "cold": LatencyStats(), "warm": LatencyStats()
+        })
+
+    def get_voice(self, voice_id: str) -> Tuple[PiperVoice, bool]:
+        """Pooled voice, loading it on a miss; returns (voice, was_loaded)"""
+        with self.lock:
+            voice = self.pool.get(voice_id)
+            if voice is not None:
+                self.pool.move_to_end(voice_id)
+                return voice, False
+            load_lock = self.load_locks.setdefault(voice_id, threading.Lock())
+
+        with load_lock:  # One load per voice; concurrent requests wait for it
+            with self.lock:
+                voice = self.pool.get(voice_id)
+                if voice is not None:
+                    self.pool.move_to_end(voice_id)
+                    return voice, False
+            model_path = self.model_path(voice_id)
+            if model_path is None:
+                raise FileNotFoundError(f"Piper model for voice {voice_id} not found in {self.model_dir}")
+            started = time.perf_counter()
+            voice = PiperVoice(voice_id, model_path, self.threads)
+            load_ms = (time.perf_counter() - started) * 1000
+            with self.lock:
+                self.pool[voice_id] = voice
+                while len(self.pool) > self.pool_size:
+                    evicted, _ = self.pool.popitem(last=False)
+                    self.evictions += 1
+                    logger.info(f"Evicted Piper voice {evicted} from the pool")
+                stats = self._voice_stats(voice_id)
+                stats["loads"] += 1
+                stats["load_ms"] = round(load_ms, 1)
+            logger.info(f"Loaded Piper voice {voice_id} in {load_ms:.0f} ms")
+            return voice, True
+
+    def preload(self, voice_ids: List[str]):
+        for voice_id in voice_ids:
+            try:
+                self.get_voice(voice_id)
+            except Exception as e:
+                logger.warning(f"Could not preload Piper voice {voice_id}: {e}")
+
+    def synthesize_pcm(self, text: str, voice_id: Optional[str] = None, speed: float = 1.0) -> Tuple[np.ndarray, int]:
+        """Text to (int16 PCM, sample rate); cold = the voice had to be loaded for this request"""
+        voice_id = self.resolve(voice_id)
+        started = time.perf_counter()
+        voice, cold = self.get_voice(voice_id)
+        pcm = voice.synthesize(text, speed or 1.0, self.sentence_silence)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self._voice_stats(voice_id)["cold" if cold else "warm"].observe(elapsed_ms)
+        return pcm, voice.sample_rate
+
+    def synthesize(self, text: str, voice_id: Optional[str] = None, speed: float = 1.0) -> bytes:
+        """Text to WAV bytes"""
+        return to_wav(*self.synthesize_pcm(text, voice_id, speed))
+
+    def status(self) -> Dict:
+        with self.lock:
+            return {
+                "engine": "piper-onnxruntime",
+                "pool_size": self.pool_size,
+                "loaded": list(self.pool),
+                "evictions": self.evictions,
+                "threads_per_voice": self.threads,
+                "voices": {
+                    voice_id: {
+                        "loads": stats["loads"],
+                        "load_ms": stats["load_ms"],
+                        "cold": stats["cold"].to_dict(),
+                        "warm": stats["warm"].to_dict()
+                    }
+                    for voice_id, stats in self.stats.items()
+                }
+            }
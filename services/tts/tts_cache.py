@@ -0,0 +1,162 @@
+"""
+TTS Result Cache
+Reuses synthesized audio when the same line is spoken again in the same voice
+
+Key: sha256 of (normalized text, voice, speed, model). The on-disk store is the audio
+files themselves - tts-{key}.wav in AUDIO_DIR, so entries survive restarts and are aged
+out by the storage janitor - fronted by an in-memory LRU of recent clips' bytes.
+Identical concurrent requests share one synthesis.
+"""
+
+import os
+import re
+import asyncio
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from shared.storage_janitor import record_served
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalized text with whitespace collapsed (case and punctuation affect prosody, so kept)"""
+    return WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class TTSCache:
+    """Memory LRU (bounded by bytes) over content-addressed WAV files"""
+
+    def __init__(self, directory: str, memory_bytes: int = 64 * 1024 ** 2):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self.memory_used = 0
+        self.in_flight: Dict[str, asyncio.Future] = {}
+        self.lock = threading.Lock()
+        self.counts = {"memory_hits": 0, "disk_hits": 0, "coalesced": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(text: str, voice: str, speed: float, model: str) -> str:
+        parts = [normalize_text(text), voice, f"{speed or 1.0:.3f}", model]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def filename(key: str) -> str:
+        return f"tts-{key}.wav"
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, self.filename(key))
+
+    def _remember(self, key: str, audio: bytes):
+        with self.lock:
+            if key in self.memory:
+                self.memory_used -= len(self.memory.pop(key))
+            if len(audio) > self.memory_bytes:
+                return
+            self.memory[key] = audio
+            self.memory_used += len(audio)
+            while self.memory_used > self.memory_bytes:
+                _, evicted = self.memory.popitem(last=False)
+                self.memory_used -= len(evicted)
+
+    def _write(self, key: str, audio: bytes):
+        """Write atomically so LongCat never picks up a partial file"""
+        path = self.path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self.path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    async def lookup(self, key: str) -> Optional[bytes]:
+        """Cached audio (memory, else disk; restoring the file if it was evicted), or None"""
+        with self.lock:
+            audio = self.memory.get(key)
+            if audio is not None:
+                self.memory.move_to_end(key)
+                self.counts["memory_hits"] += 1
+        if audio is not None:
+            if not os.path.exists(self.path(key)):
+                await asyncio.to_thread(self._write, key, audio)  # Janitor removed the file
+            record_served(self.path(key))
+            return audio
+
+        audio = await asyncio.to_thread(self._read, key)
+        if audio is None:
+            return None
+        with self.lock:
+            self.counts["disk_hits"] += 1
+        record_served(self.path(key))
+        self._remember(key, audio)
+        return audio
+
+    async def store(self, key: str, audio: bytes):
+        await asyncio.to_thread(self._write, key, audio)
+        self._remember(key, audio)
+
+    async def get_or_synthesize(self, key: str, synthesize: Callable[[], Awaitable[bytes]]) -> Tuple[bytes, str]:
+        """
+        Audio for key and where it came from ("memory", "disk", "coalesced" or "synthesized");
+        the file is on disk when this returns
+        """
+        with self.lock:
+            memory_hit = key in self.memory
+        audio = await self.lookup(key)
+        if audio is not None:
+            return audio, "memory" if memory_hit else "disk"
+
+        pending = self.in_flight.get(key)
+        if pending is not None:
+            with self.lock:
+                self.counts["coalesced"] += 1
+            return await asyncio.shield(pending), "coalesced"
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        with self.lock:
+            self.counts["misses"] += 1
+        try:
+            audio = await synthesize()
+            await self.store(key, audio)
+            future.set_result(audio)
+            return audio, "synthesized"
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved; waiters (if any) re-raise it
+            raise
+        finally:
+            del self.in_flight[key]
+
+    def count_miss(self):
+        with self.lock:
+            self.counts["misses"] += 1
+
+    def stats(self) -> Dict:
+        with self.lock:
+            hits = self.counts["memory_hits"] + self.counts["disk_hits"] + self.counts["coalesced"]
+            lookups = hits + self.counts["misses"]
+            return {
+                **self.counts,
+                "hit_ratio": round(hits / lookups, 3) if lookups else None,
+                "memory_hit_ratio": round(self.counts["memory_hits"] / lookups, 3) if lookups else None,
+                "memory_entries": len(self.memory),
+                "memory_bytes": self.memory_used,
+                "max_memory_bytes": self.memory_bytes,
+                "in_flight": len(self.in_flight)
+            }